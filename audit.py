@@ -0,0 +1,173 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the bounded memory summary of the audit logs
+#
+# Noisy controllers log millions of commands in two months. In the bounded mode the commands are written to the
+# report as they are read, and only their counts per (user, command) are kept, in a dict of at most max_keys
+# entries. When the dict is full, its counts are written sorted to a temporary run file and the dict is cleared.
+# The runs are merged with heapq at the end, the counts of each key come out together and in order, so the
+# per-user totals and the top commands are computed in one pass with fixed-size structures. At most max_runs run
+# files are open at a time, when there are that many they are merged into a single run and closed.
+
+import heapq
+import tempfile
+import regex
+
+# default max number of distinct (user, command) counted in memory before spilling to a run file
+max_keys = 100000
+# max number of run files open at a time
+max_runs = 16
+# number of commands and users shown in the summary
+top_n = 20
+
+
+def read_run(run):
+    """
+    Yield the (key, count) of a run file, in the order they were written (sorted)
+    """
+
+    # json is imported here, on the first spill, by the report thread (under the import lock)
+    import json
+
+    for line in run:
+        key, count = line.rsplit('\t', 1)
+        yield tuple(json.loads(key)), int(count)
+
+
+def merge(streams):
+    """
+    Merge sorted (key, count) streams, yield each key once with its total count, sorted by key
+    """
+
+    current, total = None, 0
+    for key, count in heapq.merge(*streams, key=lambda item: item[0]):
+        if key == current:
+            total += count
+        else:
+            if current is not None:
+                yield current, total
+            current, total = key, count
+    if current is not None:
+        yield current, total
+
+
+def write_run(items):
+    """
+    Write the (key, count) sorted by key to a new run file, return it ready to be read
+    """
+
+    import json
+
+    run = tempfile.TemporaryFile('w+', encoding='utf-8')
+    for key, count in items:
+        # json escapes the tabs and newlines of the commands
+        run.write('{}\t{}\n'.format(json.dumps(key), count))
+    run.seek(0)
+
+    return run
+
+
+class BoundedCounter:
+    """
+    Count the keys (tuples of strings), keeping at most max_keys of them in memory
+    """
+
+    def __init__(self, max_size=max_keys, max_open=max_runs):
+        self.max_size = max_size
+        self.max_open = max_open
+        self.counts = {}
+        self.runs = []
+        # number of times the counts were spilled to a run file
+        self.spills = 0
+
+    def add(self, key):
+        if key not in self.counts and len(self.counts) >= self.max_size:
+            self.spill()
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def spill(self):
+        """
+        Write the counts sorted by key to a new run file and clear them
+        """
+
+        self.runs.append(write_run((key, self.counts[key]) for key in sorted(self.counts)))
+        self.counts.clear()
+        self.spills += 1
+        if len(self.runs) >= self.max_open:
+            self.compact()
+
+    def compact(self):
+        """
+        Merge the open run files into a single run and close them
+        """
+
+        run = write_run(merge([read_run(run) for run in self.runs]))
+        self.close()
+        self.runs = [run]
+
+    def items(self):
+        """
+        Yield each key once with its total count, sorted by key
+        """
+
+        in_memory = ((key, self.counts[key]) for key in sorted(self.counts))
+        return merge([read_run(run) for run in self.runs] + [in_memory])
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+
+
+def audit_commands(audit_file, month, counter):
+    """
+    Yield (timestamp, command) for the commands executed in the month (YYYY-MM), counting them per user and command
+    """
+
+    pattern = regex.audit_log_pattern(month)
+    with open(audit_file) as infile:
+        for line in infile:
+            matches = pattern.search(line)
+            # skip the commands where the user only entered spaces or pressed enter
+            if matches and matches.group('cmd').strip():
+                user = regex.audit_user_pattern.search(line)
+                counter.add((user.group('user') if user else 'unknown', matches.group('cmd').strip()))
+                yield matches.group('mnth'), matches.group('cmd')
+
+
+def summarize(counter, num=top_n):
+    """
+    Return the top commands [user, command, count], the top users [user, commands, distinct commands]
+    and the number of users
+    """
+
+    top_commands = []
+    top_users = []
+    num_users = 0
+    user, user_total, user_distinct = None, 0, 0
+
+    def push(heap, item):
+        if len(heap) < num:
+            heapq.heappush(heap, item)
+        else:
+            heapq.heappushpop(heap, item)
+
+    # the keys come sorted by user, so the totals of a user are complete when the next user shows up
+    for (key_user, command), count in counter.items():
+        push(top_commands, (count, key_user, command))
+        if key_user != user:
+            if user is not None:
+                push(top_users, (user_total, user_distinct, user))
+            num_users += 1
+            user, user_total, user_distinct = key_user, 0, 0
+        user_total += count
+        user_distinct += 1
+    if user is not None:
+        push(top_users, (user_total, user_distinct, user))
+
+    commands = [[key_user, command, count] for count, key_user, command in sorted(top_commands, reverse=True)]
+    users = [[key_user, total, distinct] for total, distinct, key_user in sorted(top_users, reverse=True)]
+
+    return commands, users, num_users
@@ -0,0 +1,68 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the sliding window burst detector used by the i2c and smbus checks
+
+from array import array
+from collections import deque
+import general
+
+# default window length in seconds and number of errors in a window above which it is a burst
+# 60 seconds matches the old check, which counted the errors sharing the same YYYY-MM-DDTHH:MM prefix
+burst_window = 60
+burst_threshold = 5
+
+
+def find_bursts(timestamps, window=burst_window, threshold=burst_threshold):
+    """
+    Find the bursts in a stream of epoch seconds, in ascending order (see sorted_epochs)
+    A burst starts when more than threshold errors fall within window seconds and ends when the count
+    drops back to threshold. Yield (start, end, peak) for each burst, peak being the max errors in one window
+    Runs in O(n) and only keeps the errors of the current window in memory
+    """
+
+    recent = deque()
+    start = end = None
+    peak = 0
+
+    for ts in timestamps:
+        recent.append(ts)
+        # drop the errors that fell out of the window
+        while ts - recent[0] >= window:
+            recent.popleft()
+
+        if len(recent) > threshold:
+            if start is None:
+                # the burst started with the oldest error in the window
+                start = recent[0]
+                peak = 0
+            end = ts
+            peak = max(peak, len(recent))
+        elif start is not None:
+            yield start, end, peak
+            start = None
+
+    if start is not None:
+        yield start, end, peak
+
+
+def sorted_epochs(timestamps):
+    """
+    Return the epoch seconds of a stream of errors as an array('q') in ascending order
+    A switch file is a concatenation of command dumps, a later dump can come first in the file
+    """
+
+    return array('q', sorted(timestamps))
+
+
+def format_burst(burst, window=burst_window):
+    """
+    Convert a burst to the string logged in the report
+    eg: 2019-11-25T03:10:00 - 2019-11-25T03:10:39 (peak 52/60s)
+    """
+
+    start, end, peak = burst
+    return '{} - {} (peak {}/{}s)'.format(general.epoch_to_timestamp(start), general.epoch_to_timestamp(end),
+                                        peak, window)
+
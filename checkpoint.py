@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the checkpoints used to resume an interrupted run
+#
+# While a report is written, the result of every check and of every switch file scanned is saved in a checkpoint
+# directory next to the log file. Each result is written to a temporary file and renamed, so a saved result is
+# either complete or absent whenever the run is killed. With --resume the saved results are loaded back, the
+# switch files and the checks already done are skipped and the report is rebuilt from the saved results.
+# The checkpoints are removed once all the reports of the run are complete.
+#
+# The checkpoint directory is often in a shared case directory. The results are saved as JSON, only the types of
+# the findings are rebuilt from it, the directory is private to the analyst and the files owned by another user
+# are ignored.
+
+from array import array
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import dedupe
+import records
+
+suffix = '.checkpoint'
+
+
+def encode(value):
+    """
+    Convert a result to JSON, the tuples, dicts, records and arrays are tagged so that decode() rebuilds them
+    """
+
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    if isinstance(value, tuple):
+        return {'tuple': [encode(item) for item in value]}
+    if isinstance(value, dict):
+        return {'dict': [[encode(key), encode(item)] for key, item in value.items()]}
+    if isinstance(value, records.Bursts):
+        epochs = None if value.epochs is None else value.epochs.tolist()
+        return {'bursts': [value.window, value.starts.tolist(), value.ends.tolist(), value.peaks.tolist(), epochs]}
+    if isinstance(value, records.Optics):
+        return {'optics': [value.interfaces, value.models]}
+    if isinstance(value, records.SwitchInfo):
+        return {'switch_info': value.fields()}
+    if isinstance(value, array) or type(value).__name__ == 'ndarray':
+        # the fabric error timestamps
+        return {'int64': value.tolist()}
+    raise TypeError("Cannot save a {} in a checkpoint".format(type(value).__name__))
+
+
+def decode(value):
+    """
+    Rebuild a result converted by encode()
+    """
+
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    (tag, items), = value.items()
+    if tag == 'tuple':
+        return tuple(decode(item) for item in items)
+    if tag == 'dict':
+        return {decode(key): decode(item) for key, item in items}
+    if tag == 'bursts':
+        window, starts, ends, peaks, epochs = items
+        return records.Bursts(zip(starts, ends, peaks), window, None if epochs is None else array('q', epochs))
+    if tag == 'optics':
+        optics = records.Optics()
+        for interface, model in zip(*items):
+            optics.add(interface, model)
+        return optics
+    if tag == 'switch_info':
+        return records.SwitchInfo(*items)
+    if tag == 'int64':
+        return array('q', items)
+    raise ValueError("Unknown checkpoint value {}".format(tag))
+
+
+def read_entry(path):
+    """
+    Return the (name, value) saved in a checkpoint file, raise ValueError if it is owned by another user
+    """
+
+    with open(path) as infile:
+        if os.fstat(infile.fileno()).st_uid != os.getuid():
+            raise ValueError("{} is owned by another user".format(path))
+        name, value = json.load(infile)
+
+    return decode(name), decode(value)
+
+
+class Checkpoint:
+    """
+    Saved results of the report of one controller
+    options are the settings the results depend on, a checkpoint saved with other options is not resumed
+    """
+
+    def __init__(self, log_file, options, resume=False):
+        self.path = log_file + suffix
+        self.resumed = resume and self.load_options() == options
+
+        if not self.resumed:
+            if os.path.isdir(self.path):
+                print("Discarding the checkpoint of a previous run at {}".format(self.path))
+                shutil.rmtree(self.path)
+            os.makedirs(self.path, mode=0o700)
+            self.save('options', options)
+
+    def entry_path(self, name):
+        return os.path.join(self.path, hashlib.sha1(repr(name).encode()).hexdigest())
+
+    def save(self, name, value):
+        """
+        Save a value atomically
+        """
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp')
+        with os.fdopen(fd, 'w') as outfile:
+            json.dump([encode(name), encode(value)], outfile)
+        os.replace(tmp_path, self.entry_path(name))
+
+    def load(self, name):
+        """
+        Return a saved value, raise KeyError if it was not saved
+        """
+
+        try:
+            saved_name, value = read_entry(self.entry_path(name))
+        except (OSError, ValueError, TypeError):
+            raise KeyError(name)
+        if saved_name != name:
+            raise KeyError(name)
+
+        return value
+
+    def load_options(self):
+        try:
+            return self.load('options')
+        except KeyError:
+            return None
+
+    def load_results(self):
+        """
+        Load the saved per-file results into the shared results, return their number
+        """
+
+        loaded = 0
+        for entry in os.listdir(self.path):
+            if entry.endswith('.tmp'):
+                # left by a write that was interrupted
+                continue
+            try:
+                name, value = read_entry(os.path.join(self.path, entry))
+            except (OSError, ValueError, TypeError):
+                continue
+            if name[0] == 'result':
+                dedupe.results[name[1]] = value
+                loaded += 1
+
+        return loaded
+
+    def save_result(self, key, result):
+        self.save(('result', key), result)
+
+    def run_check(self, check, func, *args):
+        """
+        Return the saved result of the check, run it and save its result if there is none
+        """
+
+        try:
+            result = self.load(('check', check))
+            print("...Resumed the {} check from the checkpoint...".format(check))
+            return result
+        except KeyError:
+            pass
+
+        result = func(*args)
+        self.save(('check', check), result)
+        return result
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def run_check(checkpoint, check, func, *args):
+    """
+    Run a check through the checkpoint, if there is one
+    """
+
+    if checkpoint is None:
+        return func(*args)
+    return checkpoint.run_check(check, func, *args)
@@ -4,18 +4,30 @@
 # this script is a part of support bundle analyzer script
 # this contains all functions related to different checks
 
+import burst
 import logs
+import pipeline
 import re
+import sqlite3
 import regex
 import switch
 import controller
+import dedupe
+import history
+import checkpoint
+import fabric
+import audit
+import engine
+import general
+import sample
+import standby
 
 ljust_number = 50
 
 
-def show_fabric_error_warn(active_ctrls, msg, log_file):
+def get_fabric_errors(active_ctrls):
     """
-    Log fabric errors/warnings if present
+    Return the sections of show-fabric-error with errors, None if every section is empty
     """
 
     show_fab = 'cli/show-fabric-error'
@@ -24,60 +36,129 @@ def show_fabric_error_warn(active_ctrls, msg, log_file):
         full_file = infile.read()
         # match the lines beginning with ~ and ending with None in the next line
         matches = re.findall(regex.show_fabric_error_warn_pattern, full_file)
-        # if there is a match, substitute the match with space
+        if not matches:
+            return None
+        # substitute the match with space
         # this is done so that we see only the interesting output (which are sections with error)
-        if matches:
-            check_msg = 'Checking for Fabric {}'.format(msg)
-            result = '{} found'.format(msg)
-            print('{} {}'.format(check_msg.ljust(ljust_number, '.'), result))
-            errors = regex.show_fabric_error_warn_pattern.sub('', full_file)
-            # remove the blank lines resulting from substituting the matches with ''
-            output = ("".join([line for line in errors.strip().splitlines(True) if line.strip()]))
-            # write to the log file
-            msg = 'FABRIC ERRORS'
-            logs.PrintFunctions().print_header(log_file, msg)
-            logs.PrintFunctions().print_output(log_file, output)
-        else:
-            check_msg = 'Checking for Fabric {}'.format(msg)
-            result = 'No {} found'.format(msg)
-            print('{} {}'.format(check_msg.ljust(ljust_number, '.'), result))
-
-
-def check_switch_details(active_ctrls, log_file):
+        errors = regex.show_fabric_error_warn_pattern.sub('', full_file)
+        # remove the blank lines resulting from substituting the matches with ''
+        return "".join([line for line in errors.strip().splitlines(True) if line.strip()])
+
+
+def show_fabric_error_warn(active_ctrls, msg, log_file):
+    """
+    Log fabric errors/warnings if present
+    """
+
+    output = get_fabric_errors(active_ctrls)
+    if output is not None:
+        check_msg = 'Checking for Fabric {}'.format(msg)
+        result = '{} found'.format(msg)
+        print('{} {}'.format(check_msg.ljust(ljust_number, '.'), result))
+        # write to the log file
+        msg = 'FABRIC ERRORS'
+        logs.PrintFunctions().print_header(log_file, msg)
+        logs.PrintFunctions().print_output(log_file, output)
+    else:
+        check_msg = 'Checking for Fabric {}'.format(msg)
+        result = 'No {} found'.format(msg)
+        print('{} {}'.format(check_msg.ljust(ljust_number, '.'), result))
+
+
+def find_duplicate_switch_files(active):
+    """
+    Fingerprint the switch files of all the active controllers, so that the same content found under several
+    bundles is scanned only once
+    """
+
+    all_files = []
+    for active_ctrls in active:
+        all_files += switch.get_switch_files(active_ctrls)[1]
+        all_files += switch.get_smbus_log_files(active_ctrls) or []
+
+    num_files, num_unique, skipped = dedupe.content_index.summary(all_files)
+    if num_unique < num_files:
+        print("Found {} switch log files with {} unique contents, {:.1f} MB of duplicate content will be "
+              "scanned only once".format(num_files, num_unique, skipped / 1e6))
+        print('')
+
+
+def check_switch_details(active_ctrls, log_file, burst_window=burst.burst_window,
+                         burst_threshold=burst.burst_threshold, chunk_size=pipeline.chunk_size,
+                         queue_depth=pipeline.queue_depth, case_num=False, history_db=history.default_db,
+                         ckpt=None, audit_budget=None, engine_name=engine.default_engine, golden_dir=None,
+                         optics_changes=False):
     """
     All switch related check go here
+    The per-switch findings are also recorded in the history database (unless history_db is None)
+    The result of each check is saved in the checkpoint ckpt (if any) and taken from it when resuming
+    With an audit_budget, the audit logs are streamed to the report and summarized in bounded memory
+    engine_name selects the shell or native implementation of the per-file checks, 'both' compares them
+    With optics_changes, the optics that changed between the first and the last inventory dump are also logged
+    Return the switch findings, for the comparison of the active and standby controllers
     """
 
     # get the switches in the main directory
     # Eg: from /home/bsn/support/case-11147/bsn-support--BCF-Controller-VM-001--2019-10-02--09-22-52Z--SXI8I
 
     all_switch_names, switch_name_full_path = switch.get_switch_files(active_ctrls)
+    engine.current.comparison = engine.Comparison()
 
     switches_with_i2c_errors, switches_with_smbus_errors, switches_with_non_hcl_optics = \
-        switch.check_i2c_errors(switch_name_full_path, active_ctrls)
+        checkpoint.run_check(ckpt, 'i2c', switch.check_i2c_errors, switch_name_full_path, active_ctrls,
+                             burst_window, burst_threshold, engine_name, golden_dir)
+
+    if optics_changes:
+        switches_with_optics_changes = checkpoint.run_check(ckpt, 'optics_changes', switch.check_optics_changes,
+                                                            switch_name_full_path, active_ctrls)
 
-    switches_with_ofad_errors = switch.check_ofad_logs(switch_name_full_path, active_ctrls)
+    fabric_error_bursts = checkpoint.run_check(ckpt, 'fabric', fabric.correlate_fabric_errors, switch_name_full_path,
+                                               active_ctrls, burst_window, burst_threshold, chunk_size, queue_depth)
 
-    switch_model_uptime = switch.check_model_uptime(switch_name_full_path, active_ctrls)
+    switches_with_ofad_errors = checkpoint.run_check(ckpt, 'ofad', switch.check_ofad_logs, switch_name_full_path,
+                                                     active_ctrls, engine_name, golden_dir)
 
-    audit_logs = controller.audit_logs(active_ctrls)
+    switch_model_uptime = checkpoint.run_check(ckpt, 'model_uptime', switch.check_model_uptime,
+                                               switch_name_full_path, active_ctrls, engine_name, golden_dir)
 
-    msg_i2c = "The switches with continuously incrementing i2c errors and the timeframe when maximum " \
-              "errors happened are below:"
+    # the bounded audit summary is written while the audit log is read, at the end of the report
+    if not audit_budget:
+        audit_logs = checkpoint.run_check(ckpt, 'audit', controller.audit_logs, active_ctrls)
+
+    if history_db:
+        try:
+            history.record_findings(history_db, case_num, active_ctrls, switches_with_i2c_errors,
+                                    switches_with_smbus_errors, switches_with_non_hcl_optics,
+                                    switches_with_ofad_errors, switch_model_uptime)
+        except (sqlite3.Error, OSError) as err:
+            # the history is a convenience, never fail the analysis because of it
+            print("...Could not record the findings in {}: {}...".format(history_db, err))
+
+    msg_i2c = "The switches with bursts of i2c errors (more than {} errors within {} seconds) and the timeframe " \
+              "of each burst are below:".format(burst_threshold, burst_window)
 
     logs.PrintFunctions().print_header(log_file, msg_i2c)
     logs.PrintFunctions().print_output_dict_simple(log_file, switches_with_i2c_errors)
 
-    msg_smbus = "The switches with continuously incrementing 'ERR ismt_smbus' and the timeframe " \
-                "when maximum errors happened are below:"
+    msg_smbus = "The switches with bursts of 'ERR ismt_smbus' (more than {} errors within {} seconds) and the " \
+                "timeframe of each burst are below:".format(burst_threshold, burst_window)
 
     logs.PrintFunctions().print_header(log_file, msg_smbus)
     logs.PrintFunctions().print_output_dict_simple(log_file, switches_with_smbus_errors)
 
+    msg_fabric = "The i2c and smbus error bursts correlated across all the switches of the fabric are below:"
+    logs.PrintFunctions().print_header(log_file, msg_fabric)
+    logs.PrintFunctions().print_output_fabric(log_file, fabric_error_bursts)
+
     msg_non_hcl = "The switches with non HCL optics are below:"
     logs.PrintFunctions().print_header(log_file, msg_non_hcl)
     logs.PrintFunctions().print_output_dict(log_file, switches_with_non_hcl_optics)
 
+    if optics_changes:
+        msg_optics = "The switches whose optics changed between the first and the last inventory dump are below:"
+        logs.PrintFunctions().print_header(log_file, msg_optics)
+        logs.PrintFunctions().print_output_optics_changes(log_file, switches_with_optics_changes)
+
     msg_ofad = "The switches with errors under ofad-debug logs are below. " \
                "The format is [number of occurences] - error message"
     logs.PrintFunctions().print_header(log_file, msg_ofad)
@@ -87,7 +168,85 @@ def check_switch_details(active_ctrls, log_file):
     logs.PrintFunctions().print_header(log_file, msg_model)
     logs.PrintFunctions().print_output_table(log_file, switch_model_uptime)
 
+    if engine_name == 'both':
+        comparison = engine.current.comparison
+        msg_engine = "The shell and native implementations of the switch checks compared on the unique switch " \
+                     "files are below:"
+        logs.PrintFunctions().print_header(log_file, msg_engine)
+        logs.PrintFunctions().print_output_engine(log_file, comparison.rows(), comparison.differences)
+        if comparison.differences:
+            print("...The shell and native checks differ on {} files, see the report...".format(
+                len(comparison.differences)))
+
     msg_audit = "The audit logs for the current and last month are below:"
     logs.PrintFunctions().print_header(log_file, msg_audit)
-    logs.PrintFunctions().print_output_audit(log_file, audit_logs)
+    if audit_budget:
+        log_audit_summary(active_ctrls, log_file, audit_budget)
+    else:
+        logs.PrintFunctions().print_output_audit(log_file, audit_logs)
+
+    return {'i2c': switches_with_i2c_errors, 'smbus': switches_with_smbus_errors,
+            'non_hcl': switches_with_non_hcl_optics, 'ofad': switches_with_ofad_errors,
+            'fabric': fabric_error_bursts}
+
+
+def log_audit_summary(active_ctrls, log_file, audit_budget=audit.max_keys):
+    """
+    Stream the commands of the current and last month to the report, then log the most executed commands and
+    the commands per user. At most audit_budget (user, command) counts are kept in memory
+    """
+
+    audit_file = controller.get_audit_log_file(active_ctrls)
+    counter = audit.BoundedCounter(audit_budget)
+    try:
+        commands = [audit.audit_commands(audit_file, month, counter)
+                    for month in controller.get_month_list(active_ctrls)]
+        logs.PrintFunctions().print_output_audit_stream(log_file, commands)
+        logs.PrintFunctions().print_output_audit_summary(log_file, *audit.summarize(counter))
+        if counter.spills:
+            print("...The audit summary spilled to {} temporary run files...".format(counter.spills))
+    finally:
+        counter.close()
+
+
+def log_standby_diff(active_ctrls, standby_ctrls, log_file, active_findings, standby_findings):
+    """
+    Log the differences between the fabric errors, audit activity and switch findings of the active controller
+    and the standby controller
+    """
+
+    rows = standby.diff_rows(standby.controller_summary(active_ctrls, get_fabric_errors(active_ctrls),
+                                                        active_findings),
+                             standby.controller_summary(standby_ctrls, get_fabric_errors(standby_ctrls),
+                                                        standby_findings))
+
+    msg_standby = "The findings that differ between the active controller and the standby controller {} " \
+                  "are below:".format(controller.get_ctrl_dir_name(standby_ctrls))
+    logs.PrintFunctions().print_header(log_file, msg_standby)
+    logs.PrintFunctions().print_output_standby(log_file, rows)
+    if rows:
+        print("...The active and standby controllers differ on {} findings, see the report...".format(len(rows)))
+
+
+def check_switch_quick(active_ctrls, log_file, burst_window=burst.burst_window,
+                       burst_threshold=burst.burst_threshold, full_after=False):
+    """
+    Quick mode: estimate the i2c, smbus and ofad errors of the switches from samples of their files
+    """
+
+    all_switch_names, switch_name_full_path = switch.get_switch_files(active_ctrls)
+    var_log_switch_files = switch.get_smbus_log_files(active_ctrls)
+    dates = general.get_last_seven_days(active_ctrls)
+
+    print("Sampling the switch files for the last 7 days...")
+    estimates = sample.estimate_switch_errors(switch_name_full_path, var_log_switch_files, dates, burst_window,
+                                              burst_threshold)
+
+    flagged = [row[0] for row in estimates if row[-1] == 'yes']
+    if flagged:
+        print("Errors found in the samples of {}, they need a full scan".format(', '.join(flagged)))
 
+    msg_quick = "QUICK MODE: the errors of the last 7 days estimated from {} samples of {} KB per switch file " \
+                "are below:".format(sample.sample_chunks, sample.sample_size >> 10)
+    logs.PrintFunctions().print_header(log_file, msg_quick)
+    logs.PrintFunctions().print_output_quick(log_file, estimates, full_after)
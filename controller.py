@@ -45,6 +45,29 @@ def find_ctrl_roles(state, ctrl_dir):
         return standby_ctrl
 
 
+def get_ctrl_role(ctrl_dir):
+    """
+    Return the role (active or standby) of the controller the bundle was collected on, None if it is not found
+    """
+
+    with open(ctrl_dir + 'cli/show-controller-details', 'r') as infile:
+        for line in infile:
+            matches = re.search(regex.check_ctrl_pattern, line)
+            # the controller the bundle was collected on is marked with *
+            if matches and matches.group('current_ctrl') == '*':
+                return matches.group('ctrl_state')
+
+    return None
+
+
+def get_ctrl_dir_name(ctrl_path):
+    """
+    Return the name of the controller directory eg: .../ICSMCDNETA02-1866daabcc1c/ -> ICSMCDNETA02-1866daabcc1c
+    """
+
+    return ctrl_path.rstrip('/').split('/')[-1]
+
+
 def get_sw_ver(act_ctrl):
     """
     Find the software version of the controller
@@ -62,17 +85,17 @@ def get_sw_ver(act_ctrl):
 def get_ctrl_name(ctrl_path, case_number):
     """
     Construct the controller name which will be used as the name of the log file
-    Eg: case-11411-bsncontrol01-2019-10-21-17-00-05.log
+    Eg: case-11411-bsncontrol01-1866daabcc1c-2019-10-21-17-00-05.log
+    The name of the controller directory is used, the active and standby controllers of a bundle get their own file
     """
 
     folder_name = ctrl_path.split('--')
     # if the input is support bundle path, then the case_number would be set to 'False' under argparse
-    # if that's the case, just show the controller name, bundle date and time eg: bsncontrol01-2019-10-21-17-00-05.log
-    if not case_number:
-        ctrl_name = folder_name[1] + '-' + folder_name[2] + '-' + folder_name[3] + ".log"
-    else:
-        ctrl_name = 'case-{}'.format(case_number) + '-' + folder_name[1] + '-' + folder_name[2] + '-' + folder_name[3] \
-                    + ".log"
+    # if that's the case, just show the controller name, bundle date and time
+    # eg: bsncontrol01-1866daabcc1c-2019-10-21-17-00-05.log
+    ctrl_name = get_ctrl_dir_name(ctrl_path) + '-' + folder_name[2] + '-' + folder_name[3] + ".log"
+    if case_number:
+        ctrl_name = 'case-{}'.format(case_number) + '-' + ctrl_name
     return ctrl_name
 
 
@@ -123,19 +146,25 @@ def get_month_list(ctrl_path):
     return month_list
 
 
-def audit_logs(act_ctrl):
+def get_audit_log_file(act_ctrl):
     """
-    Find the audit logs for the current and past month and add them to a list, grouped by the month
-    The first element would be last month and the second element would be the current month
+    Return the path of the audit log file of the controller
     """
 
-    # get the sw version
-    ctrl_sw_version = get_sw_ver(act_ctrl)
-
     # for bundles on BCF 5.x, the audit log file is located under act_ctrl_dir/files/var/log/floodlight/
-    if ctrl_sw_version.startswith('5'):
+    if get_sw_ver(act_ctrl).startswith('5'):
         act_ctrl = act_ctrl + 'files/'
 
+    return act_ctrl + 'var/log/floodlight/audit.log'
+
+
+def audit_logs(act_ctrl):
+    """
+    Find the audit logs for the current and past month and add them to a list, grouped by the month
+    The first element would be last month and the second element would be the current month
+    """
+
+    audit_file = get_audit_log_file(act_ctrl)
     months = get_month_list(act_ctrl)
     output_list = []
 
@@ -143,8 +172,8 @@ def audit_logs(act_ctrl):
         month_list = []
         # the below pattern would look for commands executed by the user
         # the pattern would result in 2019-11-22T11:26:28.479+00:00 executed_command
-        check_audit_log_pattern = re.compile(r'(?P<mnth>{}.*?00\s).*?id=.*?args=\"(?P<cmd>.*)\"'.format(month))
-        with open(act_ctrl + 'var/log/floodlight/audit.log') as infile:
+        check_audit_log_pattern = regex.audit_log_pattern(month)
+        with open(audit_file) as infile:
             for line in infile:
                 matches = re.search(check_audit_log_pattern, line)
                 if matches:
@@ -0,0 +1,371 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the analysis daemon and its client
+#
+# The daemon listens on a Unix socket and runs the jobs submitted with 'jarvis.py submit' one at a time, the
+# jobs with the lowest priority first. The bundle metadata (controller directories and roles) and the per-file
+# check results stay in memory between the jobs, so analyzing a case again, or a bundle sharing switch logs
+# with a previous one, skips the discovery and the scans. The console output and the finished report sections
+# are streamed back to the client while the job runs.
+# The full scan of a quick job (--quick --full-after) is queued as a job of its own, with no client.
+#
+# One JSON object per line in both directions:
+#   client -> daemon: {"action": "submit", "case_num": ..., "path": ..., "priority": ..., "options": {...}}
+#                     {"action": "status"} or {"action": "stop"}
+#   daemon -> client: {"event": "queued" | "started" | "output" | "section" | "done" | "failed" | "status", ...}
+
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+import lazy
+import logs
+
+# the caches are only needed by the daemon itself, not by submit (first used by serve, in the main thread)
+dedupe = lazy.module('dedupe')
+
+default_socket = os.path.join(str(Path.home()), '.jarvis', 'daemon.sock')
+# the jobs with the lowest priority run first
+default_priority = 10
+# max number of bundle locations and of per-file check results kept in memory
+max_contexts = 64
+max_results = 4096
+
+
+class Job:
+    """
+    An analysis job and the events streamed to the client that submitted it
+    """
+
+    ids = itertools.count(1)
+
+    def __init__(self, case_num, path, options, priority):
+        self.id = next(self.ids)
+        self.case_num = case_num
+        self.path = path
+        self.options = options
+        self.priority = priority
+        self.events = queue.Queue()
+        # the client went away, the job still runs but its events are dropped
+        self.detached = False
+
+    def send(self, event, **fields):
+        if not self.detached:
+            fields.update(event=event, job=self.id)
+            self.events.put(fields)
+
+    def describe(self):
+        return 'job {} ({}, priority {})'.format(self.id, self.case_num or self.path, self.priority)
+
+
+class JobOutput:
+    """
+    File-like object sending what the job prints to its client, one line at a time
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.pending = ''
+        # the active and standby reports of the job print from two threads
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.pending += text
+            *lines, self.pending = self.pending.split('\n')
+        for line in lines:
+            self.job.send('output', text=line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+class ReportSections:
+    """
+    Send to the client of a job what was written to its log files since the last section header
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.offsets = {}
+
+    def __call__(self, logfile):
+        offset = self.offsets.get(logfile, 0)
+        # the log file is erased when the controller is analyzed again
+        if offset > os.path.getsize(logfile):
+            offset = 0
+        with open(logfile, 'rb') as infile:
+            infile.seek(offset)
+            text = infile.read()
+            self.offsets[logfile] = infile.tell()
+
+        if text.strip():
+            # the report is written to a partial file, tell the client the name of the final one
+            if logfile.endswith(logs.partial_suffix):
+                logfile = logfile[:-len(logs.partial_suffix)]
+            self.job.send('section', log_file=os.path.abspath(logfile), text=text.decode(errors='replace'))
+
+
+class BundleContexts:
+    """
+    Controller directories and roles of the bundle locations, discovered once per location
+    A location is discovered again when its directory changed (eg: a new bundle was uploaded)
+    """
+
+    def __init__(self, discover, max_size=max_contexts):
+        self.discover = discover
+        self.contexts = dedupe.LRUCache(max_size)
+
+    def get(self, location):
+        key = (location, os.stat(location).st_mtime)
+        if key not in self.contexts:
+            self.contexts[key] = self.discover(location)
+        return self.contexts[key]
+
+
+class Daemon:
+    """
+    Queue the submitted jobs and run them one at a time in the worker thread
+    The checks share module level state (log files, caches), hence the jobs do not run concurrently
+    """
+
+    def __init__(self, run_job, discover):
+        # run_job(case_num, path, options, discover, output) analyzes the bundles printing to output and returns
+        # the log files and the start time
+        self.run_job = run_job
+        self.contexts = BundleContexts(discover)
+        self.jobs = queue.PriorityQueue()
+        self.running = None
+
+    def submit(self, request):
+        job = Job(request.get('case_num'), request.get('path'), request.get('options', {}),
+                  request.get('priority', default_priority))
+        self.jobs.put((job.priority, job.id, job))
+        job.send('queued', position=self.jobs.qsize() + (1 if self.running else 0))
+        return job
+
+    def submit_full_scan(self, job):
+        """
+        Queue the full scan of a quick job, it runs in the background with no client, return its id
+        """
+
+        full_scan = Job(job.case_num, job.path, dict(job.options, quick=False, full_after=False), job.priority)
+        full_scan.detached = True
+        self.jobs.put((full_scan.priority, full_scan.id, full_scan))
+        return full_scan.id
+
+    def status(self):
+        with self.jobs.mutex:
+            waiting = [job.describe() for _, _, job in sorted(self.jobs.queue) if job]
+        running = self.running
+
+        return {'running': running.describe() if running else None, 'waiting': waiting,
+                'cached_results': len(dedupe.results), 'cached_bundles': len(self.contexts.contexts)}
+
+    def work(self):
+        while True:
+            _, _, job = self.jobs.get()
+            if job is None:
+                return
+            self.run(job)
+
+    def run(self, job):
+        self.running = job
+        print('Running {}'.format(job.describe()), file=sys.stderr)
+        job.send('started')
+        sections = ReportSections(job)
+        logs.section_listeners.append(sections)
+        start = time.time()
+        try:
+            log_files, _ = self.run_job(job.case_num, job.path, job.options, self.contexts.get, JobOutput(job))
+            full_scan = self.submit_full_scan(job) if job.options.get('full_after') and log_files else None
+            job.send('done', log_files=[os.path.abspath(logfile) for logfile in log_files],
+                     seconds=round(time.time() - start, 1), full_scan=full_scan)
+        except SystemExit:
+            job.send('failed', reason='The bundle could not be analyzed')
+        except Exception as err:
+            job.send('failed', reason=repr(err))
+        finally:
+            logs.section_listeners.remove(sections)
+            self.running = None
+
+    def stop(self):
+        """
+        Fail the waiting jobs and stop the worker once the running job is done
+        """
+
+        while True:
+            try:
+                _, _, job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job:
+                job.send('failed', reason='The daemon was stopped')
+        self.jobs.put((float('-inf'), 0, None))
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """
+    Handle one client connection
+    """
+
+    def send(self, event):
+        self.wfile.write((json.dumps(event) + '\n').encode())
+
+    def handle(self):
+        analysis = self.server.analysis
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            self.send({'event': 'failed', 'reason': 'Invalid request'})
+            return
+
+        action = request.get('action')
+        if action == 'submit':
+            job = analysis.submit(request)
+            self.stream(job)
+        elif action == 'status':
+            self.send(dict(analysis.status(), event='status'))
+        elif action == 'stop':
+            self.send({'event': 'done', 'log_files': [], 'seconds': 0})
+            # shutdown() waits for serve_forever() to return, it has to run in another thread
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+        else:
+            self.send({'event': 'failed', 'reason': 'Unknown action {}'.format(action)})
+
+    def stream(self, job):
+        while True:
+            event = job.events.get()
+            try:
+                self.send(event)
+            except OSError:
+                job.detached = True
+                return
+            if event['event'] in ('done', 'failed'):
+                return
+
+
+def remove_stale_socket(socket_path):
+    """
+    Remove the socket left by a daemon that is no longer running, return False if a daemon is running
+    """
+
+    if not os.path.exists(socket_path):
+        return True
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+            return False
+        except OSError:
+            os.remove(socket_path)
+            return True
+
+
+def serve(run_job, discover, socket_path=default_socket, cache_size=max_results):
+    """
+    Run the daemon until it is stopped with 'jarvis.py submit --stop' or Ctrl-C
+    """
+
+    os.makedirs(os.path.dirname(socket_path), exist_ok=True)
+    if not remove_stale_socket(socket_path):
+        print('A daemon is already listening on {}'.format(socket_path))
+        return -1
+
+    # the index of the switch files is bounded with the results
+    dedupe.results.max_size = cache_size
+    dedupe.content_index.fingerprints.max_size = cache_size
+    # what the jobs print is sent to their clients, the rest stays on the console
+    logs.route_output()
+    analysis = Daemon(run_job, discover)
+
+    # the socket is private to the user from its creation (the umask is process-wide, no job thread runs yet)
+    previous_umask = os.umask(0o077)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler)
+    finally:
+        os.umask(previous_umask)
+    server.daemon_threads = True
+    server.analysis = analysis
+    os.chmod(socket_path, 0o600)
+
+    worker = threading.Thread(target=analysis.work, daemon=True)
+    worker.start()
+    print('Listening on {}'.format(socket_path))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+    print('Stopping, waiting for the running job to finish...')
+    analysis.stop()
+    worker.join()
+    return 0
+
+
+def print_event(event):
+    """
+    Print an event received from the daemon, return the exit code when it is the last one
+    """
+
+    kind = event['event']
+    if kind == 'queued':
+        print('Job {} queued at position {}'.format(event['job'], event['position']))
+    elif kind == 'started':
+        print('Job {} started'.format(event['job']))
+    elif kind == 'output':
+        print(event['text'])
+    elif kind == 'section':
+        print('-----> {}'.format(event['log_file']))
+        print(event['text'])
+    elif kind == 'status':
+        print('Running: {}'.format(event['running'] or 'None'))
+        print('Waiting: {}'.format(', '.join(event['waiting']) or 'None'))
+        print('Cached: {} file results, {} bundle locations'.format(event['cached_results'], event['cached_bundles']))
+        return 0
+    elif kind == 'done':
+        for logfile in event['log_files']:
+            print("       * {}".format(logfile))
+        if event.get('full_scan'):
+            print("The full scan is queued in the daemon as job {}, the full reports will replace the quick ones "
+                  "when done".format(event['full_scan']))
+        return 0
+    elif kind == 'failed':
+        print(event['reason'])
+        return -1
+
+    return None
+
+
+def submit(request, socket_path=default_socket):
+    """
+    Send a request to the daemon and print the events streamed back, return the exit code
+    """
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except OSError:
+            print('The daemon is not listening on {}, start it with jarvis.py daemon'.format(socket_path))
+            return -1
+
+        sock.sendall((json.dumps(request) + '\n').encode())
+        with sock.makefile('r') as events:
+            for line in events:
+                code = print_event(json.loads(line))
+                if code is not None:
+                    return code
+
+    print('The daemon closed the connection')
+    return -1
@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the content-hash deduplication of the switch files
+#
+# A case often contains several bundles, and the same switch log content shows up under each of them.
+# The files are fingerprinted cheaply when they are discovered (size plus a hash of a few sampled blocks),
+# and fully hashed only when two fingerprints collide. A file whose fingerprint is unique is also identified by
+# its inode and modification time, so that a file changed outside the sampled blocks does not reuse the results
+# cached by the daemon or saved in a checkpoint. The per-file check results are cached by content,
+# so each unique content is scanned once and the result is reused by every controller report referencing it.
+# The active and standby reports run in concurrent threads: a content being scanned by one thread is waited for
+# by the other, instead of being scanned twice. Each thread has its own result listeners, so a result is only
+# handed to the checkpoint of the report that computed it.
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# size of each sampled block and number of blocks sampled (first, last and evenly spaced in between)
+sample_size = 64 << 10
+sample_blocks = 4
+# block size used for the full hash
+hash_block = 1 << 20
+
+
+def quick_fingerprint(path):
+    """
+    Return the size of the file and the hash of the sampled blocks
+    """
+
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as infile:
+        if size <= sample_size * sample_blocks:
+            digest.update(infile.read())
+        else:
+            step = (size - sample_size) // (sample_blocks - 1)
+            for block in range(sample_blocks):
+                infile.seek(block * step)
+                digest.update(infile.read(sample_size))
+
+    return size, digest.hexdigest()
+
+
+def full_hash(path):
+    """
+    Return the hash of the whole file
+    """
+
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as infile:
+        for block in iter(lambda: infile.read(hash_block), b''):
+            digest.update(block)
+
+    return digest.hexdigest()
+
+
+class LRUCache(OrderedDict):
+    """
+    Dict keeping at most max_size items (no limit when None), the least recently used items are evicted first
+    evicted(key, value) is called for every item evicted
+    """
+
+    def __init__(self, max_size=None, evicted=None):
+        super().__init__()
+        self.max_size = max_size
+        self.evicted = evicted
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if self.max_size is not None:
+            while len(self) > self.max_size:
+                old_key, old_value = self.popitem(last=False)
+                if self.evicted:
+                    self.evicted(old_key, old_value)
+
+
+class ContentIndex:
+    """
+    Map the files to a content key, files with the same content get the same key
+    At most max_size files are indexed (no limit when None), the least recently used ones are forgotten first
+    """
+
+    def __init__(self, max_size=None):
+        # (path, size, mtime, device, inode) -> quick fingerprint, so that a file is only fingerprinted once
+        self.fingerprints = LRUCache(max_size, self.forget)
+        # quick fingerprint -> paths sharing it
+        self.groups = {}
+        # (path, size, mtime, device, inode) -> full hash, computed only for the paths in a group of more than one
+        self.full_hashes = {}
+        # the active and standby reports look up the keys from two threads
+        self.lock = threading.RLock()
+
+    def add(self, path):
+        """
+        Fingerprint a file and return its id and its quick fingerprint
+        """
+
+        stat = os.stat(path)
+        file_id = (path, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino)
+        with self.lock:
+            if file_id not in self.fingerprints:
+                fingerprint = quick_fingerprint(path)
+                self.fingerprints[file_id] = fingerprint
+                group = self.groups.setdefault(fingerprint, [])
+                if path not in group:
+                    group.append(path)
+
+            return file_id, self.fingerprints[file_id]
+
+    def forget(self, file_id, fingerprint):
+        """
+        Remove an evicted file from its group and drop its full hash
+        """
+
+        path = file_id[0]
+        group = self.groups.get(fingerprint, [])
+        if path in group:
+            group.remove(path)
+        if not group:
+            self.groups.pop(fingerprint, None)
+        self.full_hashes.pop(file_id, None)
+
+    def key(self, path):
+        """
+        Return the content key of the file
+        The quick fingerprint and the identity of the file (inode, modification time) are enough when no other file
+        shares the fingerprint, otherwise use the full hash
+        """
+
+        with self.lock:
+            file_id, fingerprint = self.add(path)
+            if len(self.groups[fingerprint]) == 1:
+                return ('quick',) + fingerprint + file_id[2:]
+            digest = self.full_hashes.get(file_id)
+
+        if digest is None:
+            # the whole file is read without holding the lock
+            digest = full_hash(path)
+            with self.lock:
+                self.full_hashes[file_id] = digest
+
+        return 'full', fingerprint[0], digest
+
+    def unique(self, paths):
+        """
+        Return one path per unique content, in the order of the paths
+        """
+
+        # fingerprint all the paths first, so that the collisions are known before the keys are computed
+        for path in paths:
+            self.add(path)
+
+        seen = set()
+        unique_paths = []
+        for path in paths:
+            key = self.key(path)
+            if key not in seen:
+                seen.add(key)
+                unique_paths.append(path)
+
+        return unique_paths
+
+    def summary(self, paths):
+        """
+        Return the number of files, the number of unique contents and the bytes that do not need to be scanned
+        """
+
+        unique_paths = self.unique(paths)
+        skipped = sum(os.path.getsize(path) for path in paths) - sum(os.path.getsize(path) for path in unique_paths)
+
+        return len(paths), len(unique_paths), skipped
+
+
+class Current(threading.local):
+    """
+    The result listeners of the report being written by the thread
+    """
+
+    def __init__(self):
+        # functions called with (key, result) for every new result computed by the thread, the checkpoints save
+        # the results as they are computed
+        self.result_listeners = []
+
+
+# the index and the check results are shared by all the controllers analyzed in the run
+# the daemon keeps them across the jobs and bounds the number of results kept
+content_index = ContentIndex()
+results = LRUCache()
+current = Current()
+# the results being computed, key -> Future, and the lock guarding them and the results
+in_flight = {}
+lock = threading.Lock()
+
+
+def result_key(check, path, params):
+    """
+    Return the key of the result of a check for the content of the file at path
+    """
+
+    return check, content_index.key(path), params
+
+
+def claim(key):
+    """
+    Return ('cached', result) if the result of key is cached, ('pending', Future) if another thread is computing
+    it, or ('owner', None): the caller computes the result and hands it (or its exception) to finish()
+    """
+
+    with lock:
+        if key in results:
+            return 'cached', results[key]
+        if key in in_flight:
+            return 'pending', in_flight[key]
+        in_flight[key] = Future()
+
+    return 'owner', None
+
+
+def finish(key, result=None, error=None):
+    """
+    Store the result of a claimed key, or its exception, and wake up the threads waiting for it
+    """
+
+    # stored before the key leaves in_flight, so that it is never claimed twice
+    if error is None:
+        store(key, result)
+    with lock:
+        pending = in_flight.pop(key)
+    if error is None:
+        pending.set_result(result)
+    else:
+        pending.set_exception(error)
+
+    return result
+
+
+def cached(check, path, params, func, *args):
+    """
+    Return the result of func(*args) for the content of the file at path
+    The result is computed once per (check, content, params) and reused for every copy of the content
+    """
+
+    key = result_key(check, path, params)
+    state, value = claim(key)
+    if state == 'cached':
+        return value
+    if state == 'pending':
+        # another thread is scanning the same content, its exception (if any) is raised here too
+        return value.result()
+
+    try:
+        result = func(*args)
+    except BaseException as err:
+        finish(key, error=err)
+        raise
+
+    return finish(key, result)
+
+
+def store(key, result):
+    """
+    Cache a new result and hand it to the listeners of the thread
+    """
+
+    with lock:
+        results[key] = result
+    for listener in list(current.result_listeners):
+        listener(key, result)
+
+    return result
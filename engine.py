@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the selection of the shell or native implementation of the per-file switch checks
+#
+# --engine shell runs the grep/awk/zgrep pipelines (the default), --engine native the in-process scanners of
+# native.py. --engine both runs the two on every file, times them and records every file where their results
+# differ. The report uses the shell results. With a golden directory, the results the two engines agree on are
+# saved as JSON, one file per (check, file content, parameters), and later runs compare both engines with them.
+#
+# The ofad check greps the files without -a. In a UTF-8 locale grep drops the lines with invalid bytes and stops
+# at the buffer holding the first NUL byte. The native check drops the same lines and stops at the line before
+# the NUL byte, a file with a NUL byte can differ on the lines of the buffer before it (see native.text_blocks).
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+engines = ('shell', 'native', 'both')
+default_engine = 'shell'
+# max length of a result shown in the differences
+max_shown = 300
+
+
+def normalize(check, result):
+    """
+    Convert a result to plain lists, for the comparisons and the golden files
+    """
+
+    if check in ('i2c', 'smbus'):
+        return [list(each_burst) for each_burst in result]
+    if check == 'non_hcl':
+        return [[interface, models] for interface, models in result.items()]
+    if check == 'ofad':
+        # the message keys keep the leading space of the awk output, except the first one
+        return sorted([message.strip(), count] for message, count in result.items())
+    return list(result)
+
+
+class Comparison:
+    """
+    Time spent by each engine and the differences found, per check
+    """
+
+    def __init__(self):
+        self.checks = OrderedDict()
+        self.differences = []
+
+    def add(self, check, file, shell_secs, native_secs):
+        stats = self.checks.setdefault(check, {'files': 0, 'shell': 0.0, 'native': 0.0, 'differences': 0})
+        stats['files'] += 1
+        stats['shell'] += shell_secs
+        stats['native'] += native_secs
+
+    def add_difference(self, check, file, expected_from, expected, got_from, got):
+        self.checks[check]['differences'] += 1
+        self.differences.append([check, file.split('/')[-1], '{}: {}'.format(expected_from, shorten(expected)),
+                                 '{}: {}'.format(got_from, shorten(got))])
+
+    def rows(self):
+        """
+        Return [check, files, shell seconds, native seconds, speedup, differences] for each check
+        """
+
+        return [[check, stats['files'], round(stats['shell'], 3), round(stats['native'], 3),
+                 '{:.1f}x'.format(stats['shell'] / stats['native']) if stats['native'] else '-',
+                 stats['differences']] for check, stats in self.checks.items()]
+
+
+def shorten(result):
+    # json and dedupe are only needed by --engine both, imported under the import lock of the report thread
+    import json
+
+    text = json.dumps(result)
+    return text if len(text) <= max_shown else text[:max_shown] + '...'
+
+
+class Current(threading.local):
+    """
+    The comparison of the report being written, reset for each controller
+    The active and standby reports are written by concurrent threads, each of them has its own
+    """
+
+    def __init__(self):
+        self.comparison = Comparison()
+
+
+current = Current()
+
+
+def golden_path(golden_dir, check, file, params):
+    """
+    Return the golden file of a check for the content of a file and the parameters
+    """
+
+    import dedupe
+
+    params_hash = hashlib.sha1(repr(params).encode()).hexdigest()[:12]
+    return os.path.join(golden_dir, check, '{}-{}.json'.format(dedupe.full_hash(file), params_hash))
+
+
+def compare_golden(golden_dir, check, file, params, results):
+    """
+    Compare the results of the engines with the golden file, or save it when the engines agree
+    """
+
+    import json
+
+    path = golden_path(golden_dir, check, file, params)
+    if os.path.exists(path):
+        with open(path) as infile:
+            golden = json.load(infile)['result']
+        for name, result in results.items():
+            if result != golden:
+                current.comparison.add_difference(check, file, 'golden', golden, name, result)
+    elif results['shell'] == results['native']:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as outfile:
+            json.dump({'file': file.split('/')[-1], 'params': repr(params), 'result': results['shell']}, outfile)
+        os.replace(tmp_path, path)
+
+
+def run(check, engine, file, params, shell_func, shell_args, native_func, native_args, golden_dir=None):
+    """
+    Run the check on a file with the selected engine, return its result
+    """
+
+    if engine == 'shell':
+        return shell_func(*shell_args)
+    if engine == 'native':
+        return native_func(*native_args)
+
+    start = time.perf_counter()
+    shell_result = shell_func(*shell_args)
+    shell_done = time.perf_counter()
+    native_result = native_func(*native_args)
+    native_done = time.perf_counter()
+
+    current.comparison.add(check, file, shell_done - start, native_done - shell_done)
+    results = {'shell': normalize(check, shell_result), 'native': normalize(check, native_result)}
+    if results['shell'] != results['native']:
+        current.comparison.add_difference(check, file, 'shell', results['shell'], 'native', results['native'])
+    if golden_dir:
+        compare_golden(golden_dir, check, file, params, results)
+
+    return shell_result
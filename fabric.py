@@ -0,0 +1,240 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains all fabric-wide error correlation functions
+#
+# The i2c and smbus error timestamps of every switch are converted to int64 epoch arrays and binned together,
+# so that bursts hitting many switches at the same time (power or environmental events) stand out
+
+from datetime import date
+import numpy as np
+import burst
+import dedupe
+import general
+import logs
+import matcher
+import pipeline
+import progress
+import records
+import switch
+
+# the time bins are as wide as the window of the continuous errors check (--burst-window), a switch is bursting
+# in a bin if it logged more errors than its threshold (--burst-threshold) in the bin
+# a fabric-wide burst needs at least this many switches bursting in the same bin
+min_switches = 3
+# number of top (switch, bin) bursts to report
+top_k = 10
+# max number of switch names shown for each fabric-wide burst
+max_names = 10
+
+# each timestamp line is YYYY-MM-DDTHH:MM:SS\n
+ts_width = 20
+
+
+def to_epoch_array(raw):
+    """
+    Convert a block of fixed width timestamps (YYYY-MM-DDTHH:MM:SS\\n) to an int64 array of epoch seconds
+    """
+
+    if not raw:
+        return np.empty(0, dtype=np.int64)
+
+    # view the block as a matrix of digits, one row per timestamp
+    digits = np.frombuffer(raw, dtype=np.uint8).reshape(-1, ts_width).astype(np.int64) - ord('0')
+
+    def field(start, width):
+        value = np.zeros(len(digits), dtype=np.int64)
+        for col in range(start, start + width):
+            value = value * 10 + digits[:, col]
+        return value
+
+    # there are only a handful of distinct days, convert those once and map them back
+    day_keys = field(0, 4) * 10000 + field(5, 2) * 100 + field(8, 2)
+    uniq_days, inverse = np.unique(day_keys, return_inverse=True)
+    epoch_days = np.array([(date(k // 10000, k // 100 % 100, k % 100) - date(1970, 1, 1)).days for k in uniq_days],
+                          dtype=np.int64)
+
+    return epoch_days[inverse] * 86400 + field(11, 2) * 3600 + field(14, 2) * 60 + field(17, 2)
+
+
+def make_chunk_parser(dates, smbus_files):
+    """
+    Return the parse function of the read-ahead pipeline
+    It returns the epoch seconds of the i2c errors (switch files) or smbus errors (/var/log/switch/ files)
+    logged on the given dates in a chunk
+    """
+
+    line_matcher = matcher.LineMatcher(dates)
+
+    def parse_chunk(path, data):
+        kind = 'smbus' if path in smbus_files else 'i2c'
+        text = data.tobytes().decode('utf-8', 'replace')
+        stamps = [line[:19] + '\n' for line, kinds in line_matcher.scan(text)
+                  if kind in kinds and 'recent_timestamp' in kinds]
+        return to_epoch_array(''.join(stamps).encode())
+
+    return parse_chunk
+
+
+def bin_fabric_errors(switch_epochs, bin_secs, start):
+    """
+    Bin the errors of all the switches in one pass
+    Return the sparse (bin, switch index, count) arrays of all the non empty cells
+    """
+
+    names = list(switch_epochs)
+    sizes = [len(switch_epochs[name]) for name in names]
+    epochs = np.concatenate([switch_epochs[name] for name in names])
+    owner = np.repeat(np.arange(len(names), dtype=np.int64), sizes)
+
+    # one int64 key per event, bin major so that the result is sorted by time
+    keys = ((epochs - start) // bin_secs) * len(names) + owner
+    cells, counts = np.unique(keys, return_counts=True)
+
+    return cells // len(names), cells % len(names), counts
+
+
+def find_fabric_bursts(names, bins, owners, counts, start, bin_secs, threshold=burst.burst_threshold):
+    """
+    Find the windows (consecutive bins) where at least min_switches switches burst at the same time
+    The cells are sorted by bin, the cells of each window are a slice of them
+    """
+
+    bursting = counts > threshold
+    switches_per_bin = np.bincount(bins[bursting])
+    hot_bins = np.flatnonzero(switches_per_bin >= min_switches)
+
+    windows = []
+    if not hot_bins.size:
+        return windows
+
+    # merge consecutive hot bins into one window
+    breaks = np.flatnonzero(np.diff(hot_bins) > 1)
+    lows = hot_bins[np.concatenate(([0], breaks + 1))]
+    highs = hot_bins[np.concatenate((breaks, [len(hot_bins) - 1]))]
+    firsts = np.searchsorted(bins, lows, side='left')
+    lasts = np.searchsorted(bins, highs, side='right')
+    for lo, hi, first, last in zip(lows, highs, firsts, lasts):
+        in_window = slice(first, last)
+        window_bursting = bursting[in_window]
+        swt_idx = np.unique(owners[in_window][window_bursting])
+        swt_names = [names[i] for i in swt_idx[:max_names]]
+        if len(swt_idx) > max_names:
+            swt_names.append('... {} more'.format(len(swt_idx) - max_names))
+        windows.append([general.epoch_to_timestamp(start + lo * bin_secs),
+                        general.epoch_to_timestamp(start + (hi + 1) * bin_secs),
+                        len(swt_idx), int(counts[in_window][window_bursting].sum()), ', '.join(swt_names)])
+
+    return windows
+
+
+def find_top_bursts(names, bins, owners, counts, start, bin_secs):
+    """
+    Return the top_k (switch, bin) cells with the most errors
+    """
+
+    k = min(top_k, len(counts))
+    top = np.argpartition(counts, -k)[-k:]
+    top = top[np.argsort(counts[top])[::-1]]
+
+    return [[names[owners[i]], general.epoch_to_timestamp(start + bins[i] * bin_secs), int(counts[i])] for i in top]
+
+
+def per_switch_histogram(switch_epochs, dates):
+    """
+    Count the errors of every switch for each of the given dates
+    """
+
+    # dates are in descending order, the first bin is the oldest day
+    first_day = general.timestamp_to_epoch(dates[-1] + 'T00:00:00')
+    histogram = []
+    for name, epochs in switch_epochs.items():
+        days = np.bincount((epochs - first_day) // 86400, minlength=len(dates))[:len(dates)]
+        histogram.append([name] + days.tolist() + [len(epochs)])
+
+    # the noisiest switches first
+    histogram.sort(key=lambda row: row[-1], reverse=True)
+    return histogram
+
+
+def correlate_fabric_errors(switch_files, act_ctrl, window=burst.burst_window, threshold=burst.burst_threshold,
+                            chunk=pipeline.chunk_size, depth=pipeline.queue_depth):
+    """
+    Collect the i2c and smbus error timestamps of all the switches and find the fabric-wide bursts
+    window (seconds) is the width of the time bins, a switch is bursting in a bin with more than threshold errors
+    The timestamps collected by the continuous errors checks are reused, the other files are scanned in-process
+    through the read-ahead pipeline
+    chunk (bytes) and depth (number of chunks read ahead) configure the pipeline
+    """
+
+    dates = general.get_last_seven_days(act_ctrl)
+    var_log_switch_files = switch.get_smbus_log_files(act_ctrl) or []
+
+    print("Checking for fabric-wide i2c/smbus error bursts for the last 7 days...")
+
+    # scan only the contents that were not scanned yet by the i2c and smbus checks, or are not being scanned,
+    # for this or another controller
+    smbus_files = set(var_log_switch_files)
+    file_keys = {}
+    todo = []
+    # keep a reference to the results used by this run, the shared cache may evict them meanwhile
+    epochs_by_key = {}
+    # the contents being scanned by the thread of another controller, key -> Future
+    pending = {}
+    for file in switch_files + var_log_switch_files:
+        key = file_keys[file] = switch.error_epochs_key('smbus' if file in smbus_files else 'i2c', file, dates)
+        if key in epochs_by_key or key in pending:
+            continue
+        state, value = dedupe.claim(key)
+        if state == 'cached':
+            epochs_by_key[key] = value
+        elif state == 'pending':
+            pending[key] = value
+        else:
+            # the content is scanned by this thread, the others wait for it
+            epochs_by_key[key] = None
+            todo.append(file)
+
+    if todo:
+        try:
+            with progress.Scan(switch.scan_name('fabric', act_ctrl), todo) as scan:
+                epochs_per_file, stats = pipeline.read_ahead(todo, make_chunk_parser(dates, smbus_files), chunk,
+                                                             depth, scan=scan)
+        except BaseException as err:
+            for file in todo:
+                dedupe.finish(file_keys[file], error=err)
+            raise
+        logs.PrintFunctions().display_throughput(stats)
+        for file, chunks in epochs_per_file.items():
+            epochs = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+            epochs_by_key[file_keys[file]] = dedupe.finish(file_keys[file], epochs)
+
+    # the contents scanned by the other thread, their exception (if any) is raised here too
+    for key, future in pending.items():
+        epochs_by_key[key] = future.result()
+
+    switch_epochs = {}
+    for file, key in file_keys.items():
+        epochs = epochs_by_key[key]
+        if not len(epochs):
+            continue
+        switch_name = records.log_switch_name(file) if file in smbus_files else records.switch_name(file)
+        switch_epochs.setdefault(switch_name, []).append(epochs)
+
+    result = {'dates': dates, 'bin_seconds': window, 'windows': [], 'top': [], 'histogram': []}
+    if not switch_epochs:
+        return result
+
+    # merge the i2c and smbus errors of the same switch
+    switch_epochs = {name: np.sort(np.concatenate(arrays)) for name, arrays in switch_epochs.items()}
+
+    start = min(int(epochs[0]) for epochs in switch_epochs.values()) // window * window
+    names = list(switch_epochs)
+    bins, owners, counts = bin_fabric_errors(switch_epochs, window, start)
+
+    result['windows'] = find_fabric_bursts(names, bins, owners, counts, start, window, threshold)
+    result['top'] = find_top_bursts(names, bins, owners, counts, start, window)
+    result['histogram'] = per_switch_histogram(switch_epochs, dates)
+
+    return result
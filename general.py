@@ -4,7 +4,8 @@
 # this script is a part of support bundle analyzer script
 # this contains all general functions
 
-from datetime import date, timedelta
+import calendar
+from datetime import date, datetime, timedelta, timezone
 
 model_asic_dict = {
     'Z9264': 'Tomahawk 2 ',
@@ -86,3 +87,29 @@ def get_last_seven_days(ctrl_path):
     dates = [(bd - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(0, 7)]
 
     return dates
+
+
+def timestamp_to_epoch(timestamp):
+    """
+    Convert a log timestamp (YYYY-MM-DDTHH:MM:SS, anything after the seconds is ignored) to epoch seconds
+    The timestamps are treated as UTC, they are only compared with each other
+    """
+
+    return calendar.timegm(time_tuple(timestamp[:19]))
+
+
+def time_tuple(timestamp):
+    """
+    Split YYYY-MM-DDTHH:MM:SS into a tuple of ints
+    """
+
+    return (int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+            int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]))
+
+
+def epoch_to_timestamp(epoch):
+    """
+    Convert epoch seconds back to the log timestamp format YYYY-MM-DDTHH:MM:SS
+    """
+
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
@@ -0,0 +1,266 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the local fleet history database of the per-switch findings
+#
+# Every run upserts its findings (i2c/smbus bursts, ofad errors, non HCL optics, model/uptime/ASIC rows)
+# into a local SQLite file, so that questions like "has this switch had i2c bursts in previous cases?"
+# are answered with an indexed query instead of rerunning the old bundles:
+#   jarvis.py history --switch LEAF1
+#   jarvis.py history --kind i2c
+
+import os
+import time
+from pathlib import Path
+import general
+import controller
+import logs
+
+default_db = os.path.join(str(Path.home()), '.jarvis', 'history.db')
+
+schema = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    case_num TEXT NOT NULL,
+    controller TEXT NOT NULL,
+    bundle_date TEXT NOT NULL,
+    bundle_time TEXT NOT NULL,
+    bundle_path TEXT NOT NULL,
+    analyzed_at TEXT NOT NULL,
+    UNIQUE (case_num, controller, bundle_date, bundle_time)
+);
+CREATE TABLE IF NOT EXISTS bursts (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    switch TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    started TEXT NOT NULL,
+    ended TEXT NOT NULL,
+    peak INTEGER NOT NULL,
+    window_secs INTEGER NOT NULL,
+    UNIQUE (run_id, switch, kind, started)
+);
+CREATE TABLE IF NOT EXISTS ofad_errors (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    switch TEXT NOT NULL,
+    message TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    UNIQUE (run_id, switch, message)
+);
+CREATE TABLE IF NOT EXISTS optics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    switch TEXT NOT NULL,
+    interface TEXT NOT NULL,
+    model TEXT NOT NULL,
+    UNIQUE (run_id, switch, interface, model)
+);
+CREATE TABLE IF NOT EXISTS switches (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    switch TEXT NOT NULL,
+    model TEXT,
+    uptime TEXT,
+    asic TEXT,
+    connected_since TEXT,
+    role TEXT,
+    UNIQUE (run_id, switch)
+);
+CREATE INDEX IF NOT EXISTS runs_case ON runs (case_num);
+CREATE INDEX IF NOT EXISTS runs_date ON runs (bundle_date);
+CREATE INDEX IF NOT EXISTS bursts_switch ON bursts (switch, kind);
+CREATE INDEX IF NOT EXISTS bursts_kind ON bursts (kind);
+CREATE INDEX IF NOT EXISTS ofad_switch ON ofad_errors (switch);
+CREATE INDEX IF NOT EXISTS optics_switch ON optics (switch);
+CREATE INDEX IF NOT EXISTS optics_model ON optics (model);
+CREATE INDEX IF NOT EXISTS switches_switch ON switches (switch);
+CREATE INDEX IF NOT EXISTS switches_model ON switches (model);
+'''
+
+
+def connect(db=default_db):
+    """
+    Open the history database, create it if needed
+    """
+
+    db_dir = os.path.dirname(db)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    # imported here, the history subcommand options and --help do not load sqlite3
+    import sqlite3
+
+    conn = sqlite3.connect(db)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.executescript(schema)
+
+    return conn
+
+
+def upsert_run(conn, case_num, act_ctrl):
+    """
+    Insert the run of this controller bundle, or update it if the bundle was analyzed before
+    Return the id of the run
+    """
+
+    # the active and standby controllers of a bundle are different runs
+    ctrl_name = controller.get_ctrl_dir_name(act_ctrl)
+    bundle_date, bundle_time = controller.get_bundle_details(act_ctrl)
+    conn.execute('''
+        INSERT INTO runs (case_num, controller, bundle_date, bundle_time, bundle_path, analyzed_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (case_num, controller, bundle_date, bundle_time)
+        DO UPDATE SET bundle_path = excluded.bundle_path, analyzed_at = excluded.analyzed_at
+        ''', (case_num or '', ctrl_name, bundle_date, bundle_time, act_ctrl, time.strftime('%Y-%m-%dT%H:%M:%S')))
+
+    return conn.execute('SELECT id FROM runs WHERE case_num = ? AND controller = ? AND bundle_date = ? '
+                        'AND bundle_time = ?', (case_num or '', ctrl_name, bundle_date, bundle_time)).fetchone()[0]
+
+
+def record_findings(db, case_num, act_ctrl, i2c_errors, smbus_errors, non_hcl_optics, ofad_errors, model_uptime):
+    """
+    Upsert the findings of one controller bundle
+    The findings of a previous run of the same bundle are replaced, so that rerunning a case never
+    leaves stale rows behind
+    """
+
+    conn = connect(db)
+    try:
+        with conn:
+            run_id = upsert_run(conn, case_num, act_ctrl)
+            for table in ('bursts', 'ofad_errors', 'optics', 'switches'):
+                conn.execute('DELETE FROM {} WHERE run_id = ?'.format(table), (run_id,))
+
+            for kind, errors in (('i2c', i2c_errors), ('smbus', smbus_errors)):
+                conn.executemany('''
+                    INSERT INTO bursts (run_id, switch, kind, started, ended, peak, window_secs)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (run_id, switch, kind, started) DO UPDATE SET ended = excluded.ended,
+                        peak = excluded.peak
+                    ''', [(run_id, switch, kind, general.epoch_to_timestamp(start), general.epoch_to_timestamp(end),
+                           peak, bursts.window)
+                          for switch, bursts in errors.items() for start, end, peak in bursts])
+
+            conn.executemany('''
+                INSERT INTO ofad_errors (run_id, switch, message, count) VALUES (?, ?, ?, ?)
+                ON CONFLICT (run_id, switch, message) DO UPDATE SET count = excluded.count
+                ''', [(run_id, switch, message.strip(), count)
+                      for switch, messages in ofad_errors.items() for message, count in messages.items()])
+
+            conn.executemany('''
+                INSERT INTO optics (run_id, switch, interface, model) VALUES (?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+                ''', [(run_id, switch, interface, model)
+                      for switch, int_model in non_hcl_optics.items() for interface, models in int_model.items()
+                      for model in models])
+
+            # the connection time and role of a switch can be missing
+            conn.executemany('''
+                INSERT INTO switches (run_id, switch, model, uptime, asic, connected_since, role)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (run_id, switch) DO UPDATE SET model = excluded.model, uptime = excluded.uptime,
+                    asic = excluded.asic, connected_since = excluded.connected_since, role = excluded.role
+                ''', [(run_id,) + tuple(info.fields()) for info in model_uptime])
+    finally:
+        conn.close()
+
+
+def switch_trend(conn, switch):
+    """
+    Return the findings of a switch in every run it was seen in, oldest bundle first
+    """
+
+    return conn.execute('''
+        SELECT r.case_num, r.controller, r.bundle_date, s.model, s.asic, s.uptime,
+            (SELECT COUNT(*) FROM bursts b WHERE b.run_id = r.id AND b.switch = :switch AND b.kind = 'i2c'),
+            (SELECT COUNT(*) FROM bursts b WHERE b.run_id = r.id AND b.switch = :switch AND b.kind = 'smbus'),
+            (SELECT COALESCE(MAX(b.peak), 0) FROM bursts b WHERE b.run_id = r.id AND b.switch = :switch),
+            (SELECT COALESCE(SUM(o.count), 0) FROM ofad_errors o WHERE o.run_id = r.id AND o.switch = :switch),
+            (SELECT COUNT(*) FROM optics p WHERE p.run_id = r.id AND p.switch = :switch)
+        FROM runs r
+        LEFT JOIN switches s ON s.run_id = r.id AND s.switch = :switch
+        WHERE r.id IN (SELECT run_id FROM switches WHERE switch = :switch
+                       UNION SELECT run_id FROM bursts WHERE switch = :switch
+                       UNION SELECT run_id FROM ofad_errors WHERE switch = :switch
+                       UNION SELECT run_id FROM optics WHERE switch = :switch)
+        ORDER BY r.bundle_date, r.bundle_time
+        ''', {'switch': switch}).fetchall()
+
+
+def findings_by_switch(conn, kind, case_num=None):
+    """
+    Return the switches with findings of the given kind across all the cases (or one case), the switches
+    seen in the most cases first
+    """
+
+    case_filter = 'AND r.case_num = :case' if case_num else ''
+    queries = {
+        'i2c': '''SELECT b.switch, COUNT(DISTINCT r.case_num), COUNT(DISTINCT r.id), COUNT(*), MAX(b.peak),
+                      MAX(b.started) FROM bursts b JOIN runs r ON r.id = b.run_id
+                  WHERE b.kind = 'i2c' {} GROUP BY b.switch''',
+        'smbus': '''SELECT b.switch, COUNT(DISTINCT r.case_num), COUNT(DISTINCT r.id), COUNT(*), MAX(b.peak),
+                        MAX(b.started) FROM bursts b JOIN runs r ON r.id = b.run_id
+                    WHERE b.kind = 'smbus' {} GROUP BY b.switch''',
+        'ofad': '''SELECT o.switch, COUNT(DISTINCT r.case_num), COUNT(DISTINCT r.id), SUM(o.count),
+                       COUNT(DISTINCT o.message), MAX(r.bundle_date) FROM ofad_errors o JOIN runs r ON r.id = o.run_id
+                   WHERE 1 {} GROUP BY o.switch''',
+        'optics': '''SELECT p.switch, COUNT(DISTINCT r.case_num), COUNT(DISTINCT r.id), COUNT(DISTINCT p.interface),
+                         GROUP_CONCAT(DISTINCT p.model), MAX(r.bundle_date) FROM optics p JOIN runs r ON r.id = p.run_id
+                     WHERE 1 {} GROUP BY p.switch''',
+        'model': '''SELECT s.model, COUNT(DISTINCT r.case_num), COUNT(DISTINCT r.id), COUNT(DISTINCT s.switch),
+                        MAX(s.asic), MAX(r.bundle_date) FROM switches s JOIN runs r ON r.id = s.run_id
+                    WHERE 1 {} GROUP BY s.model''',
+    }
+    query = queries[kind].format(case_filter) + ' ORDER BY 2 DESC, 4 DESC'
+
+    return conn.execute(query, {'case': case_num}).fetchall()
+
+
+def list_runs(conn, case_num=None):
+    """
+    Return the runs stored in the database, the most recent bundle first
+    """
+
+    return conn.execute('''
+        SELECT r.case_num, r.controller, r.bundle_date, r.bundle_time, r.analyzed_at,
+            (SELECT COUNT(*) FROM switches s WHERE s.run_id = r.id),
+            (SELECT COUNT(*) FROM bursts b WHERE b.run_id = r.id AND b.kind = 'i2c'),
+            (SELECT COUNT(*) FROM bursts b WHERE b.run_id = r.id AND b.kind = 'smbus')
+        FROM runs r WHERE :case IS NULL OR r.case_num = :case
+        ORDER BY r.bundle_date DESC, r.bundle_time DESC
+        ''', {'case': case_num}).fetchall()
+
+
+# headers of the tables returned by the queries above
+trend_headers = ['Case', 'Controller', 'Bundle date', 'Model', 'ASIC', 'Uptime', 'i2c bursts', 'smbus bursts',
+                 'Max peak', 'ofad errors', 'Non HCL optics']
+findings_headers = {
+    'i2c': ['Switch name', 'Cases', 'Runs', 'Bursts', 'Max peak', 'Last burst'],
+    'smbus': ['Switch name', 'Cases', 'Runs', 'Bursts', 'Max peak', 'Last burst'],
+    'ofad': ['Switch name', 'Cases', 'Runs', 'Occurences', 'Messages', 'Last bundle'],
+    'optics': ['Switch name', 'Cases', 'Runs', 'Interfaces', 'Models', 'Last bundle'],
+    'model': ['Model', 'Cases', 'Runs', 'Switches', 'ASIC', 'Last bundle'],
+}
+runs_headers = ['Case', 'Controller', 'Bundle date', 'Bundle time', 'Analyzed at', 'Switches', 'i2c bursts',
+                'smbus bursts']
+
+
+def show_history(db, switch=None, kind=None, case_num=None):
+    """
+    Display the trend of a switch, the switches with a kind of finding, or the runs stored in the database
+    """
+
+    if not os.path.exists(db):
+        print("No history found at {}, it is created by the first analysis".format(db))
+        return
+
+    conn = connect(db)
+    try:
+        if switch:
+            print("History of the switch {}:".format(switch))
+            logs.PrintFunctions().display_table(switch_trend(conn, switch), trend_headers)
+        elif kind:
+            print("Switches with {} findings{}:".format(kind, ' for case {}'.format(case_num) if case_num else ''))
+            logs.PrintFunctions().display_table(findings_by_switch(conn, kind, case_num), findings_headers[kind])
+        else:
+            print("Analyzed bundles{}:".format(' for case {}'.format(case_num) if case_num else ''))
+            logs.PrintFunctions().display_table(list_runs(conn, case_num), runs_headers)
+    finally:
+        conn.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the parser of the inventory hcl dumps of the switch files
+#
+# A switch file can contain many 'inventory hcl' dumps, the optics of the switch are the ones of the last dump.
+# The last dump is found by reading the file backwards from the end, in blocks, and only its table is parsed:
+# the lines after the 'inventory hcl' line (at most hcl_context) up to the next log line, the next dump or the
+# blank line ending the table. gzip files cannot be read backwards, they are read forwards keeping the last dump.
+# The first dump is found by reading forwards, for the changes between the first and the last dump.
+
+import gzip
+import regex
+import records
+
+# max number of lines of a dump after the 'inventory hcl' line, blank lines included (grep -B 100 in the shell check)
+hcl_context = 100
+# size of the blocks read backwards from the end of the file
+search_block = 1 << 20
+marker = b'inventory hcl'
+marker_text = marker.decode()
+
+
+def is_gzip(path):
+    with open(path, 'rb') as infile:
+        return infile.read(2) == b'\x1f\x8b'
+
+
+def line_start(infile, offset, block=search_block):
+    """
+    Return the offset of the start of the line containing offset
+    """
+
+    end = offset
+    while end > 0:
+        start = max(0, end - block)
+        infile.seek(start)
+        newline = infile.read(end - start).rfind(b'\n')
+        if newline != -1:
+            return start + newline + 1
+        end = start
+
+    return 0
+
+
+def last_dump_offset(infile, size, block=search_block):
+    """
+    Search the file backwards from the end, return the offset of the line of the last 'inventory hcl', None if
+    there is none
+    """
+
+    end = size
+    # the marker can straddle two blocks, the start of the block after is searched again
+    overlap = b''
+    while end > 0:
+        start = max(0, end - block)
+        infile.seek(start)
+        data = infile.read(end - start) + overlap
+        found = data.rfind(marker)
+        if found != -1:
+            return line_start(infile, start + found)
+        overlap = data[:len(marker) - 1]
+        end = start
+
+    return None
+
+
+def read_dump(lines):
+    """
+    Return the lines of the table of a dump, lines starts at the line after 'inventory hcl'
+    At most hcl_context lines are read, like the shell check
+    """
+
+    table = []
+    has_rows = False
+    for count, line in enumerate(lines):
+        if count == hcl_context or regex.timestamp_pattern.match(line) or marker_text in line:
+            break
+        if not line.strip():
+            # blank lines before the table are skipped, the first one after its rows ends it
+            if has_rows:
+                break
+            continue
+        table.append(line)
+        has_rows = has_rows or bool(regex.inventory_row_pattern.search(line))
+
+    return table
+
+
+def parse_dump(table):
+    """
+    Return [(interface, model, on the HCL)] for the rows of the table of a dump
+    """
+
+    rows = []
+    for line in table:
+        matches = regex.inventory_row_pattern.search(line)
+        if matches:
+            rows.append((matches.group('int'), matches.group('model'), matches.group('hcl') == 'Yes'))
+
+    return rows
+
+
+def decoded(lines):
+    for line in lines:
+        yield line.decode('utf-8', 'replace').rstrip('\n')
+
+
+def gzip_dumps(path):
+    """
+    Return the tables of the first and the last dump of a gzip file, read forwards
+    """
+
+    first = last = None
+    # the lines following the current dump
+    following = None
+    with gzip.open(path, 'rb') as infile:
+        for line in decoded(infile):
+            if marker_text in line:
+                if following is not None:
+                    last = read_dump(following)
+                    first = last if first is None else first
+                following = []
+            elif following is not None and len(following) < hcl_context:
+                following.append(line)
+    if following is not None:
+        last = read_dump(following)
+        first = last if first is None else first
+
+    return first, last
+
+
+def last_dump(path):
+    """
+    Return the rows of the last dump of a switch file, [] if there is none
+    """
+
+    if is_gzip(path):
+        return parse_dump(gzip_dumps(path)[1] or [])
+
+    with open(path, 'rb') as infile:
+        infile.seek(0, 2)
+        offset = last_dump_offset(infile, infile.tell())
+        if offset is None:
+            return []
+        infile.seek(offset)
+        infile.readline()
+        return parse_dump(read_dump(decoded(infile)))
+
+
+def first_dump(path):
+    """
+    Return the rows of the first dump of a switch file, [] if there is none
+    """
+
+    if is_gzip(path):
+        return parse_dump(gzip_dumps(path)[0] or [])
+
+    with open(path, 'rb') as infile:
+        for line in infile:
+            if marker in line:
+                return parse_dump(read_dump(decoded(infile)))
+
+    return []
+
+
+def first_and_last_dump(path):
+    """
+    Return the rows of the first and the last dump of a switch file, a gzip file is decompressed once
+    """
+
+    if is_gzip(path):
+        first, last = gzip_dumps(path)
+        return parse_dump(first or []), parse_dump(last or [])
+
+    return first_dump(path), last_dump(path)
+
+
+def non_hcl_optics(rows):
+    """
+    Return a records.Optics with the interfaces of the rows not on the HCL and their models
+    """
+
+    int_model = records.Optics()
+    for interface, model, on_hcl in rows:
+        if not on_hcl:
+            int_model.add(interface, model)
+
+    return int_model
+
+
+def find_non_hcl_optics(path):
+    """
+    Return a records.Optics with the non HCL optics of the last dump of a switch file
+    """
+
+    return non_hcl_optics(last_dump(path))
+
+
+def describe(row):
+    return '{} ({})'.format(row[1], 'HCL' if row[2] else 'non HCL') if row else '-'
+
+
+def find_optics_changes(path):
+    """
+    Return [interface, first dump, last dump] for the interfaces whose optics differ between the first and the last
+    dump of a switch file, [] if there is only one dump
+    """
+
+    first_rows, last_rows = first_and_last_dump(path)
+    first = {row[0]: row for row in first_rows}
+    last = {row[0]: row for row in last_rows}
+
+    interfaces = list(first) + [interface for interface in last if interface not in first]
+    return [[interface, describe(first.get(interface)), describe(last.get(interface))]
+            for interface in interfaces if first.get(interface) != last.get(interface)]
@@ -8,66 +8,186 @@
 # Handle multiple support bundles in the directory
 # Input can be either case number or path to a support bundle directory
 # Check for fabric errors
-# Check for continuously incrementing i2c and ismt_smbus errors (since we need to focus mainly on those errors) for the last 7 days, print when it happened
+# Check for bursts of i2c and ismt_smbus errors (since we need to focus mainly on those errors) for the last 7 days, print when they happened
 # Check for non-hcl optics used in the switches and for those interfaces, print the interface name and optics model
 # Check for critical, error, exception messages in switch ofad-debug logs for the last 7 days and print the no. of times it happened along with the message
 # Print the switch name, model, role, connected duration and uptime in a tabular format
 # Present the output in a single log file
+# Optionally estimate the switch errors from samples of the switch files first (--quick)
+# Optionally analyze the standby controllers concurrently and compare them with the active ones (--standby)
+# Optionally only list the bundles, controllers and roles found, without running the checks (--list)
+# Optionally run as a daemon ('jarvis.py daemon') keeping the caches warm between the jobs sent with 'jarvis.py submit'
 
+# imported first, the startup time is measured from here
+import timing
 import os
 import sys
 import argparse
+import lazy
 import logs
 import controller
-import checks
+import burst
+import pipeline
+import history
+import audit
+import engine
+import standby
 import time
+import io
+import subprocess
+from collections import OrderedDict
 from pathlib import Path
 
+# the checks (numpy, tqdm), the checkpoints (json), the caches (concurrent.futures) and the daemon are loaded when
+# they are first used, in the main thread, --help and submit do not pay for them
+checks = lazy.module('checks')
+checkpoint = lazy.module('checkpoint')
+dedupe = lazy.module('dedupe')
+futures = lazy.module('concurrent.futures')
+daemon = lazy.module('daemon')
+
 
 class CheckList:
     """
     Execute the below checklist.
     """
-    starttime = time.time()
-    logfiles = []
 
-    def __init__(self, active, case_num):
+    def __init__(self, active, case_num, burst_window=burst.burst_window, burst_threshold=burst.burst_threshold,
+                 chunk_size=pipeline.chunk_size, queue_depth=pipeline.queue_depth, history_db=history.default_db,
+                 quick=False, full_after=False, resume=False, audit_budget=None, engine_name=engine.default_engine,
+                 golden_dir=None, optics_changes=False, standby_ctrls=()):
+        # each daemon job has its own start time and log files
+        self.starttime = time.time()
+        self.logfiles = []
         self.active = active
         self.case_num = case_num
+        self.burst_window = burst_window
+        self.burst_threshold = burst_threshold
+        self.chunk_size = chunk_size
+        self.queue_depth = queue_depth
+        self.history_db = history_db
+        self.audit_budget = audit_budget
+        self.engine_name = engine_name
+        self.golden_dir = golden_dir
+        self.optics_changes = optics_changes
+        # active controller -> standby controller analyzed with it
+        self.standby = standby.pair_controllers(active, standby_ctrls)
+
+        # the same switch logs can be found under several bundles, fingerprint them before running the checks
+        with timing.phase('fingerprint the switch files'):
+            checks.find_duplicate_switch_files(self.active + list(self.standby.values()))
+
+        # the full reports save their results in checkpoints, load the results saved by an interrupted run first
+        self.checkpoints = {}
+        if not quick:
+            self.open_checkpoints(resume)
 
         for active_ctrls in self.active:
             # create a file name based on the controller name, date and time
             ctrl_file_name = controller.get_ctrl_name(active_ctrls, case_num)
             self.logfiles.append(ctrl_file_name)
-            # get bundle date and time it was collected
-            bundle_date, bundle_time = controller.get_bundle_details(active_ctrls)
-            print('')
-            msg = "Analyzing the bundle collected on {} at {}".format(bundle_date, bundle_time)
-            print(msg)
-            print('~' * len(msg))
+            self.show_bundle_date(active_ctrls)
+
+            # the report replaces the file of the previous run once complete
+            with logs.partial_report(ctrl_file_name) as report_file:
+                if quick:
+                    # estimate the switch errors from samples of the switch files, for a first answer
+                    with timing.phase('quick report {}'.format(controller.get_ctrl_dir_name(active_ctrls))):
+                        checks.show_fabric_error_warn(active_ctrls, 'errors', report_file)
+                        checks.check_switch_quick(active_ctrls, report_file, burst_window, burst_threshold,
+                                                  full_after)
+                else:
+                    self.full_report(active_ctrls, report_file)
+
+            print(".....Done.....")
+            print("")
+
+        # all the reports are complete, the checkpoints are no longer needed
+        for ckpt in self.checkpoints.values():
+            ckpt.remove()
+
+    def open_checkpoints(self, resume):
+        # the findings depend on these options, a checkpoint saved with other options is discarded
+        options = {'case_num': self.case_num, 'burst_window': self.burst_window,
+                   'burst_threshold': self.burst_threshold, 'engine': self.engine_name}
+        loaded = 0
+        for active_ctrls in self.active + list(self.standby.values()):
+            ckpt = checkpoint.Checkpoint(controller.get_ctrl_name(active_ctrls, self.case_num),
+                                         dict(options, active_ctrls=active_ctrls), resume)
+            if ckpt.resumed:
+                loaded += ckpt.load_results()
+            self.checkpoints[active_ctrls] = ckpt
+
+        if resume:
+            print("Resuming the interrupted run, {} switch file results loaded from the checkpoints".format(loaded))
             print('')
 
-            # erase the contents on the file if it was run previously
-            with open(ctrl_file_name, 'w'): pass
-            # execute the below check to find fabric errors
-            checks.show_fabric_error_warn(active_ctrls, 'errors', ctrl_file_name)
+    def show_bundle_date(self, active_ctrls):
+        # get bundle date and time it was collected
+        bundle_date, bundle_time = controller.get_bundle_details(active_ctrls)
+        print('')
+        msg = "Analyzing the bundle collected on {} at {}".format(bundle_date, bundle_time)
+        print(msg)
+        print('~' * len(msg))
+        print('')
 
-            checks.check_switch_details(active_ctrls, ctrl_file_name)
+    def full_report(self, active_ctrls, ctrl_file_name):
+        standby_ctrls = self.standby.get(active_ctrls)
+        if not standby_ctrls:
+            self.controller_report(active_ctrls, ctrl_file_name)
+            return
+
+        # the standby report is written by another thread, the switch files shared by the bundles are scanned once
+        standby_file_name = controller.get_ctrl_name(standby_ctrls, self.case_num)
+        self.logfiles.append(standby_file_name)
+        print("Analyzing the standby controller {} at the same time".format(standby_ctrls))
+        # what each thread prints is kept until both reports are done, so that the two outputs do not interleave
+        logs.route_output()
+        outputs = OrderedDict((ctrls, io.StringIO()) for ctrls in (active_ctrls, standby_ctrls))
+        try:
+            with logs.partial_report(standby_file_name) as standby_report:
+                with futures.ThreadPoolExecutor(max_workers=2) as pool:
+                    active_findings = pool.submit(logs.with_output(self.controller_report, outputs[active_ctrls]),
+                                                  active_ctrls, ctrl_file_name)
+                    standby_findings = pool.submit(logs.with_output(self.controller_report, outputs[standby_ctrls]),
+                                                   standby_ctrls, standby_report)
+                    active_findings, standby_findings = active_findings.result(), standby_findings.result()
+        finally:
+            # printed to the output of the daemon job, if any
+            for ctrls, output in outputs.items():
+                print('')
+                print("Analysis of the controller {}:".format(controller.get_ctrl_dir_name(ctrls)))
+                print(output.getvalue(), end='')
+
+        checks.log_standby_diff(active_ctrls, standby_ctrls, ctrl_file_name, active_findings, standby_findings)
+
+    def controller_report(self, active_ctrls, ctrl_file_name):
+        ckpt = self.checkpoints[active_ctrls]
+        # save the result of every switch file scanned, as soon as it is computed
+        dedupe.current.result_listeners.append(ckpt.save_result)
+        try:
+            with timing.phase('report {}'.format(controller.get_ctrl_dir_name(active_ctrls))):
+                # execute the below check to find fabric errors
+                checks.show_fabric_error_warn(active_ctrls, 'errors', ctrl_file_name)
 
-            print(".....Done.....")
-            print("")
+                return checks.check_switch_details(active_ctrls, ctrl_file_name, self.burst_window,
+                                                   self.burst_threshold, self.chunk_size, self.queue_depth,
+                                                   self.case_num, self.history_db, ckpt, self.audit_budget,
+                                                   self.engine_name, self.golden_dir, self.optics_changes)
+        finally:
+            dedupe.current.result_listeners.remove(ckpt.save_result)
 
 
 class LogFiles(CheckList):
     """
-    Inherit the log files and starttime from the parent class CheckList
+    Show the log files written by the CheckList(s) of a run
     """
 
     @classmethod
-    def show_log_files(cls):
-        logs.PrintFunctions().display_log_files(cls.logfiles)
+    def show_log_files(cls, logfiles, starttime):
+        logs.PrintFunctions().display_log_files(logfiles)
 
-        print('The analysis took {} seconds'.format(time.time() - cls.starttime))
+        print('The analysis took {} seconds'.format(time.time() - starttime))
         print('')
 
 
@@ -180,23 +300,128 @@ class UserinputPathcheck:
         return self.corrected_path
 
 
-if __name__ == '__main__':
+def show_history(args):
+    """
+    Handle 'jarvis.py history': query the findings recorded by the previous runs
+    """
 
-    # Get the case number from user and check if the directory with the case number exists.
-    # After the check passes, proceed to find the controller directories in the case directory
+    parser = argparse.ArgumentParser(prog='jarvis.py history',
+                                     description='query the findings recorded by the previous runs')
+    parser.add_argument("-s", "--switch", action='store', help="Show the history of a switch")
+    parser.add_argument("-k", "--kind", action='store', choices=sorted(history.findings_headers),
+                        help="Show the switches with this kind of finding across the cases")
+    parser.add_argument("-c", "--case-num", action='store', help="Restrict the query to a case number")
+    parser.add_argument("--history-db", action='store', default=history.default_db,
+                        help="Path to the history database")
+    history_input = parser.parse_args(args)
 
-    parser = argparse.ArgumentParser(description='support bundle analyzer script')
-    # the user could provide a case number or path to a support bundle
-    inp = parser.add_mutually_exclusive_group(required=True)
+    history.show_history(history_input.history_db, history_input.switch, history_input.kind,
+                         history_input.case_num)
 
-    inp.add_argument("-c", "--case-num", action='store', default=False, help="Enter the case number")
-    inp.add_argument("-p", "--path", action='store', default=False,
-                     help="Enter the path to the support bundle")
 
-    user_input = parser.parse_args()
+def add_check_arguments(parser):
+    """
+    Add the options of the checks, shared by the analysis and 'jarvis.py submit'
+    """
 
-    case_number = user_input.case_num
-    bundle_path = user_input.path
+    # the i2c/smbus errors are reported when there are more than <threshold> errors within <window> seconds
+    parser.add_argument("--burst-window", action='store', type=int, default=burst.burst_window,
+                        help="Length in seconds of the window used to find i2c/smbus error bursts")
+    parser.add_argument("--burst-threshold", action='store', type=int, default=burst.burst_threshold,
+                        help="Number of i2c/smbus errors within the window above which it is a burst")
+    # the switch files are read ahead in chunks while the previous chunks are being parsed
+    parser.add_argument("--chunk-size", action='store', type=int, default=pipeline.chunk_size >> 20,
+                        help="Size in MB of the chunks read ahead from the switch files")
+    parser.add_argument("--queue-depth", action='store', type=int, default=pipeline.queue_depth,
+                        help="Number of chunks read ahead of the parsers")
+    # the findings are recorded in a local database, query it with 'jarvis.py history'
+    parser.add_argument("--history-db", action='store', default=history.default_db,
+                        help="Path to the history database")
+    parser.add_argument("--no-history", action='store_true', help="Do not record the findings in the history")
+    # for a first answer, estimate the switch errors from samples of the switch files
+    parser.add_argument("--quick", action='store_true',
+                        help="Estimate the i2c, smbus and ofad errors from samples of the switch files")
+    parser.add_argument("--full-after", action='store_true',
+                        help="With --quick, start a full scan in the background once the quick report is written, "
+                             "the full report replaces the quick one when done")
+    # on noisy controllers, summarize the audit logs in bounded memory instead of holding all the commands
+    parser.add_argument("--audit-budget", action='store', type=int, default=None,
+                        help="Summarize the audit logs keeping at most this many (user, command) counts in memory, "
+                             "the overflow is spilled to temporary files (eg: {})".format(audit.max_keys))
+    # the switch checks run grep/awk pipelines or the native scanners, 'both' compares them
+    parser.add_argument("--engine", action='store', choices=engine.engines, default=engine.default_engine,
+                        help="Implementation of the switch checks, 'both' runs the two and reports the differences")
+    parser.add_argument("--golden-dir", action='store', default=None,
+                        help="With --engine both, directory of the golden results the engines are compared with")
+    # the non HCL optics are the ones of the last inventory dump, the changes since the first one can be logged
+    parser.add_argument("--optics-changes", action='store_true',
+                        help="Log the optics that changed between the first and the last inventory dump")
+    # the standby controllers are analyzed at the same time as the active ones and compared with them
+    parser.add_argument("--standby", action='store_true',
+                        help="Also analyze the standby controllers and report their differences with the active ones")
+    # the results are saved while the checks run, an interrupted run can be resumed
+    parser.add_argument("--resume", action='store_true',
+                        help="Resume an interrupted run, skipping the switch files and checks already done")
+
+
+def check_options(user_input):
+    """
+    Return the options of the analysis for the parsed options: the keyword arguments of CheckList and 'standby'
+    """
+
+    return {'burst_window': user_input.burst_window, 'burst_threshold': user_input.burst_threshold,
+            'chunk_size': user_input.chunk_size << 20, 'queue_depth': user_input.queue_depth,
+            'history_db': None if user_input.no_history else user_input.history_db,
+            'quick': user_input.quick, 'full_after': user_input.quick and user_input.full_after,
+            'resume': user_input.resume, 'audit_budget': user_input.audit_budget,
+            'engine_name': user_input.engine, 'standby': user_input.standby,
+            'golden_dir': os.path.abspath(user_input.golden_dir) if user_input.golden_dir else None,
+            'optics_changes': user_input.optics_changes}
+
+
+def full_scan_args(case_number, bundle_path, options):
+    """
+    Return the arguments of jarvis.py running the full scan of a quick run with the same options
+    """
+
+    args = ['-c', case_number] if case_number else ['-p', bundle_path]
+    args += ['--burst-window', str(options['burst_window']), '--burst-threshold', str(options['burst_threshold']),
+             '--chunk-size', str(options['chunk_size'] >> 20), '--queue-depth', str(options['queue_depth']),
+             '--engine', options['engine_name']]
+    args += ['--history-db', options['history_db']] if options['history_db'] else ['--no-history']
+    if options['audit_budget'] is not None:
+        args += ['--audit-budget', str(options['audit_budget'])]
+    if options['golden_dir']:
+        args += ['--golden-dir', options['golden_dir']]
+    for name in ('optics_changes', 'standby'):
+        if options[name]:
+            args.append('--' + name.replace('_', '-'))
+
+    return args
+
+
+def start_full_scan(case_number, bundle_path, options, logfiles):
+    """
+    Run the full scan of a quick run in the background, in a new jarvis.py process that outlives this one
+    """
+
+    # next to the log files, named after the first one
+    out_file = os.path.splitext(logfiles[0])[0] + '.full-scan.out'
+    with open(out_file, 'w') as outfile:
+        scan = subprocess.Popen([sys.executable, os.path.abspath(__file__)] +
+                                full_scan_args(case_number, bundle_path, options),
+                                stdin=subprocess.DEVNULL, stdout=outfile, stderr=subprocess.STDOUT,
+                                start_new_session=True)
+    print("The full scan is running in the background (pid {}), the full reports will replace the quick ones "
+          "above when done".format(scan.pid))
+    print("Its output is written to {}".format(os.path.abspath(out_file)))
+    print('')
+
+
+def find_bundles(case_number, bundle_path):
+    """
+    Return the support bundle locations for the case number or the path, exit if none is found
+    """
 
     valid_path = None
     if case_number:
@@ -231,39 +456,218 @@ if __name__ == '__main__':
         for each_path in valid_path:
             print("-----> {}".format(each_path))
 
-    # find the controller directories in the found paths
-    for each_dir in valid_path:
-        ctrl_dirs, num_of_bundles = DirValidation().find_controller_directories(each_dir)
-        if ctrl_dirs:
-            print('')
-            print('Now analyzing the location {} ...'.format(each_dir))
-            print('')
-            if num_of_bundles > 1:
-                print("It looks like there are more than one support bundles at {}\n".format(each_dir))
-                print("All bundles will be analyzed.")
-        else:
-            print("Support bundle(s) found at {}".format(each_dir))
-            print("/cli directory is not available under the controller directory... bundle could be corrupted\n"
-                  "Please try untarring the bundle again or ask the customer to re-upload the support bundle...\n"
-                  "### ERROR ### The script cannot proceed\n")
-            print("Exiting...")
-            sys.exit(-1)
+    return valid_path
 
-        # find the active and standby controller directory and setup logfile for active controller(s)
-        active = controller.find_ctrl_roles('active', ctrl_dirs)
-        print("Please find below the active controller directory for all the support bundles")
-        if active:
-            for ctrls in active:
-                print("The Active controller is at {}".format(ctrls))
-        else:
-            print("No Active controller directory found")
 
+def discover_location(each_dir):
+    """
+    Return the controller directories, the number of bundles and the active controller directories at a location
+    """
+
+    ctrl_dirs, num_of_bundles = DirValidation().find_controller_directories(each_dir)
+    active = controller.find_ctrl_roles('active', ctrl_dirs) if ctrl_dirs else []
+
+    return ctrl_dirs, num_of_bundles, active
+
+
+def analyze_location(each_dir, case_number, options, discover=discover_location):
+    """
+    Execute the checks on the active controller(s) found at a location, exit if the bundle is corrupted
+    """
+
+    with timing.phase('discovery'):
+        ctrl_dirs, num_of_bundles, active = discover(each_dir)
+    if ctrl_dirs:
         print('')
+        print('Now analyzing the location {} ...'.format(each_dir))
+        print('')
+        if num_of_bundles > 1:
+            print("It looks like there are more than one support bundles at {}\n".format(each_dir))
+            print("All bundles will be analyzed.")
+    else:
+        print("Support bundle(s) found at {}".format(each_dir))
+        print("/cli directory is not available under the controller directory... bundle could be corrupted\n"
+              "Please try untarring the bundle again or ask the customer to re-upload the support bundle...\n"
+              "### ERROR ### The script cannot proceed\n")
+        print("Exiting...")
+        sys.exit(-1)
+
+    # show the active controller directory and setup logfile for active controller(s)
+    print("Please find below the active controller directory for all the support bundles")
+    if active:
+        for ctrls in active:
+            print("The Active controller is at {}".format(ctrls))
+    else:
+        print("No Active controller directory found")
+
+    # the standby controllers are only looked for when they are analyzed too
+    options = dict(options)
+    standby_ctrls = []
+    if options.pop('standby', False):
+        with timing.phase('discovery'):
+            standby_ctrls = controller.find_ctrl_roles('standby', ctrl_dirs)
+        for ctrls in standby_ctrls:
+            print("The Standby controller is at {}".format(ctrls))
+        if not standby_ctrls:
+            print("No Standby controller directory found")
+
+    print('')
+
+    # execute the checks
+    return CheckList(active, case_number, standby_ctrls=standby_ctrls, **options)
+
+
+def list_location(each_dir):
+    """
+    Print the bundles and the controllers found at a location with their role, without running any check
+    """
+
+    ctrl_dirs, num_of_bundles = DirValidation().find_controller_directories(each_dir)
+    print('')
+    print('{} support bundle(s) found at {}'.format(num_of_bundles, each_dir))
+    if not ctrl_dirs:
+        print("/cli directory is not available under the controller directory... bundle could be corrupted")
+        return
+
+    for ctrl_dir in sorted(ctrl_dirs):
+        bundle_date, bundle_time = controller.get_bundle_details(ctrl_dir)
+        print("  {} collected on {} at {}".format(ctrl_dir.rstrip('/').split('/')[-2], bundle_date, bundle_time))
+        print("    controller {} role {} version {}".format(controller.get_ctrl_dir_name(ctrl_dir),
+                                                            controller.get_ctrl_role(ctrl_dir) or 'unknown',
+                                                            controller.get_sw_ver(ctrl_dir) or 'unknown'))
+
+
+def run_job(case_number, bundle_path, options, discover=discover_location, output=None):
+    """
+    Analyze all the bundles of the case number or the path and return the log files written and the start time
+    of the analysis
+    The daemon passes the output of the job, what the job prints is sent to it
+    """
+
+    # the daemon runs several jobs, each of them has its own timing report
+    timing.reset()
+    logfiles = []
+    starttime = None
+    with logs.output_to(output):
+        for each_dir in find_bundles(case_number, bundle_path):
+            checklist = analyze_location(each_dir, case_number, options, discover)
+            logfiles += checklist.logfiles
+            starttime = starttime or checklist.starttime
+
+    return logfiles, starttime
+
+
+def run_daemon(args):
+    """
+    Handle 'jarvis.py daemon': run the analysis jobs submitted with 'jarvis.py submit'
+    """
+
+    parser = argparse.ArgumentParser(prog='jarvis.py daemon',
+                                     description='run the analysis jobs submitted with jarvis.py submit')
+    parser.add_argument("--socket", action='store', default=daemon.default_socket,
+                        help="Path to the Unix socket of the daemon")
+    parser.add_argument("--cache-size", action='store', type=int, default=daemon.max_results,
+                        help="Number of per-file check results kept in memory between the jobs")
+    daemon_input = parser.parse_args(args)
+
+    return daemon.serve(run_job, discover_location, daemon_input.socket, daemon_input.cache_size)
+
 
-        # execute the checks
-        CheckList(active, case_number)
+def submit_job(args):
+    """
+    Handle 'jarvis.py submit': send an analysis job to the daemon and show its progress and report
+    """
+
+    parser = argparse.ArgumentParser(prog='jarvis.py submit', description='send an analysis job to the daemon')
+    inp = parser.add_mutually_exclusive_group(required=True)
+    inp.add_argument("-c", "--case-num", action='store', default=False, help="Enter the case number")
+    inp.add_argument("-p", "--path", action='store', default=False,
+                     help="Enter the path to the support bundle")
+    inp.add_argument("--status", action='store_true', help="Show the running and waiting jobs")
+    inp.add_argument("--stop", action='store_true', help="Stop the daemon once the running job is done")
+    parser.add_argument("--priority", action='store', type=int, default=daemon.default_priority,
+                        help="Priority of the job, the jobs with the lowest priority run first")
+    parser.add_argument("--socket", action='store', default=daemon.default_socket,
+                        help="Path to the Unix socket of the daemon")
+    add_check_arguments(parser)
+    submit_input = parser.parse_args(args)
+
+    if submit_input.status:
+        request = {'action': 'status'}
+    elif submit_input.stop:
+        request = {'action': 'stop'}
+    else:
+        # the daemon runs in its own directory, send an absolute path
+        bundle_path = submit_input.path
+        if bundle_path:
+            bundle_path = os.path.abspath(UserinputPathcheck(bundle_path).correct_the_path())
+        request = {'action': 'submit', 'case_num': submit_input.case_num, 'path': bundle_path,
+                   'priority': submit_input.priority, 'options': check_options(submit_input)}
+
+    return daemon.submit(request, submit_input.socket)
+
+
+if __name__ == '__main__':
+
+    # 'jarvis.py history ...' queries the findings of the previous runs without analyzing any bundle
+    if len(sys.argv) > 1 and sys.argv[1] == 'history':
+        show_history(sys.argv[2:])
+        sys.exit(0)
+    # 'jarvis.py daemon ...' keeps the caches warm between the jobs sent with 'jarvis.py submit ...'
+    if len(sys.argv) > 1 and sys.argv[1] == 'daemon':
+        sys.exit(run_daemon(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'submit':
+        sys.exit(submit_job(sys.argv[2:]))
+
+    # Get the case number from user and check if the directory with the case number exists.
+    # After the check passes, proceed to find the controller directories in the case directory
+
+    parser = argparse.ArgumentParser(description='support bundle analyzer script')
+    # the user could provide a case number or path to a support bundle
+    inp = parser.add_mutually_exclusive_group(required=True)
+
+    inp.add_argument("-c", "--case-num", action='store', default=False, help="Enter the case number")
+    inp.add_argument("-p", "--path", action='store', default=False,
+                     help="Enter the path to the support bundle")
+    add_check_arguments(parser)
+    # only look for the bundles and controllers, the checks are not run
+    parser.add_argument("--list", action='store_true',
+                        help="List the bundles, controllers and roles found without running the checks")
+    # the time spent in each phase of the run, from the startup to the reports
+    parser.add_argument("--timing", action='store_true',
+                        help="Show the time spent in each phase of the run, the scan throughputs and slowest files")
+    parser.add_argument("--timing-file", action='store', default=None,
+                        help="Export the time spent in each phase of the run to this JSON file")
 
-    # finally display all the logfiles
-    LogFiles.show_log_files()
+    user_input = parser.parse_args()
+    startup_secs = time.perf_counter() - timing.origin
+
+    if user_input.list:
+        timing.reset()
+        with timing.phase('discovery'):
+            for each_dir in find_bundles(user_input.case_num, user_input.path):
+                list_location(each_dir)
+        print('')
+    else:
+        options = check_options(user_input)
+        logfiles, starttime = run_job(user_input.case_num, user_input.path, options)
+
+        # finally display all the logfiles
+        LogFiles.show_log_files(logfiles, starttime)
+        if options['full_after'] and logfiles:
+            start_full_scan(user_input.case_num, user_input.path, options, logfiles)
+
+    # imports and argument parsing, run_job resets the phases
+    timing.add('startup', startup_secs, timing.origin)
+    if user_input.timing:
+        print('Time spent in each phase of the run:')
+        logs.PrintFunctions().display_table(timing.rows(), ['Phase', 'Started at (s)', 'Seconds'])
+        if timing.scans:
+            print('Throughput of the switch file scans:')
+            logs.PrintFunctions().display_table(*timing.scan_table())
+            print('Slowest files:')
+            logs.PrintFunctions().display_table(timing.slowest_files(), timing.slow_file_headers)
+    if user_input.timing_file:
+        timing.export(user_input.timing_file)
 
     sys.exit(0)
@@ -0,0 +1,44 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the lazy imports of the heavy modules
+#
+# tabulate, tqdm and the checks (numpy) take most of the startup time. They are loaded on their first use, so
+# the runs that fail on a wrong case number or only list the bundles (--list) do not pay for them.
+
+import importlib.util
+import sys
+
+
+def module(name):
+    """
+    Return the module, loaded when one of its attributes is first used
+    The loading is not thread-safe, the first use has to be in the main thread
+    """
+
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named '{}'".format(name), name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    lazy_module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = lazy_module
+    loader.exec_module(lazy_module)
+
+    return lazy_module
+
+
+# the report tables and progress bars are also drawn by the standby report thread, these are regular imports
+# (guarded by the import lock) done on the first call
+def tabulate(*args, **kwargs):
+    from tabulate import tabulate as tabulate_func
+    return tabulate_func(*args, **kwargs)
+
+
+def tqdm(*args, **kwargs):
+    from tqdm import tqdm as tqdm_class
+    return tqdm_class(*args, **kwargs)
@@ -4,7 +4,106 @@
 # this script is a part of support bundle analyzer script
 # this contains all print related functions
 
-from tabulate import tabulate
+import os
+import sys
+import threading
+from contextlib import contextmanager
+# tabulate is loaded on its first use
+from lazy import tabulate
+
+# functions called with the log file before a new section header is written to it and when the report is
+# complete, the daemon uses them to stream the finished sections of the report to the client
+section_listeners = []
+
+# the reports are written to <log file>.partial and renamed once complete
+partial_suffix = '.partial'
+
+# the stream the thread prints to, set for the threads running a daemon job
+job_output = threading.local()
+
+
+class ThreadOutput:
+    """
+    sys.stdout of the daemon: what a thread running a job prints goes to the output of the job, the rest (the
+    other threads) to the console
+    """
+
+    def __init__(self, console):
+        self.console = console
+
+    def stream(self):
+        return getattr(job_output, 'stream', None) or self.console
+
+    def write(self, text):
+        return self.stream().write(text)
+
+    def flush(self):
+        self.stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream(), name)
+
+
+@contextmanager
+def output_to(stream):
+    """
+    Send what the thread prints to stream (None for the console), when sys.stdout is a ThreadOutput
+    """
+
+    previous = getattr(job_output, 'stream', None)
+    job_output.stream = stream
+    try:
+        yield
+    finally:
+        job_output.stream = previous
+
+
+def route_output():
+    """
+    Replace sys.stdout with a ThreadOutput, if it is not one already
+    """
+
+    if not isinstance(sys.stdout, ThreadOutput):
+        sys.stdout = ThreadOutput(sys.stdout)
+
+
+def with_output(func, stream=None):
+    """
+    Return func printing to stream, by default the stream of the calling thread (for the threads started while
+    running a job)
+    """
+
+    stream = stream or getattr(job_output, 'stream', None)
+
+    def run(*args, **kwargs):
+        with output_to(stream):
+            return func(*args, **kwargs)
+
+    return run
+
+
+def notify_section_listeners(logfile):
+    for listener in section_listeners:
+        listener(logfile)
+
+
+@contextmanager
+def partial_report(logfile):
+    """
+    Yield the partial file to write the report to, it replaces the log file once the report is complete
+    The previous log file is left untouched if the report is interrupted
+    """
+
+    partial_file = logfile + partial_suffix
+    with open(partial_file, 'w'): pass
+    try:
+        yield partial_file
+        # the last section has no header after it
+        notify_section_listeners(partial_file)
+        os.replace(partial_file, logfile)
+    finally:
+        if os.path.exists(partial_file):
+            os.remove(partial_file)
 
 
 class PrintFunctions:
@@ -23,12 +122,33 @@ class PrintFunctions:
             print("       * {}".format(file))
             print("")
 
+    def display_throughput(self, stats):
+        """
+        Display the throughput of each stage of the read-ahead pipeline
+        """
+
+        print(tabulate(stats, headers=['Stage', 'MB', 'Busy (s)', 'Waiting (s)', 'MB/s busy', 'MB/s wall'],
+                       tablefmt='simple'))
+        print('')
+
+    def display_table(self, rows, headers):
+        """
+        Display rows in a table on the console
+        """
+
+        if not rows:
+            print(self.none_msg)
+        else:
+            print(tabulate(rows, headers=headers, tablefmt='grid'))
+        print('')
+
     def print_output_table(self, logfile, output):
         """
-        Function to log switch name, model and uptime
+        Function to log switch name, model and uptime, output is a list of records.SwitchInfo
         """
 
-        table = tabulate(output, headers=['Switch Name', 'Model', 'Uptime', 'ASIC type', 'Connected since', 'Role'],
+        table = tabulate([info.row() for info in output],
+                         headers=['Switch Name', 'Model', 'Uptime', 'ASIC type', 'Connected since', 'Role'],
                          tablefmt='grid', colalign=("center", "center", "center", "center", "center", "center",))
 
         with open(logfile, 'a') as outfile:
@@ -62,6 +182,50 @@ class PrintFunctions:
                 with open(logfile, 'a') as outfile:
                     outfile.write(' '.join(str(s) for s in line) + '\n')
 
+    def print_output_audit_stream(self, logfile, output):
+        """
+        Function to print commands executed by the customer as they are found
+        output is an iterable of commands for the last month and one for the current month
+        """
+
+        titles = ['<---- Commands for the last month', '<---- Commands for the current Month']
+        with open(logfile, 'a') as outfile:
+            for title, item in zip(titles, output):
+                if title is not titles[0]:
+                    outfile.write('\n')
+                outfile.write(title)
+                outfile.write('\n\n')
+                empty = True
+                for line in item:
+                    outfile.write(' '.join(str(s) for s in line) + '\n')
+                    empty = False
+                # if there were no commands
+                if empty:
+                    outfile.write('~~~~~ No commands executed ~~~~~')
+                    outfile.write('\n')
+
+    def print_output_audit_summary(self, logfile, commands, users, num_users):
+        """
+        Function to print the most executed commands and the users who executed the most commands
+        """
+
+        with open(logfile, 'a') as outfile:
+            outfile.write('\n')
+            outfile.write('<---- Most executed commands')
+            outfile.write('\n\n')
+            if commands:
+                outfile.write(tabulate(commands, headers=['User', 'Command', 'Count'], tablefmt='grid'))
+            else:
+                outfile.write('~~~~~ No commands executed ~~~~~')
+            outfile.write('\n\n')
+            outfile.write('<---- Commands per user ({} of {} users)'.format(len(users), num_users))
+            outfile.write('\n\n')
+            if users:
+                outfile.write(tabulate(users, headers=['User', 'Commands', 'Distinct commands'], tablefmt='grid'))
+            else:
+                outfile.write('~~~~~ No commands executed ~~~~~')
+            outfile.write('\n')
+
     @classmethod
     def print_output_dict(cls, logfile, output):
         """
@@ -85,12 +249,29 @@ class PrintFunctions:
                 outfile.write(table)
                 outfile.write('\n')
 
+    @classmethod
+    def print_output_optics_changes(cls, logfile, output):
+        """
+        Function to log the optics changes of each switch, output is {switch: [[interface, first, last]]}
+        """
+
+        with open(logfile, 'a') as outfile:
+            if not output:
+                outfile.write(cls.none_msg)
+                outfile.write('\n')
+                return
+
+            rows = [[switch_name] + change for switch_name, changes in output.items() for change in changes]
+            outfile.write(tabulate(rows, headers=['Switch name', 'Interface', 'First dump', 'Last dump'],
+                                   tablefmt='grid'))
+            outfile.write('\n')
+
     @classmethod
     def print_output_dict_simple(cls, logfile, output):
         """
         Function to print a simple dictionary in the following format
         'key'
-        'value' <--- type list
+        'value' <--- type records.Bursts
         """
 
         # if the input dict is empty, just log "None"
@@ -103,7 +284,7 @@ class PrintFunctions:
 
             for k, v in output.items():
                 inside_list = [k]
-                converted = str(sum(v, [])).strip('[]')
+                converted = str(v.formatted()).strip('[]')
                 inside_list.append(converted)
                 full_list.append(inside_list)
             table = tabulate(full_list, headers=['Switch name', 'Timeframe of errors'],
@@ -138,11 +319,109 @@ class PrintFunctions:
                             outfile.write("[{}] - {}".format(str(j).center(5), i))
                             outfile.write('\n')
 
+    @classmethod
+    def print_output_fabric(cls, logfile, output):
+        """
+        Function to log the fabric-wide error bursts, the top bursts and the errors per switch per day
+        """
+
+        with open(logfile, 'a') as outfile:
+            # if no switch has errors, just log "None"
+            if not output['histogram']:
+                outfile.write(cls.none_msg)
+                outfile.write('\n')
+                return
+
+            outfile.write('Windows where multiple switches had a burst of errors at the same time '
+                          '(bins of {} seconds):\n\n'.format(output['bin_seconds']))
+            if output['windows']:
+                table = tabulate(output['windows'], headers=['From', 'To', 'Switches', 'Errors', 'Switch names'],
+                                 tablefmt='grid', colalign=("center", "center", "center", "center", "left",))
+                outfile.write(table)
+            else:
+                outfile.write(cls.none_msg)
+            outfile.write('\n\n')
+
+            outfile.write('Top bursts:\n\n')
+            table = tabulate(output['top'], headers=['Switch name', 'Bin start', 'Errors'],
+                             tablefmt='grid', colalign=("center", "center", "center",))
+            outfile.write(table)
+            outfile.write('\n\n')
+
+            outfile.write('Errors per switch per day:\n\n')
+            # oldest day first
+            headers = ['Switch name'] + output['dates'][::-1] + ['Total']
+            table = tabulate(output['histogram'], headers=headers, tablefmt='grid')
+            outfile.write(table)
+            outfile.write('\n')
+
+    @classmethod
+    def print_output_quick(cls, logfile, output, full_after=False):
+        """
+        Function to log the error counts estimated from the samples of the switch files
+        """
+
+        with open(logfile, 'a') as outfile:
+            if not output:
+                outfile.write(cls.none_msg)
+                outfile.write('\n')
+                return
+
+            table = tabulate(output, headers=['Switch name', 'Window (MB)', 'Sampled (%)', 'i2c errors',
+                                              'smbus errors', 'ofad errors', 'Bursts in samples', 'Full scan needed'],
+                             tablefmt='grid', colalign=("center",) * 8)
+            outfile.write(table)
+            outfile.write('\n\n')
+            outfile.write('~N (LOW-HIGH) is the number extrapolated from the samples with its 95% confidence bounds, '
+                          'a plain number is an exact count\n')
+            if any(str(cell).endswith('*') for row in output for cell in row):
+                outfile.write('* the file is not in time order, its window was found with a linear scan and the '
+                              'bounds are wider\n')
+            if full_after:
+                outfile.write('A full scan is running in the background, this report will be replaced by the full '
+                              'report when it is done\n')
+
+    @classmethod
+    def print_output_engine(cls, logfile, rows, differences):
+        """
+        Function to log the timings of the shell and native checks and the files where their results differ
+        """
+
+        with open(logfile, 'a') as outfile:
+            if not rows:
+                outfile.write(cls.none_msg)
+                outfile.write('\n')
+                return
+
+            outfile.write(tabulate(rows, headers=['Check', 'Files', 'Shell (s)', 'Native (s)', 'Speedup',
+                                                  'Differences'], tablefmt='grid'))
+            outfile.write('\n\n')
+            if differences:
+                outfile.write(tabulate(differences, headers=['Check', 'File', 'Expected', 'Got'], tablefmt='grid'))
+            else:
+                outfile.write('~~~~~ The results are identical ~~~~~')
+            outfile.write('\n')
+
+    @classmethod
+    def print_output_standby(cls, logfile, rows):
+        """
+        Function to log the findings that differ between the active and the standby controller
+        """
+
+        with open(logfile, 'a') as outfile:
+            if not rows:
+                outfile.write('~~~~~ The findings are identical ~~~~~')
+            else:
+                outfile.write(tabulate(rows, headers=['Finding', 'Item', 'Active', 'Standby'], tablefmt='grid'))
+            outfile.write('\n')
+
     def print_header(self, logfile, msg):
         """
         To print headers like "Fabric errors" etc...
         """
 
+        notify_section_listeners(logfile)
+
         with open(logfile, 'a') as outfile:
             outfile.write('\n')
             outfile.write('<------- {} -------->'.format(msg))
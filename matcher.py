@@ -0,0 +1,196 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the combined line matcher built from the rules in regex.py
+#
+# Instead of running one grep per rule, all the rules are compiled into a single literal prefilter.
+# One pass of the prefilter over a block of text finds the candidate lines, and only those lines are
+# confirmed with the rule's own regex. Each line is classified once, whatever the number of rules.
+#
+# Run it directly to benchmark the rules on a switch file:
+#   python3 matcher.py <path to switch file> [date ...]
+
+import re
+import sys
+import time
+import regex
+
+
+def line_rules(dates=None):
+    """
+    Return the line-level rules of the switch checks as (name, literals, confirm pattern)
+    A line is a candidate for a rule when it contains one of its literals, the confirm pattern (if any) decides.
+    Rules without literals are qualifiers: they are only evaluated on the lines matching another rule.
+    The literals of different rules must not overlap, since the prefilter returns non-overlapping hits
+    """
+
+    rules = [
+        ('ofad', ('exception [', 'error [', 'critical ['), None),
+        ('i2c', ('i2c-',), regex.i2c_error_pattern),
+        ('smbus', ('ERR ismt_smbus',), None),
+        # the rows of the inventory hcl tables are parsed by inventory.py, 'No' would make most lines candidates
+        ('inventory', ('inventory hcl',), None),
+        ('model_uptime', ('Model', 'uptime'), regex.model_uptime_line_pattern),
+        ('icmpa', (), regex.icmpa_pattern),
+    ]
+    if dates:
+        rules.append(('recent', (), regex.recent_dates_pattern(dates)))
+        rules.append(('recent_timestamp', (), regex.recent_timestamp_pattern(dates)))
+
+    return rules
+
+
+class LineMatcher:
+    """
+    Classify lines against all the rules at once
+    """
+
+    def __init__(self, dates=None, rules=None):
+        if rules is None:
+            rules = line_rules(dates)
+
+        self.literal_rules = {}
+        self.confirm = {}
+        self.qualifiers = []
+        for name, literals, confirm in rules:
+            for literal in literals:
+                self.literal_rules.setdefault(literal, []).append(name)
+            if literals:
+                self.confirm[name] = confirm
+            else:
+                self.qualifiers.append((name, confirm))
+
+        # longest literals first so that a literal is never shadowed by one of its prefixes
+        literals = sorted(self.literal_rules, key=len, reverse=True)
+        self.prefilter = re.compile('|'.join(re.escape(literal) for literal in literals))
+
+    def confirm_rules(self, line, candidates):
+        """
+        Confirm the candidate rules of a line and add the qualifiers
+        """
+
+        kinds = set()
+        for name in candidates:
+            confirm = self.confirm[name]
+            if confirm is None or confirm.search(line):
+                kinds.add(name)
+        if kinds:
+            for name, confirm in self.qualifiers:
+                if confirm.search(line):
+                    kinds.add(name)
+
+        return kinds
+
+    def classify(self, line):
+        """
+        Return the set of rules matching a single line
+        """
+
+        candidates = set()
+        for hit in self.prefilter.finditer(line):
+            candidates.update(self.literal_rules[hit.group()])
+
+        return self.confirm_rules(line, candidates)
+
+    def scan(self, text):
+        """
+        Scan a block of complete lines and yield (line, kinds) for every line matching at least one rule
+        The prefilter runs over the whole block, the lines without any literal are never looked at
+        """
+
+        line_start = line_end = -1
+        candidates = set()
+        for hit in self.prefilter.finditer(text):
+            pos = hit.start()
+            if pos >= line_end:
+                # the hit is on a new line, finish the previous one
+                if candidates:
+                    line = text[line_start:line_end]
+                    kinds = self.confirm_rules(line, candidates)
+                    if kinds:
+                        yield line, kinds
+                line_start = text.rfind('\n', 0, pos) + 1
+                line_end = text.find('\n', pos)
+                if line_end == -1:
+                    line_end = len(text)
+                candidates = set()
+            candidates.update(self.literal_rules[hit.group()])
+
+        if candidates:
+            line = text[line_start:line_end]
+            kinds = self.confirm_rules(line, candidates)
+            if kinds:
+                yield line, kinds
+
+
+def is_ofad_error(kinds):
+    """
+    The ofad check only keeps the recent exception/error/critical messages, ignoring icmpa
+    """
+
+    return 'ofad' in kinds and 'recent' in kinds and 'icmpa' not in kinds
+
+
+def read_text(path):
+    """
+    Read a switch file as text, the files can contain binary data (hence grep -a in the shell checks)
+    """
+
+    with open(path, 'rb') as infile:
+        return infile.read().decode('utf-8', 'replace')
+
+
+def benchmark(text, dates=None, repeat=3):
+    """
+    Time each rule on its own (one pass per rule, like one grep per rule) and all the rules combined
+    Return a list of [rule set, lines matched, lines/sec]
+    """
+
+    lines = text.splitlines()
+    rules = line_rules(dates)
+    results = []
+
+    def best_of(func):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            matched = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return matched, len(lines) / best if best else float('inf')
+
+    # separate passes, each rule compiled to one regex like the grep pipelines
+    separate_total = 0
+    for name, literals, confirm in rules:
+        pattern = confirm if confirm is not None else re.compile('|'.join(re.escape(lit) for lit in literals))
+        matched, rate = best_of(lambda: sum(1 for line in lines if pattern.search(line)))
+        separate_total += len(lines) / rate if rate else 0
+        results.append([name, matched, int(rate)])
+
+    if separate_total:
+        results.append(['all rules, separate passes', '', int(len(lines) / separate_total)])
+
+    line_matcher = LineMatcher(dates)
+    matched, rate = best_of(lambda: sum(1 for _ in line_matcher.scan(text)))
+    results.append(['all rules, combined scan', matched, int(rate)])
+
+    matched, rate = best_of(lambda: sum(1 for line in lines if line_matcher.classify(line)))
+    results.append(['all rules, combined per line', matched, int(rate)])
+
+    return results
+
+
+if __name__ == '__main__':
+
+    if len(sys.argv) < 2:
+        print('usage: {} <path to switch file> [date ...]'.format(sys.argv[0]))
+        sys.exit(-1)
+
+    from tabulate import tabulate
+
+    bench_text = read_text(sys.argv[1])
+    table = tabulate(benchmark(bench_text, sys.argv[2:] or None), headers=['Rule set', 'Lines matched', 'Lines/sec'],
+                     tablefmt='grid')
+    print(table)
+    sys.exit(0)
@@ -0,0 +1,182 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the native (in-process) implementations of the per-file switch checks
+#
+# Each function returns the same result as its grep/awk/zgrep counterpart in switch.py. The files are read in
+# blocks of complete lines and classified with the combined line matcher, restricted to the rules of the check.
+# engine.py runs them instead of, or next to, the shell pipelines (--engine native|shell|both).
+
+import gzip
+import re
+import burst
+import general
+import inventory
+import matcher
+import parsers
+import pipeline
+import progress
+import records
+import regex
+
+# number of lines after '^Model|uptime' searched for the model and uptime (grep -A 2)
+model_uptime_context = 2
+# the model/uptime rule has to match at the start of any line of a block
+model_uptime_block_pattern = re.compile(regex.model_uptime_line_pattern.pattern, re.M)
+
+
+def read_blocks(path, chunk=pipeline.chunk_size):
+    """
+    Yield the file as blocks of complete lines (text), gzip files are decompressed like zgrep does
+    The bytes read from the file and the lines are reported to the progress of the scan
+    """
+
+    carry = b''
+    with open(path, 'rb') as raw:
+        is_gzip = raw.read(2) == b'\x1f\x8b'
+        raw.seek(0)
+        infile = gzip.GzipFile(fileobj=raw) if is_gzip else raw
+        position = 0
+        for data in iter(lambda: infile.read(chunk), b''):
+            data = carry + data
+            cut = data.rfind(b'\n') + 1
+            carry = data[cut:]
+            # the compressed bytes for gzip files, their size is the one counted in the progress
+            progress.add(raw.tell() - position, data.count(b'\n', 0, cut))
+            position = raw.tell()
+            if cut:
+                yield data[:cut].decode('utf-8', 'replace')
+    if carry:
+        progress.add(0, 1)
+        yield carry.decode('utf-8', 'replace')
+
+
+def rule_matcher(names, dates=None):
+    """
+    Return a LineMatcher with only the rules of a check
+    """
+
+    return matcher.LineMatcher(rules=[rule for rule in matcher.line_rules(dates) if rule[0] in names])
+
+
+def context_lines(blocks, anchor, after):
+    """
+    Yield the lines matching anchor and the after lines following each of them, like grep -A <after>
+    A '--' line separates the groups of lines that are not contiguous
+    """
+
+    remaining = 0
+    line_num = 0
+    last_yielded = None
+    for block in blocks:
+        pos = 0
+        while pos < len(block):
+            if not remaining:
+                # jump to the next anchor line, counting the lines skipped
+                matches = anchor.search(block, pos)
+                if not matches:
+                    line_num += block.count('\n', pos)
+                    break
+                line_start = block.rfind('\n', 0, matches.start()) + 1
+                line_num += block.count('\n', pos, line_start)
+                pos = line_start
+            end = block.find('\n', pos)
+            end = len(block) if end == -1 else end
+            line = block[pos:end]
+            if anchor.search(line):
+                remaining = after + 1
+            if last_yielded is not None and line_num != last_yielded + 1:
+                yield '--'
+            yield line
+            last_yielded = line_num
+            remaining -= 1
+            line_num += 1
+            pos = end + 1
+
+
+def find_continuous_errors(file, kind, dates, window=burst.burst_window, threshold=burst.burst_threshold):
+    """
+    Native find_continuous_errors: kind is 'i2c' (grep 'error.*i2c-') or 'smbus' (zgrep 'ERR ismt_smbus')
+    """
+
+    line_matcher = rule_matcher((kind, 'recent_timestamp'), dates)
+
+    def timestamps():
+        for block in read_blocks(file):
+            for line, kinds in line_matcher.scan(block):
+                # only the lines starting with a complete timestamp of the given dates
+                if kind in kinds and 'recent_timestamp' in kinds:
+                    yield general.timestamp_to_epoch(line)
+
+    epochs = burst.sorted_epochs(timestamps())
+    return records.Bursts(burst.find_bursts(epochs, window, threshold), window, epochs)
+
+
+def find_non_hcl_optics(file):
+    """
+    Native find_non_hcl_optics: the last inventory dump is found reading the file backwards
+    """
+
+    return inventory.find_non_hcl_optics(file)
+
+
+def text_blocks(blocks):
+    """
+    Yield the blocks as grep (without -a) reads them in a UTF-8 locale: the lines with invalid bytes are dropped
+    and the text ends at the first NUL byte, grep treats the rest of the file as binary data
+    grep stops at the start of the buffer holding the NUL byte rather than at its line, the size of its reads varies
+    (up to about 100 KB): the lines just before a NUL byte can differ
+    """
+
+    for block in blocks:
+        nul = block.find('\x00')
+        if nul != -1:
+            block = block[:block.rfind('\n', 0, nul) + 1]
+        # read_blocks decodes the invalid bytes to U+FFFD
+        if '\ufffd' in block:
+            block = ''.join(line for line in block.splitlines(True) if '\ufffd' not in line)
+        if block:
+            yield block
+        if nul != -1:
+            return
+
+
+def find_ofad_errors(swt, dates):
+    """
+    Native find_ofad_errors: the recent exception/error/critical messages (without the first field, the time)
+    and the number of lines of the file containing each of them, in the text lines of the file (see text_blocks)
+    """
+
+    recent_matcher = rule_matcher(('ofad', 'icmpa', 'recent'), dates)
+
+    def error_lines():
+        for block in text_blocks(read_blocks(swt)):
+            for line, kinds in recent_matcher.scan(block):
+                if matcher.is_ofad_error(kinds):
+                    yield line
+
+    error_dict = dict.fromkeys(parsers.ofad_messages(error_lines()), 0)
+    if error_dict:
+        # grep -F <message> | wc -l: the lines of the whole file containing each message
+        for block in text_blocks(read_blocks(swt)):
+            for message in error_dict:
+                pos = block.find(message)
+                while pos != -1 and pos < len(block):
+                    error_dict[message] += 1
+                    end = block.find('\n', pos)
+                    if end == -1:
+                        break
+                    pos = block.find(message, end + 1)
+
+    return error_dict
+
+
+def get_model_uptime(swt):
+    """
+    Native get_model_uptime (grep -aE -A 2 '^Model|uptime')
+    """
+
+    output = '\n'.join(context_lines(read_blocks(swt), model_uptime_block_pattern, model_uptime_context))
+
+    return parsers.find_model_uptime(output.strip())
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the parsing of the switch file outputs shared by the shell (switch.py) and native (native.py) checks
+
+import locale
+import regex
+
+# sort collates with the locale of the environment, the native checks order the ofad messages the same way
+try:
+    locale.setlocale(locale.LC_COLLATE, '')
+except locale.Error:
+    # sort falls back to the C locale as well
+    pass
+
+
+def find_model_uptime(output):
+    """
+    Find the model and the uptime of the switch in the output of grep '^Model|uptime'
+    The model is the last 'Model:' line after the uptime. If either is missing, return blank
+    """
+
+    uptime = regex.check_switch_uptime_pattern.search(output)
+    if not uptime:
+        return ' ', ' '
+
+    models = regex.check_switch_model_pattern.findall(output, uptime.end())
+    if not models:
+        return ' ', uptime.group('uptime')
+
+    return models[-1].strip(), uptime.group('uptime')
+
+
+def ofad_messages(lines):
+    """
+    Return the messages of the ofad error lines like awk -F"[ ]" '{ $1=""; print $0 }' | sort | uniq does,
+    with the whole output stripped as the shell check does
+    """
+
+    # awk empties the first field (the time), the separator before the message stays
+    messages = {' ' + line.split(' ', 1)[1] if ' ' in line else '' for line in lines}
+    # sort breaks the ties of the collation by comparing the bytes
+    output = '\n'.join(sorted(messages, key=lambda message: (locale.strxfrm(message), message))).strip()
+
+    return output.split('\n') if output else []
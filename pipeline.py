@@ -0,0 +1,170 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the read-ahead pipeline used to scan the switch files in-process
+#
+# A pool of reader threads prefetches large chunks of the next files into a fixed set of reusable buffers
+# while parser threads consume the chunks already read. Reading releases the GIL, so the disk (NFS) waits
+# overlap with the regex work. The number of buffers bounds the memory used by the pipeline.
+
+import queue
+import threading
+import time
+
+# default size of the chunks read from the files (bytes)
+chunk_size = 4 << 20
+# default number of chunks read ahead of the parsers
+queue_depth = 8
+reader_threads = 4
+parser_threads = 2
+
+
+class StageStats:
+    """
+    Bytes processed and time spent by one stage of the pipeline, updated by all the threads of the stage
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.bytes = 0
+        self.busy = 0.0
+        self.wait = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, nbytes, busy, wait):
+        with self.lock:
+            self.bytes += nbytes
+            self.busy += busy
+            self.wait += wait
+
+    def row(self, wall):
+        """
+        Return [stage, MB, busy seconds, waiting seconds, MB/s while busy, MB/s over the wall time]
+        """
+
+        mbytes = self.bytes / 1e6
+        return [self.name, round(mbytes, 1), round(self.busy, 2), round(self.wait, 2),
+                round(mbytes / self.busy, 1) if self.busy else 0.0, round(mbytes / wall, 1) if wall else 0.0]
+
+
+def read_file(path, free_buffers, work, chunk, stats, scan=None):
+    """
+    Read a file chunk by chunk into the free buffers and queue (path, seq, buffer, length) for the parsers
+    Every chunk ends on a line boundary, the partial last line is carried over to the next chunk
+    The bytes read and the time spent on the file are reported to the progress scan (if any)
+    """
+
+    file_start = time.perf_counter()
+    seq = 0
+    carry = b''
+    with open(path, 'rb') as infile:
+        while True:
+            start = time.perf_counter()
+            buf = free_buffers.get()
+            got_buffer = time.perf_counter()
+
+            view = memoryview(buf)
+            view[:len(carry)] = carry
+            nread = infile.readinto(view[len(carry):len(carry) + chunk])
+            end = len(carry) + nread
+            view.release()
+
+            if not nread:
+                # end of file, whatever is left is the last line
+                stats.add(0, time.perf_counter() - got_buffer, got_buffer - start)
+                if scan:
+                    scan.file_time(path, time.perf_counter() - file_start)
+                if carry:
+                    work.put((path, seq, buf, len(carry)))
+                else:
+                    free_buffers.put(buf)
+                return
+
+            cut = buf.rfind(b'\n', 0, end) + 1
+            # a line longer than a chunk is split, so that the carry always fits in the buffer
+            if not cut or end - cut > chunk:
+                cut = end
+            carry = bytes(buf[cut:end])
+
+            stats.add(nread, time.perf_counter() - got_buffer, got_buffer - start)
+            if scan:
+                scan.add(nread)
+            work.put((path, seq, buf, cut))
+            seq += 1
+
+
+def read_ahead(files, parse_chunk, chunk=chunk_size, depth=queue_depth, readers=reader_threads,
+               parsers=parser_threads, scan=None):
+    """
+    Scan the files through the pipeline
+    parse_chunk(path, data) is called from the parser threads with a memoryview of complete lines, it must not
+    keep a reference to data since the buffer is reused. Its results are returned per file in chunk order
+    The bytes, lines and time per file are reported to scan, a progress.Scan (if any)
+    Return ({path: [result of each chunk]}, [throughput row of each stage])
+    """
+
+    free_buffers = queue.Queue()
+    # the carry of a chunk is at most one chunk long
+    for _ in range(depth + parsers):
+        free_buffers.put(bytearray(2 * chunk))
+    work = queue.Queue()
+
+    read_stats = StageStats('read')
+    parse_stats = StageStats('parse')
+    results = {path: [] for path in files}
+    results_lock = threading.Lock()
+    errors = []
+
+    def parse_worker():
+        while True:
+            start = time.perf_counter()
+            item = work.get()
+            got_item = time.perf_counter()
+            if item is None:
+                return
+            path, seq, buf, length = item
+            try:
+                if not errors:
+                    with memoryview(buf) as view:
+                        result = parse_chunk(path, view[:length])
+                    with results_lock:
+                        results[path].append((seq, result))
+                    if scan:
+                        scan.add(0, buf.count(b'\n', 0, length))
+            except Exception as err:
+                errors.append(err)
+            finally:
+                free_buffers.put(buf)
+            parse_stats.add(length, time.perf_counter() - got_item, got_item - start)
+
+    wall_start = time.perf_counter()
+    workers = [threading.Thread(target=parse_worker, daemon=True) for _ in range(parsers)]
+    for worker in workers:
+        worker.start()
+
+    # imported here (under the import lock of the report thread), jarvis.py reads the defaults of this module
+    from concurrent.futures import ThreadPoolExecutor
+
+    try:
+        with ThreadPoolExecutor(max_workers=readers) as pool:
+            for future in [pool.submit(read_file, path, free_buffers, work, chunk, read_stats, scan)
+                           for path in files]:
+                future.result()
+    finally:
+        for _ in workers:
+            work.put(None)
+        for worker in workers:
+            worker.join()
+
+    if errors:
+        raise errors[0]
+
+    wall = time.perf_counter() - wall_start
+    ordered = {path: [result for _, result in sorted(chunks, key=lambda item: item[0])]
+               for path, chunks in results.items()}
+    stats = [read_stats.row(wall), parse_stats.row(wall),
+             ['total (wall)', round(read_stats.bytes / 1e6, 1), round(wall, 2), '',
+              '', round(read_stats.bytes / 1e6 / wall, 1) if wall else 0.0]]
+
+    return ordered, stats
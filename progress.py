@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the byte-based progress of the switch file scans
+#
+# The progress bars count the bytes of the switch files instead of the files, so that a huge file does not look
+# frozen and the ETA is meaningful. The counters are updated by the threads of the scan under a lock. A monitor
+# thread refreshes the bar with the MB/s and the lines/s of the last seconds. The lines are counted by the
+# in-process scans (native engine, fabric pipeline), which also report their bytes as they read them. The files
+# read by the grep/awk pipelines are followed through the offsets of their processes in /proc/<pid>/fdinfo
+# (Linux only, elsewhere their bytes are counted once a file is done), their scans have no line counts.
+# The scans running at the same time (active and standby reports) each get their own bar line.
+#
+# The time spent on each file is recorded, the throughput of each scan and the slowest files are added to the
+# timing report, to spot slow NFS mounts or pathological files.
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import lazy
+import timing
+
+# seconds between two refreshes of a bar
+refresh_seconds = 0.5
+# the lines/s shown are the ones of the last seconds
+rate_seconds = 5
+# number of slowest files of each scan handed to the timing report
+slowest_files = 5
+
+# the scan and the file being scanned by each thread, for the scanners that report their progress with add()
+current = threading.local()
+# the bar lines used by the scans running, a new scan takes the first free line
+positions = set()
+positions_lock = threading.Lock()
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def child_processes():
+    """
+    Return the pids of the processes started by this one, and by them, from /proc
+    """
+
+    try:
+        pids = [pid for pid in os.listdir('/proc') if pid.isdigit()]
+    except OSError:
+        return []
+
+    children = {}
+    for pid in pids:
+        try:
+            with open('/proc/{}/stat'.format(pid)) as infile:
+                # the command name, in parentheses, can contain spaces: the parent pid is the 2nd field after it
+                parent = infile.read().rsplit(')', 1)[1].split()[1]
+        except (OSError, IndexError):
+            continue
+        children.setdefault(parent, []).append(pid)
+
+    found = []
+    todo = list(children.get(str(os.getpid()), []))
+    while todo:
+        pid = todo.pop()
+        found.append(pid)
+        todo.extend(children.get(pid, []))
+
+    return found
+
+
+def read_offsets(paths):
+    """
+    Return {path: offset} of the files being read by the child processes (the grep/awk pipelines)
+    """
+
+    targets = {os.path.realpath(path): path for path in paths}
+    offsets = {}
+    for pid in child_processes():
+        fd_dir = '/proc/{}/fd'.format(pid)
+        try:
+            fds = os.listdir(fd_dir)
+        except OSError:
+            continue
+        for fd in fds:
+            try:
+                path = targets.get(os.readlink(os.path.join(fd_dir, fd)))
+                if path is None:
+                    continue
+                # the first line of fdinfo is 'pos:\t<offset>'
+                with open('/proc/{}/fdinfo/{}'.format(pid, fd)) as infile:
+                    offset = int(infile.readline().split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            offsets[path] = max(offsets.get(path, 0), offset)
+
+    return offsets
+
+
+class Scan:
+    """
+    Progress of a scan over a set of files, in bytes and lines
+    """
+
+    def __init__(self, name, files):
+        self.name = name
+        self.sizes = {path: file_size(path) for path in files}
+        self.total = sum(self.sizes.values())
+        self.bytes_done = 0
+        self.lines_done = 0
+        # (seconds, path, bytes) of each file scanned
+        self.file_times = []
+        # the files being scanned, their bytes are only counted at the end when they are read by a pipeline
+        self.reading = set()
+        # guards the counters, the file times and the files being scanned
+        self.lock = threading.Lock()
+        # (time, lines) of the refreshes of the last rate_seconds
+        self.samples = deque()
+        self.position = None
+        self.started = None
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        with positions_lock:
+            self.position = min(set(range(len(positions) + 1)) - positions)
+            positions.add(self.position)
+        self.started = time.perf_counter()
+        self.samples.append((self.started, 0))
+        # the rate shown by the bar is smoothed over its last updates
+        self.bar = lazy.tqdm(total=self.total, unit='B', unit_scale=True, unit_divisor=1024, desc=self.name,
+                             position=self.position, miniters=1)
+        self.monitor = threading.Thread(target=self.refresh, daemon=True)
+        self.monitor.start()
+        current.scan = self
+        return self
+
+    def __exit__(self, *exc):
+        current.scan = None
+        self.stopped.set()
+        self.monitor.join()
+        self.show()
+        self.bar.close()
+        with positions_lock:
+            positions.discard(self.position)
+        self.report()
+
+    def add(self, nbytes, nlines=0):
+        """
+        Count bytes and lines as processed, from any thread
+        """
+
+        with self.lock:
+            self.bytes_done += nbytes
+            self.lines_done += nlines
+
+    def file_time(self, path, seconds, nbytes=None):
+        with self.lock:
+            self.file_times.append((seconds, path, self.sizes.get(path, 0) if nbytes is None else nbytes))
+
+    @contextmanager
+    def file(self, path):
+        """
+        Time the scan of a file, the bytes not reported with add() while it was scanned are counted at the end
+        """
+
+        current.remaining = self.sizes.get(path, 0)
+        started = time.perf_counter()
+        with self.lock:
+            self.reading.add(path)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.reading.discard(path)
+            self.add(current.remaining)
+            current.remaining = 0
+            self.file_time(path, time.perf_counter() - started)
+
+    def pipeline_bytes(self):
+        """
+        Return the bytes read so far by the pipelines from the files being scanned
+        """
+
+        with self.lock:
+            reading = list(self.reading)
+        if not reading:
+            return 0
+
+        return sum(min(offset, self.sizes.get(path, 0)) for path, offset in read_offsets(reading).items())
+
+    def show(self):
+        now = time.perf_counter()
+        with self.lock:
+            bytes_done, lines = self.bytes_done, self.lines_done
+        done = min(bytes_done + self.pipeline_bytes(), self.total)
+        if done > self.bar.n:
+            self.bar.update(done - self.bar.n)
+
+        self.samples.append((now, lines))
+        while now - self.samples[0][0] > rate_seconds:
+            self.samples.popleft()
+        if lines:
+            since, lines_before = self.samples[0]
+            rate = (lines - lines_before) / (now - since) if now > since else 0
+            self.bar.set_postfix_str('{:.0f} lines/s'.format(rate), refresh=False)
+        self.bar.refresh()
+
+    def refresh(self):
+        while not self.stopped.wait(refresh_seconds):
+            self.show()
+
+    def report(self):
+        """
+        Add the throughput of the scan and its slowest files to the timing report
+        """
+
+        elapsed = time.perf_counter() - self.started
+        mbytes = self.bytes_done / 1e6
+        lines = self.lines_done
+        row = [self.name, len(self.sizes), round(mbytes, 1), round(elapsed, 2),
+               round(mbytes / elapsed, 1) if elapsed else 0.0]
+        # the grep pipelines do not count the lines, their scans have no line columns
+        if lines:
+            row += [lines, round(lines / elapsed) if elapsed else 0]
+        timing.add_scan(row)
+        for seconds, path, nbytes in sorted(self.file_times, reverse=True)[:slowest_files]:
+            timing.add_slow_file([self.name, path.split('/')[-1], round(nbytes / 1e6, 1), round(seconds, 2),
+                                  round(nbytes / 1e6 / seconds, 1) if seconds else 0.0])
+
+
+def add(nbytes, nlines=0):
+    """
+    Report bytes and lines processed to the scan of the current thread, if any
+    """
+
+    scan = getattr(current, 'scan', None)
+    if scan is not None:
+        # the bytes of a file read twice (or outside Scan.file) are only counted once
+        nbytes = min(nbytes, getattr(current, 'remaining', 0))
+        current.remaining = getattr(current, 'remaining', 0) - nbytes
+        scan.add(nbytes, nlines)
@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the compact records of the per-switch findings
+#
+# On large fabrics the findings are kept in typed records with __slots__ instead of nested dicts and lists of
+# strings. The switch names and optics models are interned, the switch name of a file path is computed once,
+# and the burst timestamps are stored as epoch seconds in array('q'). The records are only converted to the
+# report format when they are logged.
+#
+# Run it directly for a memory/time comparison with the nested structures:
+#   python3 records.py [number of switches]
+
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+import burst
+import general
+
+
+@lru_cache(maxsize=65536)
+def switch_name(path):
+    """
+    Return the interned switch name of a switch file
+    eg: /home/bsn/.../LIMSPINER3-1-fe80::e6f0:4ff:fe0a:6c2d%10 -> LIMSPINER3-1
+    """
+
+    return sys.intern(path.split('/')[-1].split('-fe80')[0])
+
+
+@lru_cache(maxsize=65536)
+def log_switch_name(path):
+    """
+    Return the interned switch name of a switch log file under /var/log/switch/ eg: .../LEAF1.log -> LEAF1
+    """
+
+    return sys.intern(path.split('/')[-1].split('.')[0])
+
+
+class Bursts:
+    """
+    The bursts of errors found in a file, as parallel arrays of start and end epoch seconds and peaks
+    epochs is the array of the epoch seconds of all the errors, reused by the fabric pass (None if unknown)
+    """
+
+    __slots__ = ('window', 'starts', 'ends', 'peaks', 'epochs')
+
+    def __init__(self, bursts=(), window=burst.burst_window, epochs=None):
+        self.window = window
+        self.epochs = epochs
+        self.starts = array('q')
+        self.ends = array('q')
+        self.peaks = array('q')
+        for start, end, peak in bursts:
+            self.starts.append(start)
+            self.ends.append(end)
+            self.peaks.append(peak)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends, self.peaks)
+
+    def formatted(self):
+        """
+        Return the bursts in the format logged in the report
+        """
+
+        return [burst.format_burst(each_burst, self.window) for each_burst in self]
+
+
+class Optics:
+    """
+    The interfaces of a switch with non HCL optics and their models, in the order they were found
+    """
+
+    __slots__ = ('interfaces', 'models')
+
+    def __init__(self):
+        # one entry per (interface, model) found
+        self.interfaces = []
+        self.models = []
+
+    def add(self, interface, model):
+        self.interfaces.append(sys.intern(interface))
+        self.models.append(sys.intern(model))
+
+    def __len__(self):
+        return len(self.interfaces)
+
+    def items(self):
+        """
+        Return (interface, [models]) in the order the interfaces were first found
+        """
+
+        int_model = OrderedDict()
+        for interface, model in zip(self.interfaces, self.models):
+            int_model.setdefault(interface, []).append(model)
+
+        return int_model.items()
+
+
+class SwitchInfo:
+    """
+    The model, uptime, ASIC, connection time and role of a switch
+    """
+
+    __slots__ = ('name', 'model', 'uptime', 'asic', 'connected_since', 'role')
+
+    def __init__(self, name, model, uptime, asic, connected_since=None, role=None):
+        self.name = name
+        self.model = sys.intern(model) if model else model
+        self.uptime = uptime
+        self.asic = sys.intern(asic)
+        self.connected_since = connected_since
+        self.role = sys.intern(role) if role else role
+
+    def fields(self):
+        return [self.name, self.model, self.uptime, self.asic, self.connected_since, self.role]
+
+    def row(self):
+        """
+        Return the row logged in the report, the connection time and role are left out when unknown
+        """
+
+        row = self.fields()
+        while row[-1] is None:
+            row.pop()
+
+        return row
+
+
+def make_findings(num_switches, compact):
+    """
+    Build the i2c bursts, non HCL optics and switch details of a synthetic fabric
+    in the nested structures (compact False) or in the records (compact True)
+    """
+
+    prefix = '/home/bsn/support/00011705/bsn-support--CTRL1--2019-11-26--17-57-21--UTC--abc/'
+    start = general.timestamp_to_epoch('2019-11-20T00:00:00')
+    bursts, optics, details = {}, {}, []
+    for idx in range(num_switches):
+        path = '{}LEAF{}-fe80::e6f0:4ff:fe0a:{:x}%10'.format(prefix, idx, idx)
+        found = [(start + 600 * num, start + 600 * num + 40, 6 + num % 50) for num in range(20)]
+        ports = [('ethernet{}'.format(port), 'ACME-10G.{}'.format(port % 4)) for port in range(8)]
+        if compact:
+            name = switch_name(path)
+            bursts[name] = Bursts(found)
+            optics[name] = Optics()
+            for interface, model in ports:
+                optics[name].add(interface, model)
+            details.append(SwitchInfo(name, 'S4048-ON', '10 days', 'Trident2+', '2019-11-01 10:00:00 UTC', 'leaf'))
+        else:
+            name = path.split('/')[-1].split('-fe80')[0]
+            bursts[name] = [[burst.format_burst(each_burst) for each_burst in found]]
+            optics[name] = OrderedDict()
+            for interface, model in ports:
+                optics[name].setdefault(interface, []).append(model)
+            details.append([name, 'S4048-ON', '10 days', 'Trident2+', '2019-11-01 10:00:00 UTC', 'leaf'])
+
+    return bursts, optics, details
+
+
+def compare(num_switches):
+    """
+    Return [structures, memory MB, build seconds] for the nested structures and the records
+    """
+
+    results = []
+    for compact in (False, True):
+        # timed without tracemalloc, which slows down the allocations
+        switch_name.cache_clear()
+        start = time.perf_counter()
+        findings = make_findings(num_switches, compact)
+        elapsed = time.perf_counter() - start
+        del findings
+
+        switch_name.cache_clear()
+        tracemalloc.start()
+        findings = make_findings(num_switches, compact)
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del findings
+        results.append(['records' if compact else 'nested dicts/lists', round(current / 1e6, 2), round(elapsed, 3)])
+
+    return results
+
+
+if __name__ == '__main__':
+
+    from tabulate import tabulate
+
+    switches = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    print('Findings of {} switches (20 bursts, 8 non HCL optics each)'.format(switches))
+    print(tabulate(compare(switches), headers=['Structures', 'Memory (MB)', 'Build (s)'], tablefmt='grid'))
+    sys.exit(0)
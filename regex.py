@@ -24,13 +24,80 @@ show_fabric_error_warn_pattern = re.compile(r'^~\s.*\sNone.', re.M)
 # match Ci job name followed by anything, then match digit.digit
 version_pattern = re.compile(r'Ci job name.*-(?P<version>\d.\d)')
 
-# lookbehind regex
-# start from end of the line and match 'No', followed by a word, followed by another word (call it model)
-# and lastly match the interface name, call it 'int'
-check_hcl_pattern = re.compile(r'(?P<int>[\w:\/]+).*?(?P<model>[\w.+-]+)\s+[\w-]+\s+No(?<=)')
+# match a row of the inventory hcl table that is not on the HCL (last column 'No')
+# the interface name is the first word of the line, the model is the word two columns before 'No'
+# the interface is anchored at the start of the line and the model has to start a word, so that each word
+# of the line is tried at most once (the old pattern retried every position and went cubic on long lines)
+check_hcl_pattern = re.compile(r'^[^\w:/]*(?P<int>[\w:/]+)(?![\w:/]).*?(?<![\w.+-])(?P<model>[\w.+-]+)\s+[\w-]+\s+No')
 
-# find the uptime and model of the switch
-check_switch_m_u_pattern = re.compile(r'(?sm)up\s(?P<uptime>.*?),\s\s.*Model:\s(?P<model>.*?$)')
+# match any row of the inventory hcl table, hcl is the last column (Yes or No)
+inventory_row_pattern = re.compile(
+    r'^[^\w:/]*(?P<int>[\w:/]+)(?![\w:/]).*?(?<![\w.+-])(?P<model>[\w.+-]+)\s+[\w-]+\s+(?P<hcl>Yes|No)')
+
+# find the uptime of the switch eg: ' 17:57:21 up 10 days,  3:04,  1 user' -> '10 days'
+# the uptime runs up to the first comma followed by two spaces and stays on one line
+check_switch_uptime_pattern = re.compile(r'\bup\s(?P<uptime>(?:[^,\n]|,(?!\s\s)){0,80}),\s\s')
+
+# find the model of the switch eg: 'Model: S4048-ON' -> 'S4048-ON'
+# 'Model:' can be anywhere on the line, the model is the rest of the line (the next one when 'Model:' ends it)
+check_switch_model_pattern = re.compile(r'Model:\s(?P<model>[^\n]*)')
 
 # match switch name, connected since and role
 check_switch_cntd_since_pattern = re.compile(r'^(?P<swt_name>[\w+-]+)\s(?P<cntd_since>.*?0\s)(?P<role>\w+)$')
+
+# line-level rules of the switch checks, used by matcher.py to classify each line once
+
+# ofad-debug messages with severity exception, error or critical
+ofad_error_pattern = re.compile(r'exception \[|error \[|critical \[')
+
+# icmpa errors are ignored in the ofad check
+icmpa_pattern = re.compile(r'icmpa')
+
+# i2c errors in the switch files
+i2c_error_pattern = re.compile(r'error.*i2c-')
+
+# smbus errors in the switch logs under /var/log/switch/
+smbus_error_pattern = re.compile(r'ERR ismt_smbus')
+
+# start of an inventory dump in the switch files
+inventory_hcl_pattern = re.compile(r'inventory hcl')
+
+# lines around which the model and uptime of the switch are found
+model_uptime_line_pattern = re.compile(r'^Model|uptime')
+
+
+def audit_log_pattern(month):
+    """
+    Match the commands executed by the user in the given month (YYYY-MM) in the audit log
+    the pattern would result in 2019-11-22T11:26:28.479+00:00 executed_command
+    """
+
+    # anchored at the start of the line, and each part stops at the first occurrence of the next
+    # delimiter ('00 ', 'id=', 'args="'), so a line that does not match is not rescanned from every position
+    return re.compile(r'^(?P<mnth>{}(?:(?!00\s)[^\n])*00\s)(?:(?!id=)[^\n])*id=(?:(?!args=")[^\n])*'
+                      r'args="(?P<cmd>[^\n]*)"'.format(re.escape(month)))
+
+
+# user who executed a command in the audit log eg: user=admin
+audit_user_pattern = re.compile(r'\buser=(?P<user>[^\s"]+)')
+
+
+def recent_dates_pattern(dates):
+    """
+    Match the lines with one of the given dates anywhere, like grep -E '2019-11-26T|...' (the ofad check)
+    """
+
+    return re.compile(r'(?:{})T'.format('|'.join(re.escape(day) for day in dates)))
+
+
+def recent_timestamp_pattern(dates):
+    """
+    Match the lines starting with a complete timestamp of one of the given dates eg: 2019-11-26T17:57:21
+    (the i2c and smbus checks)
+    """
+
+    return re.compile(r'^(?:{})T\d\d:\d\d:\d\d'.format('|'.join(re.escape(day) for day in dates)))
+
+
+# timestamp at the start of the switch log lines, up to the seconds eg: 2019-11-26T17:57:21
+timestamp_pattern = re.compile(r'\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d')
@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the performance checks of the regex patterns
+#
+# Each pattern is timed against adversarial inputs of growing size and against real-size lines.
+# The check fails when the time grows faster than linearly with the input size.
+# Run it after changing regex.py:
+#   python3 regex_perf.py
+
+import math
+import sys
+import time
+import regex
+
+# input sizes (characters) used to measure the growth
+sizes = [2000, 4000, 8000, 16000]
+# max allowed slope of log(time) against log(size), 1 is linear and 2 is quadratic
+max_growth = 1.4
+# each measurement runs for at least this long (seconds) to smooth out the timer noise
+min_duration = 0.05
+
+audit_month = '2019-11'
+
+# real-size lines, as found in the bundles
+real_lines = {
+    'check_hcl_pattern': [
+        'ethernet2      ACME          ACME-10G.1            10G-LR         No',
+        'ethernet1      FINISAR CORP. FTLX8571D3BCL         10G-SR         Yes',
+        '2019-11-26T06:00:00.000+00:00 LEAF1 ofad: info [ofad] port ethernet12 link up speed 10G No errors',
+    ],
+    'inventory_row_pattern': [
+        'ethernet2      ACME          ACME-10G.1            10G-LR         No',
+        'ethernet1      FINISAR CORP. FTLX8571D3BCL         10G-SR         Yes',
+        'Port           Vendor        Model                 Type           HCL',
+    ],
+    'check_switch_uptime_pattern': [
+        ' 17:57:21 up 10 days,  3:04,  1 user,  load average: 0.10, 0.12, 0.09',
+    ],
+    'check_switch_model_pattern': [
+        'Model: S4048-ON',
+    ],
+    'audit_log_pattern': [
+        '2019-11-22T11:26:28.479+00:00 type=cli.command user=admin session=12 id=4242 args="show switch all details"',
+        '2019-11-22T11:26:28.479+00:00 type=rest.request user=admin uri=/api/v1/data/controller/core/switch',
+    ],
+}
+
+# adversarial inputs, each a function of the size
+adversarial_inputs = {
+    'check_hcl_pattern': [
+        lambda n: 'a' * n,
+        lambda n: 'a ' * (n // 2),
+        lambda n: 'eth1 ' + 'x.' * (n // 2) + ' SFP Yes',
+        lambda n: 'eth1 ' + 'M SFP ' * (n // 6) + 'Yes',
+        lambda n: '/' * n + ' x',
+    ],
+    'inventory_row_pattern': [
+        lambda n: 'a' * n,
+        lambda n: 'a ' * (n // 2),
+        lambda n: 'eth1 ' + 'x.' * (n // 2) + ' SFP Ye',
+        lambda n: 'eth1 ' + 'M SFP ' * (n // 6) + 'N',
+        lambda n: 'eth1 ' + 'M SFP Y' * (n // 7),
+        lambda n: '/' * n + ' x',
+    ],
+    'check_switch_uptime_pattern': [
+        lambda n: 'up ' * (n // 3),
+        lambda n: 'up ' + ', ' * (n // 2),
+        lambda n: 'up ' + 'x' * n,
+    ],
+    'check_switch_model_pattern': [
+        lambda n: 'Model: ' * (n // 7),
+        lambda n: 'Model:' + ' ' * n,
+        lambda n: ' ' * n + 'Model',
+    ],
+    'audit_log_pattern': [
+        lambda n: audit_month + '00 ' * (n // 3),
+        lambda n: audit_month + '-22T00 ' + 'id=' * (n // 3),
+        lambda n: audit_month + '-22T00 id=' + 'args="' * (n // 6),
+        lambda n: audit_month + '-22T00 id= args="' + 'x' * n,
+        lambda n: audit_month + '0' * n,
+    ],
+}
+
+
+def get_pattern(name):
+    """
+    Return the compiled pattern for the name
+    """
+
+    if name == 'audit_log_pattern':
+        return regex.audit_log_pattern(audit_month)
+    return getattr(regex, name)
+
+
+def time_search(pattern, text):
+    """
+    Return the average time of one search of the pattern in the text
+    """
+
+    loops = 0
+    start = time.perf_counter()
+    while True:
+        pattern.search(text)
+        loops += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_duration:
+            return elapsed / loops
+
+
+def growth(pattern, make_input):
+    """
+    Time the pattern for all the sizes and return the slope of log(time) against log(size)
+    """
+
+    points = [(math.log(n), math.log(time_search(pattern, make_input(n)))) for n in sizes]
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    return (sum((x - mean_x) * (y - mean_y) for x, y in points) /
+            sum((x - mean_x) ** 2 for x, _ in points))
+
+
+def check_patterns():
+    """
+    Run all the checks and return the results as [pattern, input, measure, result]
+    """
+
+    results = []
+    for name, lines in real_lines.items():
+        pattern = get_pattern(name)
+        for line in lines:
+            usec = time_search(pattern, line) * 1e6
+            results.append([name, 'real line ({} chars)'.format(len(line)), '{:.2f} us'.format(usec), 'ok'])
+
+    for name, inputs in adversarial_inputs.items():
+        pattern = get_pattern(name)
+        for idx, make_input in enumerate(inputs):
+            slope = growth(pattern, make_input)
+            result = 'ok' if slope <= max_growth else 'FAIL'
+            results.append([name, 'adversarial #{}'.format(idx + 1), 'growth {:.2f}'.format(slope), result])
+
+    return results
+
+
+if __name__ == '__main__':
+
+    from tabulate import tabulate
+
+    all_results = check_patterns()
+    print(tabulate(all_results, headers=['Pattern', 'Input', 'Measure', 'Result'], tablefmt='grid'))
+
+    if any(row[-1] != 'ok' for row in all_results):
+        print('Some patterns grow faster than linearly with the input size (max allowed growth {})'.format(max_growth))
+        sys.exit(-1)
+    sys.exit(0)
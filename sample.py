@@ -0,0 +1,298 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the sampled scan used by the quick mode
+#
+# The switch logs are mostly in time order, so the byte range of the analysis window (the last 7 days) is found
+# with a binary search on the timestamps. The switch files are concatenated command dumps though, the search can
+# land in a section that is not in order: when the timestamps around the offsets found are not in order, the
+# range from the first to the last line of the window is found with a linear scan instead. The window is split in
+# equal strata and one fixed-size chunk is read at a random offset in each of them. The i2c, smbus and ofad errors
+# counted in the chunks are extrapolated to the whole window, with 95% confidence bounds. A window smaller than
+# the samples is scanned entirely (exact counts).
+
+import os
+import random
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+import burst
+import general
+import matcher
+import pipeline
+import records
+import regex
+
+# size of each sampled chunk (bytes) and number of chunks sampled per file
+sample_size = 256 << 10
+sample_chunks = 16
+# z value of the 95% confidence bounds
+confidence_z = 1.96
+# the errors counted per file: switch files have i2c and ofad errors, /var/log/switch/ files have smbus errors
+switch_counts = ('i2c', 'ofad')
+smbus_counts = ('smbus',)
+
+
+class Estimate:
+    """
+    Number of errors in the analysis window of a file, exact or extrapolated from the samples
+    """
+
+    def __init__(self, observed, value, low, high, exact, ordered=True):
+        self.observed = observed
+        self.value = value
+        self.low = low
+        self.high = high
+        self.exact = exact
+        # False when the window was found with a linear scan, the file is not in time order
+        self.ordered = ordered
+
+    def __str__(self):
+        if self.exact:
+            return str(self.observed)
+        return '~{} ({}-{}){}'.format(int(round(self.value)), int(self.low), int(round(self.high)),
+                                      '' if self.ordered else '*')
+
+
+def first_stamp_after(infile, offset, size):
+    """
+    Return (epoch, offset) of the first line with a timestamp starting after offset, (None, size) if there is none
+    """
+
+    infile.seek(offset)
+    if offset:
+        # skip the partial line
+        infile.readline()
+    while True:
+        pos = infile.tell()
+        line = infile.readline()
+        if not line:
+            return None, size
+        matches = regex.timestamp_pattern.match(line[:19].decode('ascii', 'replace'))
+        if matches:
+            return general.timestamp_to_epoch(matches.group()), pos
+
+
+def find_offset(infile, size, epoch, probes=None):
+    """
+    Binary search the offset of the first line logged at or after epoch
+    The (offset, epoch) of the lines read are added to probes (if any)
+    """
+
+    low, high = 0, size
+    while low < high:
+        mid = (low + high) // 2
+        stamp, pos = first_stamp_after(infile, mid, size)
+        if probes is not None and stamp is not None:
+            probes.append((pos, stamp))
+        if stamp is None or stamp >= epoch:
+            high = mid
+        else:
+            low = mid + 1
+
+    return first_stamp_after(infile, low, size)[1]
+
+
+def last_stamp_before(infile, offset):
+    """
+    Return the epoch of the last line with a timestamp in the sample_size bytes before offset (a line start), None
+    if there is none
+    """
+
+    data = read_lines(infile, max(0, offset - sample_size), offset)
+    for line in reversed(data.split(b'\n')):
+        matches = regex.timestamp_pattern.match(line[:19].decode('ascii', 'replace'))
+        if matches:
+            return general.timestamp_to_epoch(matches.group())
+
+    return None
+
+
+def in_order(infile, size, offset, epoch):
+    """
+    Return False if the timestamps on both sides of the offset found for epoch are not in order
+    """
+
+    before = last_stamp_before(infile, offset)
+    # the line at offset, first_stamp_after skips the line around offset - 1 (its newline)
+    after, _ = first_stamp_after(infile, offset - 1, size) if offset else first_stamp_after(infile, 0, size)
+
+    return (before is None or before < epoch) and (after is None or after >= epoch)
+
+
+def probes_in_order(infile, size, probes):
+    """
+    Return False if the timestamps read by the binary searches, with the first and the last ones of the file, are
+    not in order
+    """
+
+    stamps = [first_stamp_after(infile, 0, size)[0]] + [stamp for _, stamp in sorted(probes)]
+    stamps = [stamp for stamp in stamps + [last_stamp_before(infile, size)] if stamp is not None]
+
+    return all(first <= second for first, second in zip(stamps, stamps[1:]))
+
+
+def scan_window(infile, size, start_epoch, end_epoch):
+    """
+    Linear scan for the files not in time order
+    Return the offsets of the first line logged in [start_epoch, end_epoch) and of the end of the last one
+    """
+
+    start, end = size, size
+    infile.seek(0)
+    pos = 0
+    for line in infile:
+        matches = regex.timestamp_pattern.match(line[:19].decode('ascii', 'replace'))
+        if matches and start_epoch <= general.timestamp_to_epoch(matches.group()) < end_epoch:
+            start = min(start, pos)
+            end = pos + len(line)
+        pos += len(line)
+
+    return start, end
+
+
+def read_lines(infile, start, end):
+    """
+    Read the complete lines starting in [start, end)
+    """
+
+    infile.seek(start)
+    if start:
+        # the line started before the chunk, it belongs to the previous one
+        infile.readline()
+    first = infile.tell()
+    if first >= end:
+        return b''
+
+    data = infile.read(end - first)
+    # finish the last line
+    return data + infile.readline() if not data.endswith(b'\n') else data
+
+
+def count_errors(data, line_matcher, kinds):
+    """
+    Count the errors of each kind logged on the analysis dates in a block of lines, also return their epochs
+    """
+
+    counts = dict.fromkeys(kinds, 0)
+    epochs = []
+    for line, line_kinds in line_matcher.scan(data.decode('utf-8', 'replace')):
+        for kind in kinds:
+            if kind == 'ofad':
+                if matcher.is_ofad_error(line_kinds):
+                    counts[kind] += 1
+            # the i2c and smbus errors are the lines starting with a timestamp of the dates, as in the full scan
+            elif kind in line_kinds and 'recent_timestamp' in line_kinds:
+                counts[kind] += 1
+                epochs.append(general.timestamp_to_epoch(line))
+
+    return counts, epochs
+
+
+def extrapolate(chunk_counts, chunk_bytes, window_bytes, ordered=True):
+    """
+    Extrapolate the counts of the sampled chunks to the whole window, return an Estimate
+    When the file is not in time order (ordered False), the window range also holds lines logged outside of the
+    window: the bounds are not narrowed by the finite population correction
+    """
+
+    observed = sum(chunk_counts)
+    sampled = sum(chunk_bytes)
+    densities = [count / size for count, size in zip(chunk_counts, chunk_bytes) if size]
+    if not densities:
+        return Estimate(0, 0, 0, 0, False, ordered)
+
+    value = statistics.mean(densities) * window_bytes
+    if observed == 0:
+        # nothing seen in the samples, the upper bound of a Poisson count with no event is 3 (rule of three)
+        return Estimate(0, 0, 0, 3 * window_bytes / sampled, False, ordered)
+
+    spread = statistics.stdev(densities) if len(densities) > 1 else statistics.mean(densities)
+    # finite population correction, the samples cover part of the window
+    correction = max(0.0, 1 - sampled / window_bytes) ** 0.5 if ordered else 1.0
+    margin = confidence_z * spread * window_bytes / len(densities) ** 0.5 * correction
+
+    return Estimate(observed, value, max(observed, value - margin), value + margin, False, ordered)
+
+
+def sample_file(path, kinds, dates, window, threshold):
+    """
+    Estimate the errors of each kind logged on the dates in a file
+    Return ({kind: Estimate}, number of bursts seen in the samples, window bytes, sampled bytes)
+    """
+
+    line_matcher = matcher.LineMatcher(dates)
+    start_epoch = general.timestamp_to_epoch(min(dates) + 'T00:00:00')
+    end_epoch = general.timestamp_to_epoch(max(dates) + 'T23:59:59') + 1
+    size = os.path.getsize(path)
+    # same seed for the same file, so that a quick run can be reproduced
+    rand = random.Random('{}:{}'.format(path, size))
+
+    with open(path, 'rb') as infile:
+        probes = []
+        start = find_offset(infile, size, start_epoch, probes)
+        end = find_offset(infile, size, end_epoch, probes)
+        ordered = start <= end and in_order(infile, size, start, start_epoch) and \
+            in_order(infile, size, end, end_epoch) and probes_in_order(infile, size, probes)
+        if not ordered:
+            start, end = scan_window(infile, size, start_epoch, end_epoch)
+        window_bytes = end - start
+
+        if window_bytes <= sample_size * sample_chunks:
+            counts, epochs = count_errors(read_lines(infile, start, end), line_matcher, kinds)
+            estimates = {kind: Estimate(counts[kind], counts[kind], counts[kind], counts[kind], True)
+                         for kind in kinds}
+            num_bursts = len(list(burst.find_bursts(burst.sorted_epochs(epochs), window, threshold)))
+            return estimates, num_bursts, window_bytes, window_bytes
+
+        stratum = window_bytes / sample_chunks
+        chunk_counts = {kind: [] for kind in kinds}
+        chunk_bytes = []
+        num_bursts = 0
+        for idx in range(sample_chunks):
+            offset = start + int(idx * stratum + rand.random() * (stratum - sample_size))
+            data = read_lines(infile, offset, offset + sample_size)
+            counts, epochs = count_errors(data, line_matcher, kinds)
+            for kind in kinds:
+                chunk_counts[kind].append(counts[kind])
+            chunk_bytes.append(len(data))
+            # a burst inside a chunk is a real burst, the bursts across the chunks are unknown
+            num_bursts += len(list(burst.find_bursts(burst.sorted_epochs(epochs), window, threshold)))
+
+    estimates = {kind: extrapolate(chunk_counts[kind], chunk_bytes, window_bytes, ordered) for kind in kinds}
+    return estimates, num_bursts, window_bytes, sum(chunk_bytes)
+
+
+def estimate_switch_errors(switch_files, smbus_files, dates, window=burst.burst_window,
+                           threshold=burst.burst_threshold):
+    """
+    Sample all the files and return one row per switch:
+    [switch name, window MB, sampled %, i2c, smbus, ofad, bursts seen, full scan needed]
+    A switch needs a full scan when an error was seen in its samples
+    """
+
+    jobs = [(path, switch_counts, records.switch_name(path)) for path in switch_files]
+    jobs += [(path, smbus_counts, records.log_switch_name(path)) for path in smbus_files or []]
+
+    with ThreadPoolExecutor(max_workers=pipeline.reader_threads) as pool:
+        results = list(pool.map(lambda job: sample_file(job[0], job[1], dates, window, threshold), jobs))
+
+    switches = {}
+    for (_, _, switch_name), (estimates, num_bursts, window_bytes, sampled) in zip(jobs, results):
+        entry = switches.setdefault(switch_name, {'estimates': {}, 'bursts': 0, 'window': 0, 'sampled': 0})
+        entry['estimates'].update(estimates)
+        entry['bursts'] += num_bursts
+        entry['window'] += window_bytes
+        entry['sampled'] += sampled
+
+    rows = []
+    for switch_name in sorted(switches):
+        entry = switches[switch_name]
+        estimates = entry['estimates']
+        needs_full = any(estimate.observed for estimate in estimates.values())
+        sampled_pct = 100.0 * entry['sampled'] / entry['window'] if entry['window'] else 100.0
+        rows.append([switch_name, round(entry['window'] / 1e6, 1), round(sampled_pct, 1),
+                     str(estimates.get('i2c', '-')), str(estimates.get('smbus', '-')),
+                     str(estimates.get('ofad', '-')), entry['bursts'], 'yes' if needs_full else 'no'])
+
+    return rows
@@ -0,0 +1,111 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the comparison of the active and standby controllers
+#
+# With --standby, each standby controller found at a location is paired with the active controller whose bundle
+# was collected closest in time. Both reports of a pair are written concurrently. The switch files found under
+# the two bundles have the same content, dedupe scans them once and the other report waits for the result.
+# The active report ends with the differences between the two controllers: fabric errors, audit activity and
+# switch log findings.
+
+from collections import OrderedDict
+import audit
+import controller
+import general
+
+
+def bundle_epoch(ctrl):
+    """
+    Return when the bundle of the controller was collected, in epoch seconds
+    """
+
+    bundle_date, bundle_time = controller.get_bundle_details(ctrl)
+
+    return general.timestamp_to_epoch('{}T{}'.format(bundle_date, bundle_time.replace('-', ':')))
+
+
+def pair_controllers(active, standby):
+    """
+    Return {active controller: standby controller}, each standby controller is paired with the active controller
+    collected closest in time which is not paired yet
+    """
+
+    pairs = OrderedDict()
+    for standby_ctrl in standby:
+        candidates = [active_ctrl for active_ctrl in active if active_ctrl not in pairs]
+        if not candidates:
+            print("No active controller left to compare the standby controller {} with".format(standby_ctrl))
+            continue
+        closest = min(candidates, key=lambda active_ctrl: abs(bundle_epoch(active_ctrl) - bundle_epoch(standby_ctrl)))
+        pairs[closest] = standby_ctrl
+
+    return pairs
+
+
+def audit_activity(ctrl):
+    """
+    Return the number of commands executed per month and per user, for the current and last month
+    """
+
+    audit_file = controller.get_audit_log_file(ctrl)
+    counter = audit.BoundedCounter()
+    months = OrderedDict()
+    users = OrderedDict()
+    try:
+        for month in controller.get_month_list(ctrl):
+            months[month] = sum(1 for _ in audit.audit_commands(audit_file, month, counter))
+        for (user, _), count in counter.items():
+            users[user] = users.get(user, 0) + count
+    finally:
+        counter.close()
+
+    return months, users
+
+
+def controller_summary(ctrl, fabric_errors, findings):
+    """
+    Return {(finding, item): value} for the fabric errors, the audit activity and the switch findings of a controller
+    """
+
+    summary = OrderedDict()
+
+    section = ''
+    for line in (fabric_errors or '').splitlines():
+        if line.startswith('~'):
+            section = line.strip('~ ')
+        else:
+            summary[('Fabric errors', '{}: {}'.format(section, line.strip()))] = 'yes'
+
+    months, users = audit_activity(ctrl)
+    for month, count in months.items():
+        summary[('Audit commands', month)] = count
+    for user, count in users.items():
+        summary[('Audit commands', 'user {}'.format(user))] = count
+
+    for kind in ('i2c', 'smbus'):
+        for switch_name, bursts in findings[kind].items():
+            summary[('{} bursts'.format(kind), switch_name)] = len(bursts)
+    for switch_name, optics in findings['non_hcl'].items():
+        summary[('Non HCL optics', switch_name)] = len(optics.items())
+    for switch_name, error_dict in findings['ofad'].items():
+        summary[('ofad errors', switch_name)] = sum(error_dict.values())
+    summary[('Fabric-wide bursts', 'all switches')] = len(findings['fabric']['windows'])
+
+    return summary
+
+
+def diff_rows(active_summary, standby_summary):
+    """
+    Return [finding, item, active value, standby value] for the items that differ, '-' when an item is not found
+    """
+
+    keys = list(active_summary) + [key for key in standby_summary if key not in active_summary]
+    # group the items of each finding, in the order the findings were first seen
+    findings = list(OrderedDict.fromkeys(finding for finding, _ in keys))
+    keys.sort(key=lambda key: findings.index(key[0]))
+
+    return [[finding, item, active_summary.get((finding, item), '-'), standby_summary.get((finding, item), '-')]
+            for finding, item in keys
+            if active_summary.get((finding, item)) != standby_summary.get((finding, item))]
@@ -6,12 +6,22 @@
 
 import os
 import subprocess
-from collections import OrderedDict
-from tqdm import tqdm
 import re
 import controller
 import general
 import regex
+import burst
+import dedupe
+import records
+import engine
+import native
+import parsers
+import progress
+import inventory
+
+# grep commands used to find the i2c errors in the switch files and the smbus errors under /var/log/switch/
+i2c_grep = "grep -a 'error.*i2c-'"
+smbus_grep = "zgrep 'ERR ismt_smbus'"
 
 
 def get_switch_files(act_ctrl):
@@ -27,242 +37,301 @@ def get_switch_files(act_ctrl):
         if os.path.isfile(os.path.join(main_dir, files)):
             if swt_name_pattern in files:
                 switch_files.append(files)
-    all_switch_names = [i.split('-fe80')[0] for i in switch_files]  # return a list with only the name of the switch
     # return a list with the whole name of the switches with full path
     # eg: /home/bsn/.../LIMSPINER3-1-fe80::e6f0:4ff:fe0a:6c2d%10
     switch_name_full_path = [main_dir + os.sep + i for i in switch_files]
+    # return a list with only the name of the switch
+    all_switch_names = [records.switch_name(i) for i in switch_name_full_path]
 
     return all_switch_names, switch_name_full_path
 
 
-def find_continuous_errors(switch, output_full, output):
+def get_smbus_log_files(act_ctrl):
+    """
+    Find the switch log files under /var/log/switch/ of the controller
+    """
+
+    # for bundles on BCF 5.x, the switch log files are located under act_ctrl_dir/files/var/log/switch/
+    if controller.get_sw_ver(act_ctrl).startswith('5'):
+        act_ctrl = act_ctrl + 'files'
+
+    return controller.get_var_log_switch_files(act_ctrl)
+
+
+def get_error_timestamp_stream(file, grep_cmd, dates):
+    """
+    Start grep_cmd on the file and return the process
+    Every line of its stdout is the timestamp of a matched line for the given dates, in the format
+    YYYY-MM-DDTHH:MM:SS followed by a newline (20 bytes)
+    """
+
+    date_pattern = '|'.join(dates)
+    # keep only the complete timestamps so that every line has the same width
+    cmd = "{} {} | awk '{{print substr($0,1,19)}}' | grep -E '^({})T[0-9]{{2}}:[0-9]{{2}}:[0-9]{{2}}$'".format(
+        grep_cmd, file, date_pattern)
+
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
+
+
+def find_continuous_errors(file, grep_cmd, dates, window=burst.burst_window, threshold=burst.burst_threshold):
     """
     search for continuous i2c/smbus errors
+    sort the timestamps of the errors for the given dates and run them through the sliding window burst detector
+    and return the bursts found as a records.Bursts
+    """
+
+    proc = get_error_timestamp_stream(file, grep_cmd, dates)
+    epochs = burst.sorted_epochs(general.timestamp_to_epoch(line.decode()) for line in proc.stdout)
+    bursts = records.Bursts(burst.find_bursts(epochs, window, threshold), window, epochs)
+    proc.wait()
+
+    return bursts
+
+
+def find_non_hcl_optics(file):
+    """
+    Find the interfaces with non HCL optics in the last inventory dump of a switch file
+    Return a records.Optics with the interfaces and their optics models
+    """
+
+    # tac reads the file from the end, grep stops at the last 'inventory hcl' and keeps the lines following it
+    # awk keeps the table of the dump: it ends at the next log line or dump, or at the blank line after its rows
+    cmd = "tac {} | grep -a -m 1 -B {} 'inventory hcl' | tac | awk 'NR == 1 {{ next }} " \
+          "/^[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]T[0-9][0-9]:[0-9][0-9]:[0-9][0-9]/ || /inventory hcl/ " \
+          "{{ exit }} NF == 0 {{ if (rows) exit; next }} {{ print }} /[ \\t](Yes|No)/ {{ rows = 1 }}'".format(
+              file, inventory.hcl_context)
+    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0]
+
+    # create a int_model record to store the interface and model number
+    int_model = records.Optics()
+
+    for line in output.decode('utf-8', 'replace').split('\n'):
+        matches = re.search(regex.check_hcl_pattern, line)
+        if matches:
+            # add the 'interface' and 'model' to the record
+            int_model.add(matches.group('int'), matches.group('model'))
+
+    return int_model
+
+
+def scan_name(check, act_ctrl):
+    """
+    Return the name of the scan of a check shown in the progress bars and the timing report
     """
-    all_ts = dict()
-    switches_with_errors_all_max = dict()
-    timestamp = []
-    for timestp in output.decode().split('\n'):
-        timestamp.append(timestp)
-
-    # find all occurences of the errors
-    # create a dict with key as timestamp and num of occurences as value
-    all_occurences = OrderedDict()
-    for each_timestamp in timestamp:
-        count = 0
-        # check if the same timestamp occurs in the full output
-        for line in output_full.decode().split('\n'):
-            if each_timestamp in line:
-                count += 1
-                all_occurences[each_timestamp] = count
-
-    # if errors occur more than 5 times continuously, log that timestamp and value
-    for ts, cnt in all_occurences.items():
-        if all_occurences[ts] > 5:
-            all_ts.setdefault(ts, []).append(all_occurences[ts])
-
-    # find the max value only for dicts with values (ignore empty dicts)
-    if all_ts:
-        max_key = max(all_ts, key=lambda k: max(all_ts.get(k)))
-        switches_with_errors_all_max.setdefault(switch, []).append(max_key)
-
-    return switches_with_errors_all_max
-
-
-def check_i2c_errors(switch_files, act_ctrl):
+
+    return '{} {}'.format(check, controller.get_ctrl_dir_name(act_ctrl))
+
+
+def run_file_check(check, file, params, engine_name, golden_dir, shell_func, shell_args, native_func, native_args):
+    """
+    Run a per-file check with the selected engine (shell, native or both), once per unique content
+    """
+
+    return dedupe.cached(check, file, params + (engine_name,), engine.run, check, engine_name, file, params,
+                         shell_func, shell_args, native_func, native_args, golden_dir)
+
+
+def error_epochs_key(check, file, dates):
+    """
+    Return the key of the cached epoch seconds of the i2c or smbus errors of a file, used by the fabric pass
+    """
+
+    return dedupe.result_key('fabric_' + check, file, tuple(dates))
+
+
+def share_error_epochs(check, file, dates, bursts):
+    """
+    Cache the error timestamps collected by a continuous errors check, the fabric pass does not read the file again
+    """
+
+    if bursts.epochs is None:
+        return
+    key = error_epochs_key(check, file, dates)
+    state, _ = dedupe.claim(key)
+    if state == 'owner':
+        dedupe.finish(key, bursts.epochs)
+
+
+def check_i2c_errors(switch_files, act_ctrl, window=burst.burst_window, threshold=burst.burst_threshold,
+                     engine_name=engine.default_engine, golden_dir=None):
     """
       Check for the following:
       continuosly increasing i2c errors on the switches for the last 7 days
       continuosly increasing smbus errors on the switches for the last 7 days
       non-hcl optics
+      window and threshold configure the burst detector: more than threshold errors within window seconds
       """
 
-    # get the sw version
-    ctrl_sw_version = controller.get_sw_ver(act_ctrl)
-
-    # for bundles on BCF 5.x, the switch log files are located under act_ctrl_dir/files/var/log/switch/
-    if ctrl_sw_version.startswith('5'):
-        act_ctrl = act_ctrl + 'files'
-
     # get the files under /var/log/switch/
-    var_log_switch_files = controller.get_var_log_switch_files(act_ctrl)
+    var_log_switch_files = get_smbus_log_files(act_ctrl)
 
     # get the last 7 days
     dates = general.get_last_seven_days(act_ctrl)
 
     switches_with_non_hcl_optics = {}
-    switches_with_max_i2c_timeframe = {}
-    switches_with_max_smbus_timeframe = {}
+    i2c_switch_names = {}
     smbus_switch_names = {}
 
     print("Checking for continuous switch i2c errors for the last 7 days...")
 
-    with tqdm(total=len(dates)) as pbar:
-
-        for day in dates:
-            for switch in switch_files:
-                # search for continuous i2c errors in all the switch files
-                cmd_full = "grep -a 'error.*i2c-' {} | awk '{{print substr($0,1,16)}}' | grep {} | sort".format(switch,
-                                                                                                                day)
-                output_full = (subprocess.Popen(cmd_full, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-
-                cmd = "grep -a 'error.*i2c-' {} | awk '{{print substr($0,1,16)}}' | grep {} | sort | uniq".format(
-                    switch, day)
-                output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-
-                max_timeframe_i2c = find_continuous_errors(switch, output_full, output)
-                switches_with_max_i2c_timeframe.setdefault(switch, []).append(max_timeframe_i2c)
-
-            pbar.update(1)
-
-    i2c_switch_timeframe = {}
-    for each_switch in switch_files:
-        switch = switches_with_max_i2c_timeframe[each_switch]
-        for i in switch:
-            for a, b in i.items():
-                i2c_switch_timeframe.setdefault(a, []).append(b)
+    with progress.Scan(scan_name('i2c', act_ctrl), switch_files) as scan:
+        for file in switch_files:
+            # search for continuous i2c errors in all the switch files, once per unique content
+            with scan.file(file):
+                bursts = run_file_check('i2c', file, (tuple(dates), window, threshold), engine_name, golden_dir,
+                                        find_continuous_errors, (file, i2c_grep, dates, window, threshold),
+                                        native.find_continuous_errors, (file, 'i2c', dates, window, threshold))
+            share_error_epochs('i2c', file, dates, bursts)
+            if bursts:
+                i2c_switch_names[records.switch_name(file)] = bursts
 
     print("Checking for continuous switch smbus errors for the last 7 days...")
 
     # sometimes, there are no switch logs under /var/log/switch
     # hence, do the below only if there are switch log files
     if var_log_switch_files:
-        with tqdm(total=len(dates)) as pbar:
-            for day in dates:
-                # search 'ERR ismt_smbus' in all the files under /var/log/switch folder of the controller
-                for file in var_log_switch_files:
-                    cmd_full = "zgrep 'ERR ismt_smbus' {} | awk '{{print substr($0,1,16)}}' | grep {}".format(file, day)
-                    output_full = (subprocess.Popen(cmd_full, stdout=subprocess.PIPE, shell=True)).communicate()[
-                        0].strip()
-
-                    cmd = "zgrep 'ERR ismt_smbus' {} | awk '{{print substr($0,1,16)}}' | grep {} | sort | uniq".format(
-                        file,
-                        day)
-                    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-
-                    max_timeframe_smbus = find_continuous_errors(file, output_full, output)
-                    switches_with_max_smbus_timeframe.setdefault(file, []).append(max_timeframe_smbus)
-
-                pbar.update(1)
-
-        smbus_switch_timeframe = {}
-        for each_switch in var_log_switch_files:
-            switch = switches_with_max_smbus_timeframe[each_switch]
-            for i in switch:
-                for a, b in i.items():
-                    smbus_switch_timeframe.setdefault(a, []).append(b)
-
-        # construct the switch name from the path
-        for switch_name, time_frame in smbus_switch_timeframe.items():
-            sw = switch_name.split('/')[-1].split('.')[0]
-            smbus_switch_names[sw] = smbus_switch_timeframe[switch_name]
+        with progress.Scan(scan_name('smbus', act_ctrl), var_log_switch_files) as scan:
+            # search 'ERR ismt_smbus' in all the files under /var/log/switch folder of the controller
+            for file in var_log_switch_files:
+                with scan.file(file):
+                    bursts = run_file_check('smbus', file, (tuple(dates), window, threshold), engine_name,
+                                            golden_dir, find_continuous_errors,
+                                            (file, smbus_grep, dates, window, threshold),
+                                            native.find_continuous_errors, (file, 'smbus', dates, window, threshold))
+                share_error_epochs('smbus', file, dates, bursts)
+                if bursts:
+                    smbus_switch_names[records.log_switch_name(file)] = bursts
     else:
         # if there are no files, return a empty dict
         print('...No switch logs found under /var/log/switch/...')
-        smbus_switch_names = {}
 
     print("Checking for non HCL optics for the switches...")
     # find non-hcl optics
 
-    with tqdm(total=len(switch_files)) as pbar:
+    with progress.Scan(scan_name('non_hcl', act_ctrl), switch_files) as scan:
         for file in switch_files:
+            with scan.file(file):
+                int_model = run_file_check('non_hcl', file, ('last dump',), engine_name, golden_dir,
+                                           find_non_hcl_optics, (file,), native.find_non_hcl_optics, (file,))
+            if int_model:
+                # with switch_name as the key, assign the record to the key
+                switches_with_non_hcl_optics[records.switch_name(file)] = int_model
 
-            cmd = "grep -a 'inventory hcl' -A 100 {}".format(file)
-            output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0]
+    return i2c_switch_names, smbus_switch_names, switches_with_non_hcl_optics
 
-            # create a int_model dict to store the interface and model number
-            int_model = OrderedDict()
 
-            for line in output.decode().split('\n'):
-                matches = re.search(regex.check_hcl_pattern, line)
-                if matches:
-                    # add the 'interface' and 'model' to the dict
-                    int_model.setdefault(matches.group('int'), []).append(matches.group('model'))
-                    # construct the switch name from the path
-                    switch_name = file.split('/')[-1].split('-fe80')[0]
-                    # with switch_name as the key, assign the dict to the key
-                    switches_with_non_hcl_optics[switch_name] = int_model
-            pbar.update(1)
+def check_optics_changes(switch_files, act_ctrl):
+    """
+    Find the optics that changed between the first and the last inventory dump of the switch files
+    Return a dict with the switch name as the key and the [interface, first dump, last dump] rows as the value
+    """
 
-    # construct the switch name from the path
-    i2c_switch_names = {}
-    for switch_name, time_frame in i2c_switch_timeframe.items():
-        sw = switch_name.split('/')[-1].split('-fe80')[0]
-        i2c_switch_names[sw] = i2c_switch_timeframe[switch_name]
+    switches_optics_changes = {}
 
-    return i2c_switch_names, smbus_switch_names, switches_with_non_hcl_optics
+    print("Checking for optics changes between the first and the last inventory dump...")
 
+    with progress.Scan(scan_name('optics_changes', act_ctrl), switch_files) as scan:
+        for file in switch_files:
+            with scan.file(file):
+                changes = dedupe.cached('optics_changes', file, (), inventory.find_optics_changes, file)
+            if changes:
+                switches_optics_changes[records.switch_name(file)] = changes
+
+    return switches_optics_changes
+
+
+def find_ofad_errors(swt, dates):
+    """
+    Find the exception, error and critical messages logged on the given dates in a switch file
+    Return a dict with the message as the key and the number of occurences as the value
+    """
 
-def check_ofad_logs(switch_files, act_ctrl):
+    error_dict = {}
+    date_pattern = 'T|'.join(dates)
+    grep_pattern = "| grep -E 'exception \[|error \[|critical \[' | grep -v icmpa | grep -E '{}' ".format(
+        date_pattern)
+    awk_pattern = "| awk -F\"[ ]\" '{ $1=\"\"; print $0 }' | sort | uniq"
+    # sample cmd syntax. Ignore icmpa errors
+    # cat <path to switch file>| grep -E 'exception \[|error \[|critical \[' | grep -v icmpa | grep -E '<dates>' | awk -F"[ ]" '{ $1=""; print $0 }' | sort | uniq
+    cmd = "cat " + swt + grep_pattern + awk_pattern
+    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
+
+    if output:
+        for line in output.decode().split('\n'):
+            cmd = "grep -F \"{}\" ".format(line) + swt + " | wc -l"
+            output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
+            # append the number of occurences and the error message
+            error_dict[line] = int(output)
+
+    return error_dict
+
+
+def check_ofad_logs(switch_files, act_ctrl, engine_name=engine.default_engine, golden_dir=None):
     switches_ofad_errors = {}
     dates = general.get_last_seven_days(act_ctrl)
-    date_pattern = 'T|'.join(dates)
 
     print("Checking for ofad errors on the switches for the last 7 days...")
 
-    with tqdm(total=len(switch_files)) as pbar:
+    with progress.Scan(scan_name('ofad', act_ctrl), switch_files) as scan:
         for swt in switch_files:
-            error_dict = {}
-            grep_pattern = "| grep -E 'exception \[|error \[|critical \[' | grep -v icmpa | grep -E '{}' ".format(
-                date_pattern)
-            awk_pattern = "| awk -F\"[ ]\" '{ $1=\"\"; print $0 }' | sort | uniq"
-            # sample cmd syntax. Ignore icmpa errors
-            # cat <path to switch file>| grep -E 'exception \[|error \[|critical \[' | grep -v icmpa | grep -E '<dates>' | awk -F"[ ]" '{ $1=""; print $0 }' | sort | uniq
-            cmd = "cat " + swt + grep_pattern + awk_pattern
-            output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
+            with scan.file(swt):
+                error_dict = run_file_check('ofad', swt, tuple(dates), engine_name, golden_dir, find_ofad_errors,
+                                            (swt, dates), native.find_ofad_errors, (swt, dates))
+            if error_dict:
+                # with switch_name as the key, assign the dict to the key
+                switches_ofad_errors[records.switch_name(swt)] = error_dict
 
-            if output:
-                for line in output.decode().split('\n'):
-                    cmd = "grep -F \"{}\" ".format(line) + swt + " | wc -l"
-                    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-                    # append the number of occurences and the error message
-                    error_dict[line] = int(output)
-                    switch_name = swt.split('/')[-1].split('-fe80')[0]
-                    # with switch_name as the key, assign the dict to the key
-                    switches_ofad_errors[switch_name] = error_dict
-
-            pbar.update(1)
     return switches_ofad_errors
 
 
-def check_model_uptime(switch_files, act_ctrl):
+def get_model_uptime(swt):
+    """
+    Find the model and the uptime in a switch file
+    """
+
+    cmd = "cat " + swt + "| grep -aE -A 2 '^Model|uptime'"
+    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
+
+    return parsers.find_model_uptime(output.decode())
+
+
+def get_switch_connections(act_ctrl):
+    """
+    Return a dict with the switch name as the key and (connected since, role) as the value
+    """
+
+    show_switch_details = act_ctrl + 'cli/show-switch-all-details'
+    # get the switch name, connected since and role
+    cmd = "cat " + show_switch_details + "| awk '{print $2, $6, $7, $14}'"
+    output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
+    connections = {}
+    for line in output.decode().split('\n'):
+        matches = re.search(regex.check_switch_cntd_since_pattern, line)
+        if matches:
+            connections.setdefault(matches.group('swt_name'), (matches.group('cntd_since'), matches.group('role')))
+
+    return connections
+
+
+def check_model_uptime(switch_files, act_ctrl, engine_name=engine.default_engine, golden_dir=None):
     """
     Find the switch model and it's uptime
+    Return a list of records.SwitchInfo
     """
 
-    show_switch = 'cli/show-switch-all-details'
+    # the switch details are the same for all the switches, read them once
+    connections = get_switch_connections(act_ctrl)
     all_swt_info = []
-    for swt in switch_files:
-        current_swt = []
-        cmd = "cat " + swt + "| grep -aE -A 2 '^Model|uptime'"
-        output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-        # find out the uptime and model
-        matches = re.findall(regex.check_switch_m_u_pattern, output.decode())
-        switch_name = swt.split('/')[-1].split('-fe80')[0]
-        # append the switch name, model and uptime to a list
-        current_swt.append(switch_name)
-        model = matches[0][1]
-        current_swt.append(model)
-        uptime = matches[0][0]
-        current_swt.append(uptime)
-        # find the switch ASIC
-        if model in general.model_asic_dict:
-            # append the ASIC type
-            current_swt.append(general.model_asic_dict[model])
-        else:
-            # if not found, append blank
-            current_swt.append(' ')
-        show_switch_details = act_ctrl + show_switch
-        # get the switch name, connected since and role
-        cmd = "cat " + show_switch_details + "| awk '{print $2, $6, $7, $14}'"
-        output = (subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)).communicate()[0].strip()
-        for line in output.decode().split('\n'):
-            matches = re.search(regex.check_switch_cntd_since_pattern, line)
-            if matches:
-                if matches.group('swt_name') == switch_name:
-                    current_swt.append(matches.group('cntd_since'))
-                    current_swt.append(matches.group('role'))
-        # append the current list to the master list
-        all_swt_info.append(current_swt)
+    with progress.Scan(scan_name('model_uptime', act_ctrl), switch_files) as scan:
+        for swt in switch_files:
+            # find out the uptime and model
+            with scan.file(swt):
+                model, uptime = run_file_check('model_uptime', swt, (), engine_name, golden_dir, get_model_uptime,
+                                               (swt,), native.get_model_uptime, (swt,))
+            switch_name = records.switch_name(swt)
+            # find the switch ASIC, if not found, use blank
+            asic = general.model_asic_dict.get(model, ' ')
+            connected_since, role = connections.get(switch_name, (None, None))
+            all_swt_info.append(records.SwitchInfo(switch_name, model, uptime, asic, connected_since, role))
 
     return all_swt_info
@@ -0,0 +1,80 @@
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the small support bundles the tests analyze
+
+import os
+
+bundle_dir = 'bsn-support--CTRL1--2019-11-26--17-57-21--UTC--abc'
+active_dir = 'CTRL1-1866daabcc1c'
+switches = ['LEAF1', 'LEAF2', 'SPINE1']
+
+
+def switch_lines(name):
+    """
+    Return the lines of a switch file: a burst of i2c errors, ofad errors, an inventory dump and the uptime
+    """
+
+    lines = []
+    for day in ['2019-11-24', '2019-11-25', '2019-11-26']:
+        for hour in range(0, 24, 6):
+            lines.append('{}T{:02d}:00:00.000+00:00 {} ofad: info [x] nothing\n'.format(day, hour, name))
+    for sec in range(40):
+        lines.append('2019-11-25T03:10:{:02d}.000+00:00 {} kernel: error ... i2c-3 read failed\n'.format(sec, name))
+    lines.append('2019-11-26T05:00:00.000+00:00 {} ofad: error [ofad] table full\n'.format(name))
+    lines.append('2019-11-26T06:00:00.000+00:00 {} cli: inventory hcl\n'.format(name))
+    lines.append('Port    Vendor  Model          Type     HCL\n')
+    lines.append('ethernet1  FINISAR  FTLX8571D3BCL  10G-SR  Yes\n')
+    lines.append('ethernet2  ACME  ACME-10G.1  10G-LR  No\n')
+    lines.append('\n')
+    lines.append('2019-11-26T06:00:01.000+00:00 {} cli: uptime\n'.format(name))
+    lines.append(' 17:57:21 up 10 days,  3:04,  1 user,  load average: 0.1\n')
+    lines.append('Model: S4048-ON\n')
+
+    return lines
+
+
+def add_controller(bundle, ctrl_dir, role, audit_users=('admin',)):
+    """
+    Create a controller directory in a bundle, role is 'active' or 'standby'
+    """
+
+    ctrl = os.path.join(bundle, ctrl_dir)
+    for sub_dir in ['cli', 'var/log/floodlight', 'var/log/switch']:
+        os.makedirs(os.path.join(ctrl, sub_dir), exist_ok=True)
+
+    other = 'standby' if role == 'active' else 'active'
+    with open(os.path.join(ctrl, 'cli/show-controller-details'), 'w') as outfile:
+        outfile.write("1 * 10.0.0.1  {}\n2   10.0.0.2  {}\n".format(role, other))
+    with open(os.path.join(ctrl, 'cli/show-fabric-error'), 'w') as outfile:
+        outfile.write("~ Switch errors ~\nLEAF1 something bad\n")
+    with open(os.path.join(ctrl, 'cli/show-version-details'), 'w') as outfile:
+        outfile.write("Ci job name : bcf-4.7-ci\n")
+    with open(os.path.join(ctrl, 'cli/show-switch-all-details'), 'w') as outfile:
+        outfile.write("# Name IP MAC ... \n")
+        for index, name in enumerate(switches):
+            outfile.write("{} {} x x x 2019-11-01 10:00:00 UTC 0 x x x x x leaf\n".format(index, name))
+    with open(os.path.join(ctrl, 'var/log/floodlight/audit.log'), 'w') as outfile:
+        for user in audit_users:
+            outfile.write('2019-11-10T11:26:28.479+00:00 type=cmd user={} id=42 args="show switch"\n'.format(user))
+    for name in switches:
+        with open(os.path.join(ctrl, 'var/log/switch/{}.log'.format(name)), 'w') as outfile:
+            for sec in range(12):
+                outfile.write('2019-11-25T03:10:{:02d}.000+00:00 {} ERR ismt_smbus 0000:00:13.0: completion wait '
+                              'timed out\n'.format(sec, name))
+
+    return ctrl + '/'
+
+
+def make_bundle(root):
+    """
+    Create a bundle with an active controller and the switch files under root, return the path of the bundle
+    """
+
+    bundle = os.path.join(str(root), bundle_dir)
+    os.makedirs(bundle)
+    add_controller(bundle, active_dir, 'active')
+    for name in switches:
+        with open(os.path.join(bundle, '{}-fe80::e6f0:4ff:fe0a:6c2d%10'.format(name)), 'w') as outfile:
+            outfile.writelines(switch_lines(name))
+
+    return bundle
@@ -0,0 +1,51 @@
+import random
+from collections import Counter
+import audit
+
+
+def random_keys(num):
+    rand = random.Random(36)
+    users = ['admin', 'bsn', 'ops', 'guest']
+    # the commands can hold tabs, newlines and non ascii characters
+    commands = ['show switch', 'show link', 'config\tterminal', 'copy running-config\nstartup', 'show café',
+                'debug bash'] + ['show switch LEAF{}'.format(index) for index in range(40)]
+    return [(rand.choice(users), rand.choice(commands)) for _ in range(num)]
+
+
+def test_spilled_counts_match_a_counter():
+    """
+    With a few keys in memory, the counts spilled to the run files and merged match an unbounded Counter
+    """
+
+    keys = random_keys(5000)
+    counter = audit.BoundedCounter(max_size=7, max_open=3)
+    for key in keys:
+        counter.add(key)
+
+    assert counter.spills > counter.max_open
+    assert len(counter.runs) < counter.max_open
+    expected = Counter(keys)
+    items = list(counter.items())
+    assert [key for key, _ in items] == sorted(expected)
+    assert dict(items) == expected
+    counter.close()
+
+
+def test_summary_matches_a_counter():
+    keys = random_keys(2000)
+    counter = audit.BoundedCounter(max_size=5, max_open=2)
+    for key in keys:
+        counter.add(key)
+    commands, users, num_users = audit.summarize(counter, num=3)
+    counter.close()
+
+    expected = Counter(keys)
+    assert [count for _, _, count in commands] == sorted(expected.values(), reverse=True)[:3]
+    for user, command, count in commands:
+        assert expected[(user, command)] == count
+    totals = Counter()
+    for (user, _), count in expected.items():
+        totals[user] += count
+    assert num_users == len(totals)
+    assert [[user, total] for user, total, _ in users] == [[user, total] for user, total in
+                                                          sorted(totals.items(), key=lambda item: -item[1])[:3]]
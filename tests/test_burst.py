@@ -0,0 +1,50 @@
+import burst
+import general
+import native
+import switch
+
+
+def epoch(timestamp):
+    return general.timestamp_to_epoch(timestamp)
+
+
+def test_bursts_in_order():
+    stamps = [epoch('2019-11-25T03:10:{:02d}'.format(sec)) for sec in range(10)]
+
+    assert list(burst.find_bursts(stamps, 60, 5)) == [(stamps[0], stamps[-1], 10)]
+
+
+def test_window_and_threshold():
+    # 6 errors 20 seconds apart never fall within a 60 seconds window more than 3 at a time
+    stamps = [epoch('2019-11-25T03:1{}:{:02d}'.format(sec // 60, sec % 60)) for sec in range(0, 120, 20)]
+
+    assert list(burst.find_bursts(stamps, 60, 5)) == []
+    assert list(burst.find_bursts(stamps, 120, 5)) == [(stamps[0], stamps[-1], 6)]
+
+
+def test_sorted_epochs():
+    assert list(burst.sorted_epochs([3, 1, 2])) == [1, 2, 3]
+
+
+def write_out_of_order_dumps(path):
+    """
+    A switch file whose later dump comes first: 3 errors at 03:20 then 3 errors at 03:10
+    """
+
+    with open(path, 'w') as outfile:
+        for stamp in ['03:20:01', '03:20:02', '03:20:03', '03:10:03', '03:10:04', '03:10:05']:
+            outfile.write('2019-11-25T{}.000+00:00 LEAF1 kernel: error ... i2c-3 read failed\n'.format(stamp))
+
+
+def test_out_of_order_dumps(tmp_path):
+    path = str(tmp_path / 'LEAF1-fe80::e6f0:4ff:fe0a:6c2d%10')
+    write_out_of_order_dumps(path)
+    dates = ['2019-11-25']
+
+    shell = switch.find_continuous_errors(path, switch.i2c_grep, dates, 60, 5)
+    in_process = native.find_continuous_errors(path, 'i2c', dates, 60, 5)
+
+    # the two groups of 3 errors are 10 minutes apart, neither is a burst
+    assert list(shell) == list(in_process) == []
+    assert list(shell.epochs) == list(in_process.epochs) == sorted(in_process.epochs)
+    assert len(in_process.epochs) == 6
@@ -0,0 +1,67 @@
+import os
+import pytest
+import bundles
+import checkpoint
+import dedupe
+import jarvis
+import switch
+
+log_file = 'CTRL1-1866daabcc1c-2019-11-26-17-57-21.log'
+
+
+def fresh_caches(monkeypatch):
+    # a new process: nothing is cached in memory, only the checkpoint is left
+    monkeypatch.setattr(dedupe, 'content_index', dedupe.ContentIndex())
+    monkeypatch.setattr(dedupe, 'results', dedupe.LRUCache())
+    monkeypatch.setattr(dedupe, 'in_flight', {})
+
+
+def counted(func, calls):
+    def wrapper(*args):
+        calls.append(args)
+        return func(*args)
+    return wrapper
+
+
+def test_resume_after_a_failure(tmp_path, monkeypatch):
+    """
+    A run killed during the ofad check is resumed from its checkpoint: the checks and switch files already done
+    are not scanned again and the report is the one of an uninterrupted run
+    """
+
+    case = tmp_path / 'case'
+    bundles.make_bundle(case)
+    monkeypatch.chdir(tmp_path)
+    options = {'history_db': None}
+
+    fresh_caches(monkeypatch)
+    jarvis.run_job(False, str(case), options)
+    expected = (tmp_path / log_file).read_text()
+    assert not os.path.exists(log_file + checkpoint.suffix)
+
+    find_ofad_errors = switch.find_ofad_errors
+    attempts = []
+
+    def fail_on_second_file(swt, dates):
+        attempts.append(swt)
+        if len(attempts) == 2:
+            raise RuntimeError('killed')
+        return find_ofad_errors(swt, dates)
+
+    fresh_caches(monkeypatch)
+    monkeypatch.setattr(switch, 'find_ofad_errors', fail_on_second_file)
+    with pytest.raises(RuntimeError):
+        jarvis.run_job(False, str(case), options)
+    assert os.path.isdir(log_file + checkpoint.suffix)
+
+    i2c_scans, scanned = [], []
+    monkeypatch.setattr(switch, 'check_i2c_errors', counted(switch.check_i2c_errors, i2c_scans))
+    monkeypatch.setattr(switch, 'find_ofad_errors', counted(find_ofad_errors, scanned))
+    fresh_caches(monkeypatch)
+    jarvis.run_job(False, str(case), dict(options, resume=True))
+
+    # the i2c check was done, the first switch file was scanned by the ofad check
+    assert not i2c_scans
+    assert len(scanned) == len(bundles.switches) - 1
+    assert (tmp_path / log_file).read_text() == expected
+    assert not os.path.exists(log_file + checkpoint.suffix)
@@ -0,0 +1,139 @@
+import os
+import threading
+import pytest
+import dedupe
+
+
+@pytest.fixture
+def fresh_caches(monkeypatch):
+    monkeypatch.setattr(dedupe, 'content_index', dedupe.ContentIndex())
+    monkeypatch.setattr(dedupe, 'results', dedupe.LRUCache())
+    monkeypatch.setattr(dedupe, 'in_flight', {})
+
+
+def test_lru_evicts_the_least_recently_used():
+    evicted = []
+    cache = dedupe.LRUCache(2, lambda key, value: evicted.append(key))
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache['a'] == 1
+    cache['c'] = 3
+    assert list(cache) == ['a', 'c']
+    assert evicted == ['b']
+
+    unbounded = dedupe.LRUCache()
+    for num in range(100):
+        unbounded[num] = num
+    assert len(unbounded) == 100
+
+
+def test_copies_share_a_key(tmp_path):
+    """
+    Files with the same content get the same key, the full hash tells apart the ones with the same samples
+    """
+
+    content = b'x' * (dedupe.sample_size * dedupe.sample_blocks + 10)
+    # same size and sampled blocks, different bytes outside the samples
+    changed = bytearray(content)
+    changed[dedupe.sample_size + 1] = ord('y')
+    paths = []
+    for name, data in [('a', content), ('b', content), ('c', bytes(changed))]:
+        (tmp_path / name).write_bytes(data)
+        paths.append(str(tmp_path / name))
+
+    index = dedupe.ContentIndex()
+    assert index.unique(paths) == [paths[0], paths[2]]
+    assert index.key(paths[0]) == index.key(paths[1]) != index.key(paths[2])
+    assert index.summary(paths) == (3, 2, len(content))
+
+
+def test_modified_file_is_not_reused(tmp_path):
+    """
+    A file whose fingerprint is unique is also identified by its modification time
+    """
+
+    path = tmp_path / 'a'
+    path.write_bytes(b'x' * (dedupe.sample_size * dedupe.sample_blocks + 10))
+    index = dedupe.ContentIndex()
+    before = index.key(str(path))
+
+    # rewritten outside the sampled blocks
+    with open(path, 'r+b') as outfile:
+        outfile.seek(dedupe.sample_size + 1)
+        outfile.write(b'y')
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert index.key(str(path)) != before
+
+
+def test_index_forgets_the_evicted_files(tmp_path):
+    index = dedupe.ContentIndex(max_size=2)
+    for name in 'abc':
+        (tmp_path / name).write_text(name)
+        index.key(str(tmp_path / name))
+
+    assert len(index.fingerprints) == 2
+    assert sorted(path for group in index.groups.values() for path in group) == [str(tmp_path / 'b'),
+                                                                                  str(tmp_path / 'c')]
+
+
+def test_cached_scans_each_content_once(tmp_path, fresh_caches):
+    scans = []
+    for name in 'ab':
+        (tmp_path / name).write_text('same content\n')
+    # the switch files are fingerprinted before the checks run
+    dedupe.content_index.unique([str(tmp_path / name) for name in 'ab'])
+
+    for name in 'ab':
+        assert dedupe.cached('check', str(tmp_path / name), (), lambda: scans.append(name) or 'result') == 'result'
+    assert scans == ['a']
+    # other parameters are another result
+    dedupe.cached('check', str(tmp_path / 'b'), (1,), lambda: scans.append('b') or 'result')
+    assert scans == ['a', 'b']
+
+
+def test_concurrent_reports_wait_for_the_scan(tmp_path, fresh_caches):
+    """
+    A content being scanned by one thread is waited for by the other, its result goes to the listeners of the
+    thread that computed it
+    """
+
+    (tmp_path / 'a').write_text('same content\n')
+    (tmp_path / 'b').write_text('same content\n')
+    dedupe.content_index.unique([str(tmp_path / 'a'), str(tmp_path / 'b')])
+    started, release = threading.Event(), threading.Event()
+    scans, heard, results = [], {}, {}
+
+    def scan(name):
+        scans.append(name)
+        started.set()
+        release.wait(5)
+        return 'result'
+
+    def report(name):
+        dedupe.current.result_listeners.append(lambda key, result: heard.setdefault(name, []).append(result))
+        results[name] = dedupe.cached('check', str(tmp_path / name), (), scan, name)
+
+    first = threading.Thread(target=report, args=('a',))
+    first.start()
+    started.wait(5)
+    second = threading.Thread(target=report, args=('b',))
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert scans == ['a']
+    assert results == {'a': 'result', 'b': 'result'}
+    assert heard == {'a': ['result']}
+
+
+def test_failed_scan_is_not_cached(tmp_path, fresh_caches):
+    (tmp_path / 'a').write_text('content\n')
+
+    def fail():
+        raise RuntimeError('killed')
+
+    with pytest.raises(RuntimeError):
+        dedupe.cached('check', str(tmp_path / 'a'), (), fail)
+    assert not dedupe.in_flight
+    assert dedupe.cached('check', str(tmp_path / 'a'), (), lambda: 'result') == 'result'
@@ -0,0 +1,28 @@
+import numpy as np
+import fabric
+import general
+
+start = general.timestamp_to_epoch('2019-11-25T03:00:00')
+
+
+def switch_epochs():
+    # 3 switches with 10 errors in the bin of 03:10, one of them also has 10 errors in the bin of 03:30
+    epochs = {name: start + 600 + np.arange(10, dtype=np.int64) for name in ['LEAF1', 'LEAF2', 'SPINE1']}
+    epochs['LEAF1'] = np.concatenate((epochs['LEAF1'], start + 1800 + np.arange(10, dtype=np.int64)))
+    return epochs
+
+
+def find_windows(threshold):
+    epochs = switch_epochs()
+    names = list(epochs)
+    bins, owners, counts = fabric.bin_fabric_errors(epochs, 60, start)
+    return fabric.find_fabric_bursts(names, bins, owners, counts, start, 60, threshold)
+
+
+def test_fabric_window():
+    assert find_windows(5) == [['2019-11-25T03:10:00', '2019-11-25T03:11:00', 3, 30, 'LEAF1, LEAF2, SPINE1']]
+
+
+def test_fabric_threshold():
+    # no switch has more than 10 errors in a bin
+    assert find_windows(10) == []
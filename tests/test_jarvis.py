@@ -0,0 +1,70 @@
+import argparse
+import bundles
+import daemon
+import jarvis
+
+
+def test_jobs_return_their_own_log_files(tmp_path, monkeypatch):
+    """
+    The daemon runs several jobs in the same process, each of them lists only its own log files
+    """
+
+    case = tmp_path / 'case'
+    bundles.make_bundle(case)
+    monkeypatch.chdir(tmp_path)
+
+    for _ in range(2):
+        log_files, starttime = jarvis.run_job(False, str(case), {'history_db': None})
+        assert log_files == ['CTRL1-1866daabcc1c-2019-11-26-17-57-21.log']
+        assert starttime
+
+
+def parse_options(args):
+    parser = argparse.ArgumentParser()
+    inp = parser.add_mutually_exclusive_group(required=True)
+    inp.add_argument("-c", "--case-num", action='store', default=False)
+    inp.add_argument("-p", "--path", action='store', default=False)
+    jarvis.add_check_arguments(parser)
+    user_input = parser.parse_args(args)
+    return user_input.case_num, user_input.path, jarvis.check_options(user_input)
+
+
+def test_full_scan_keeps_the_options():
+    """
+    The background full scan of a quick run is started with the same options, without --quick
+    """
+
+    for args in (['-p', '/tmp/case', '--quick', '--full-after'],
+                 ['-p', '/tmp/case', '--quick', '--full-after', '--no-history'],
+                 ['-c', '11146', '--quick', '--full-after', '--burst-window', '30', '--burst-threshold', '5',
+                  '--chunk-size', '4', '--queue-depth', '2', '--history-db', '/tmp/h.db', '--audit-budget', '10',
+                  '--engine', 'both', '--golden-dir', '/tmp/golden', '--optics-changes', '--standby']):
+        case_num, path, options = parse_options(args)
+        assert options['full_after']
+        full_case_num, full_path, full_options = parse_options(jarvis.full_scan_args(case_num, path, options))
+        assert (full_case_num, full_path) == (case_num, path)
+        assert full_options == dict(options, quick=False, full_after=False)
+
+
+def test_daemon_queues_the_full_scan():
+    """
+    A quick daemon job with --full-after queues its full scan as a job of its own once it is done
+    """
+
+    jobs = []
+
+    def run_job(case_num, path, options, discover, output):
+        jobs.append(dict(options))
+        return ['CTRL1.log'], 0
+
+    analysis = daemon.Daemon(run_job, None)
+    job = analysis.submit({'path': '/tmp/case', 'options': {'quick': True, 'full_after': True}})
+    analysis.run(analysis.jobs.get()[2])
+    events = [job.events.get() for _ in range(job.events.qsize())]
+    assert events[-1]['event'] == 'done'
+
+    _, full_scan_id, full_scan = analysis.jobs.get_nowait()
+    assert events[-1]['full_scan'] == full_scan_id
+    analysis.run(full_scan)
+    assert jobs == [{'quick': True, 'full_after': True}, {'quick': False, 'full_after': False}]
+    assert analysis.jobs.empty()
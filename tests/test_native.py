@@ -0,0 +1,71 @@
+import pytest
+import native
+import switch
+
+dates = ['2019-11-26', '2019-11-25']
+
+
+def write_switch_file(path, lines):
+    with open(path, 'wb') as outfile:
+        outfile.writelines(lines)
+
+
+@pytest.fixture
+def utf8_locale(monkeypatch):
+    # grep drops the lines with invalid bytes in a UTF-8 locale
+    monkeypatch.setenv('LC_ALL', 'C.UTF-8')
+
+
+def test_ofad_dates_anywhere(tmp_path, utf8_locale):
+    """
+    The dates are matched anywhere in the line, like grep -E '2019-11-26T|...'
+    """
+
+    path = str(tmp_path / 'LEAF1')
+    write_switch_file(path, [
+        b'<13>2019-11-26T07:00:00.000+00:00 LEAF1 ofad: error [ofad] syslog prefixed\n',
+        b'2019-11-20T07:00:01.000+00:00 LEAF1 ofad: error [ofad] old line mentions 2019-11-26T01:00\n',
+        b'2019-11-20T07:00:02.000+00:00 LEAF1 ofad: error [ofad] old line\n',
+        b'2019-11-26T07:00:03.000+00:00 LEAF1 ofad: error [icmpa] ignored\n',
+    ])
+
+    shell = switch.find_ofad_errors(path, dates)
+    assert sorted(message.strip() for message in shell) == [
+        'LEAF1 ofad: error [ofad] old line mentions 2019-11-26T01:00', 'LEAF1 ofad: error [ofad] syslog prefixed']
+    assert native.find_ofad_errors(path, dates) == shell
+
+
+def test_ofad_invalid_bytes(tmp_path, utf8_locale):
+    """
+    The lines with invalid bytes are dropped, from the messages and from their counts
+    """
+
+    path = str(tmp_path / 'LEAF1')
+    write_switch_file(path, [
+        b'2019-11-26T07:00:00.000+00:00 LEAF1 ofad: error [ofad] table full\n',
+        b'2019-11-26T07:00:01.000+00:00 LEAF1 ofad: error [ofad] bad \xff byte\n',
+        b'2019-11-26T07:00:02.000+00:00 LEAF1 ofad: error [ofad] table full \xfe\n',
+    ])
+
+    shell = switch.find_ofad_errors(path, dates)
+    assert shell == {'LEAF1 ofad: error [ofad] table full': 1}
+    assert native.find_ofad_errors(path, dates) == shell
+
+
+def test_text_blocks_end_at_nul():
+    blocks = ['a\nb\ufffd\nc\n', 'd\ne\x00f\ng\n', 'h\n']
+
+    assert list(native.text_blocks(blocks)) == ['a\nc\n', 'd\n']
+
+
+def test_recent_timestamp_for_bursts(tmp_path):
+    """
+    The i2c errors are the lines starting with a timestamp of the dates, a date further in the line is not enough
+    """
+
+    path = str(tmp_path / 'LEAF1')
+    write_switch_file(path, [b'2019-11-20T03:10:%02d.000+00:00 LEAF1 kernel: error 2019-11-26T i2c-3\n' % sec
+                             for sec in range(10)])
+
+    assert list(native.find_continuous_errors(path, 'i2c', dates).epochs) == []
+    assert list(switch.find_continuous_errors(path, switch.i2c_grep, dates).epochs) == []
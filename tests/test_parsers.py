@@ -0,0 +1,26 @@
+import re
+import pytest
+import parsers
+
+# the model/uptime pattern of the first versions, find_model_uptime returns the same on these outputs
+old_pattern = re.compile(r'(?sm)up\s(?P<uptime>.*?),\s\s.*Model:\s(?P<model>.*?$)')
+
+outputs = [
+    ' 17:57:21 up 10 days,  3:04,  1 user\nx\nModel: S4048-ON\n',
+    ' 17:57:21 up 10 days,  3:04,  1 user\nSystem Model: S4048-ON\n',
+    ' 17:57:21 up 10 days,  3:04,  1 user\nModel: A\n--\nHardware Model: B \n',
+    ' 17:57:21 up 10 days,  3:04,  1 user\nModel:\nS5248\n',
+    'Model: before\n 17:57:21 up 2 days,  3:04,  1 user\nfoo Model: after',
+]
+
+
+@pytest.mark.parametrize('output', outputs)
+def test_model_uptime(output):
+    matches = old_pattern.search(output)
+
+    assert parsers.find_model_uptime(output) == (matches.group('model').strip(), matches.group('uptime'))
+
+
+def test_model_uptime_missing():
+    assert parsers.find_model_uptime('Model: S4048-ON\n') == (' ', ' ')
+    assert parsers.find_model_uptime(' 17:57:21 up 10 days,  3:04,  1 user\n') == (' ', '10 days')
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+import pytest
+import progress
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc/self/fdinfo'), reason='needs /proc')
+def test_pipeline_offset(tmp_path):
+    """
+    The offset of a file read by a child process is found in /proc
+    """
+
+    path = str(tmp_path / 'LEAF1')
+    with open(path, 'wb') as outfile:
+        outfile.write(b'x' * 10000)
+    reader = "import sys, time; f = open(sys.argv[1], 'rb', buffering=0); f.read(1234); print(flush=True); " \
+             "time.sleep(30)"
+    child = subprocess.Popen([sys.executable, '-c', reader, path], stdout=subprocess.PIPE)
+    try:
+        child.stdout.readline()
+        assert progress.read_offsets([path]) == {path: 1234}
+    finally:
+        child.kill()
+        child.wait()
+
+    assert progress.read_offsets([path]) == {}
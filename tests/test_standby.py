@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import bundles
+import jarvis
+
+
+def test_same_bundle_active_and_standby(tmp_path, monkeypatch):
+    """
+    The active and standby controllers of the same bundle get their own report, checkpoint and history run
+    """
+
+    case = tmp_path / 'case'
+    bundle = bundles.make_bundle(case)
+    bundles.add_controller(bundle, 'CTRL2-1866daabcc1d', 'standby', audit_users=('admin', 'ops'))
+    monkeypatch.chdir(tmp_path)
+    db = str(tmp_path / 'history.db')
+
+    log_files, _ = jarvis.run_job(False, str(case), {'history_db': db, 'standby': True})
+
+    assert log_files == ['CTRL1-1866daabcc1c-2019-11-26-17-57-21.log', 'CTRL2-1866daabcc1d-2019-11-26-17-57-21.log']
+    active_report, standby_report = [(tmp_path / name).read_text() for name in log_files]
+    # the active report ends with the differences, the standby report is complete too
+    assert 'user ops' in active_report
+    assert 'ACME-10G.1' in active_report and 'ACME-10G.1' in standby_report
+    # the checkpoints are removed once both reports are complete
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith(('.checkpoint', '.partial'))]
+
+    with sqlite3.connect(db) as conn:
+        runs = dict(conn.execute('SELECT controller, id FROM runs'))
+        switches = dict(conn.execute('SELECT run_id, COUNT(*) FROM switches GROUP BY run_id'))
+    assert sorted(runs) == ['CTRL1-1866daabcc1c', 'CTRL2-1866daabcc1d']
+    assert switches == {run_id: len(bundles.switches) for run_id in runs.values()}
+
+
+def test_standby_output_is_not_interleaved(tmp_path, monkeypatch, capsys):
+    """
+    What the two report threads print is shown per controller
+    """
+
+    case = tmp_path / 'case'
+    bundle = bundles.make_bundle(case)
+    bundles.add_controller(bundle, 'CTRL2-1866daabcc1d', 'standby')
+    monkeypatch.chdir(tmp_path)
+
+    jarvis.run_job(False, str(case), {'history_db': None, 'standby': True})
+
+    output = capsys.readouterr().out
+    active = output.index('Analysis of the controller CTRL1-1866daabcc1c:')
+    standby = output.index('Analysis of the controller CTRL2-1866daabcc1d:')
+    first_check = 'Checking for continuous switch i2c errors'
+    assert active < output.index(first_check, active) < standby < output.index(first_check, standby)
+    assert all(line.count('Checking') <= 1 for line in output.splitlines())
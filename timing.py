@@ -0,0 +1,121 @@
+#!/usr/bin/python3
+
+# developed by Ragavendra Ananth (raga.ananth@bigswitch.com)
+# this script is a part of support bundle analyzer script
+# this contains the timing report of a run
+#
+# The phases of a run (startup, discovery, fingerprinting, each controller report) are timed from the start of
+# jarvis.py. The switch file scans add their throughput and their slowest files (progress.py). --timing shows
+# them at the end of the run and --timing-file exports them as JSON, so that the batch and cron runs can be
+# compared.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# the start of the run, jarvis.py imports this module before the others
+origin = time.perf_counter()
+# phase name -> [offset of the first start from the origin, total seconds]
+phases = OrderedDict()
+# [scan, files, MB, seconds, MB/s(, lines, lines/s)] of each scan, the lines only for the scans counting them,
+# and [scan, file, MB, seconds, MB/s] of its slowest files
+scans = []
+slow_files = []
+scan_headers = ['Scan', 'Files', 'MB', 'Seconds', 'MB/s', 'Lines', 'Lines/s']
+slow_file_headers = ['Scan', 'File', 'MB', 'Seconds', 'MB/s']
+# number of slowest files shown for the whole run
+slowest_shown = 10
+lock = threading.Lock()
+
+
+def add(name, seconds, started=None):
+    """
+    Add seconds to a phase, started is the perf_counter value when it started (now - seconds by default)
+    """
+
+    started = time.perf_counter() - seconds if started is None else started
+    with lock:
+        phase = phases.setdefault(name, [started - origin, 0.0])
+        phase[1] += seconds
+
+
+@contextmanager
+def phase(name):
+    """
+    Time the block as a phase of the run
+    """
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - started, started)
+
+
+def add_scan(row):
+    with lock:
+        scans.append(row)
+
+
+def add_slow_file(row):
+    with lock:
+        slow_files.append(row)
+
+
+def slowest_files(num=slowest_shown):
+    """
+    Return the slowest files of all the scans, the slowest first
+    """
+
+    with lock:
+        return sorted(slow_files, key=lambda row: row[3], reverse=True)[:num]
+
+
+def scan_table():
+    """
+    Return the rows and headers of the scans, the line columns are left out when no scan counted the lines
+    """
+
+    with lock:
+        width = max([len(row) for row in scans] or [0])
+        headers = scan_headers[:width] if width else scan_headers
+        return [row + [''] * (width - len(row)) for row in scans], headers
+
+
+def reset():
+    with lock:
+        phases.clear()
+        del scans[:]
+        del slow_files[:]
+
+
+def rows():
+    """
+    Return [phase, started at (s), seconds] for each phase, in the order they started
+    """
+
+    with lock:
+        items = sorted(phases.items(), key=lambda item: item[1][0])
+
+    return [[name, round(offset, 3), round(seconds, 3)] for name, (offset, seconds) in items]
+
+
+def export(path):
+    """
+    Write the phases to a JSON file
+    """
+
+    # only --timing-file needs json, the module is imported before the others
+    import json
+
+    report = {'total_seconds': round(time.perf_counter() - origin, 3),
+              'phases': [{'phase': name, 'started_at': offset, 'seconds': seconds}
+                         for name, offset, seconds in rows()],
+              'scans': [dict(zip(scan_headers, row)) for row in scans],
+              'slowest_files': [dict(zip(slow_file_headers, row)) for row in slowest_files()]}
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as outfile:
+        json.dump(report, outfile, indent=2)
+    os.replace(tmp_path, path)